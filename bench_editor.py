@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# 将项目根目录添加到 Python 路径
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+# 无需显示窗口
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtCore import QMimeData, QTimer
+
+from src.ui.main_window import MarkdownEditor
+
+WORDS = ["abandon", "ability", "absorb", "abstract", "academic", "accelerate",
+         "复习", "计划", "单词", "阅读", "写作", "考试", "听力", "总结"]
+
+def generate_text(size: int, seed: int = 42) -> str:
+    """生成约 size 个字符、每行约 80 个字符的笔记正文"""
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+def percentile(values: list, fraction: float) -> float:
+    """排序后取分位数"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def type_keys(editor: MarkdownEditor, keystrokes: int, seed: int) -> list:
+    """在随机位置逐个输入字符（偶尔删除），返回每次按键的耗时（毫秒）"""
+    rng = random.Random(seed)
+    app = QApplication.instance()
+    latencies = []
+    for _ in range(keystrokes):
+        cursor = QTextCursor(editor.document())
+        cursor.setPosition(rng.randrange(editor.document().characterCount() - 1))
+        start = time.perf_counter()
+        if rng.random() < 0.2:
+            cursor.deletePreviousChar()
+        else:
+            cursor.insertText(rng.choice("abc 词\n"))
+        app.processEvents()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run_typing(args):
+    """比较每次按键调用 toPlainText 与增量更新文本缓冲区的输入延迟"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    text = generate_text(args.size)
+    print(f"笔记大小 {len(text) / 1024 / 1024:.1f}MB，{args.keystrokes} 次按键")
+    print(f"{'mode':<8} {'mean':>9} {'p95':>9} {'max':>9}")
+
+    # 旧方式：textChanged 时取出完整文本
+    editor = MarkdownEditor()
+    editor.set_document(*editor.create_document(text))
+    editor.textChanged.connect(lambda: editor.toPlainText())
+    full = type_keys(editor, args.keystrokes, args.seed)
+    print(f"{'full':<8} {sum(full) / len(full):>7.2f}ms {percentile(full, 0.95):>7.2f}ms {max(full):>7.2f}ms")
+
+    # 新方式：contentsChange 只把增量应用到缓冲区
+    editor = MarkdownEditor()
+    editor.set_document(*editor.create_document(text))
+    delta = type_keys(editor, args.keystrokes, args.seed)
+    print(f"{'delta':<8} {sum(delta) / len(delta):>7.2f}ms {percentile(delta, 0.95):>7.2f}ms {max(delta):>7.2f}ms")
+
+    # 停止输入后保存时才拼接完整文本
+    start = time.perf_counter()
+    saved = editor.plain_text()
+    join_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    expected = editor.toPlainText()
+    plain_ms = (time.perf_counter() - start) * 1000
+    print(f"保存时拼接 {join_ms:.2f}ms（toPlainText {plain_ms:.2f}ms），内容一致: {saved == expected}")
+    app.quit()
+
+def run_switch(args):
+    """比较切换便签时重新 setPlainText 与换上缓存文档的耗时"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    texts = [generate_text(args.size, seed) for seed in range(args.notes)]
+    print(f"{args.notes} 个 {args.size / 1024 / 1024:.1f}MB 的便签，切换 {args.switches} 次")
+    print(f"{'mode':<8} {'mean':>9} {'p95':>9}")
+    editor = MarkdownEditor()
+    editor.resize(600, 400)
+    editor.show()
+
+    def switch(load) -> list:
+        latencies = []
+        for index in range(args.switches):
+            start = time.perf_counter()
+            load(index % args.notes)
+            app.processEvents()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    def reload(index):
+        editor.setPlainText(texts[index])
+
+    documents = [editor.create_document(text) for text in texts]
+    def swap(index):
+        editor.set_document(*documents[index])
+
+    for name, load in (("reload", reload), ("cached", swap)):
+        latencies = switch(load)
+        print(f"{name:<8} {sum(latencies) / len(latencies):>7.2f}ms {percentile(latencies, 0.95):>7.2f}ms")
+    app.quit()
+
+def run_paste(args):
+    """比较一次性插入与分块插入大段粘贴时界面的最长停顿"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    text = generate_text(args.size)
+    print(f"粘贴 {len(text) / 1024 / 1024:.1f}MB")
+    print(f"{'mode':<8} {'total':>9} {'stall':>9}")
+    for name, chunk in (("single", len(text)), ("chunked", args.chunk)):
+        editor = MarkdownEditor()
+        editor.resize(600, 400)
+        editor.show()
+        editor.paste_chunk_chars = chunk
+        edits = []
+        editor.contentEdited.connect(lambda: edits.append(1))
+
+        # 用 10ms 的计时器测量事件循环两次得到处理之间的最长间隔
+        ticks = []
+        timer = QTimer()
+        timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+        timer.start(10)
+        mime = QMimeData()
+        mime.setText(text)
+        start = time.perf_counter()
+        ticks.append(start)
+        editor.insertFromMimeData(mime)
+        end = time.perf_counter()
+        ticks.append(end)
+        timer.stop()
+        stall = max(b - a for a, b in zip(ticks, ticks[1:])) * 1000
+        print(f"{name:<8} {(end - start) * 1000:>7.0f}ms {stall:>7.0f}ms "
+              f"保存触发 {len(edits)} 次，内容一致: {editor.plain_text() == editor.toPlainText()}")
+        editor.close()
+    app.quit()
+
+def main():
+    parser = argparse.ArgumentParser(description="DictiNote 编辑器基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    typing = subparsers.add_parser("typing", help="大笔记中的输入延迟")
+    typing.add_argument("--size", type=int, default=5 * 1024 * 1024)
+    typing.add_argument("--keystrokes", type=int, default=300)
+    typing.add_argument("--seed", type=int, default=7)
+    typing.set_defaults(func=run_typing)
+
+    switch = subparsers.add_parser("switch", help="大便签之间的切换耗时")
+    switch.add_argument("--size", type=int, default=1024 * 1024)
+    switch.add_argument("--notes", type=int, default=3)
+    switch.add_argument("--switches", type=int, default=12)
+    switch.set_defaults(func=run_switch)
+
+    paste = subparsers.add_parser("paste", help="大段粘贴时的界面停顿")
+    paste.add_argument("--size", type=int, default=3 * 1024 * 1024)
+    paste.add_argument("--chunk", type=int, default=200000)
+    paste.set_defaults(func=run_paste)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# 将项目根目录添加到 Python 路径
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from src.utils.daily_storage import DailyStorage
+from src.utils.sqlite_storage import SqliteStorage
+from src.utils.memory_storage import MemoryStorage
+from src.utils.note_manifest import serialize_day
+from src.utils.day_scanner import scan_day_files
+from src.utils.note_codec import FORMATS, encode_day, loads_day
+from src.utils.search_index import SearchIndex
+
+WORDS = ["abandon", "ability", "absorb", "abstract", "academic", "accelerate",
+         "复习", "计划", "单词", "阅读", "写作", "考试", "听力", "总结"]
+
+def generate_days(days: int, notes_per_day: int, content_size: int, seed: int = 42) -> dict:
+    """生成确定性的合成数据：{日期: {便签ID: 便签}}"""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    data = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        notes = {}
+        for index in range(1, rng.randint(1, notes_per_day * 2 - 1) + 1):
+            stamp = datetime(day.year, day.month, day.day, 8) + timedelta(minutes=index * 7)
+            words = []
+            length = 0
+            while length < content_size:
+                word = rng.choice(WORDS)
+                words.append(word)
+                length += len(word) + 1
+            notes[str(index)] = {
+                'id': str(index),
+                'title': f"{rng.choice(WORDS)} {index}",
+                'content': " ".join(words),
+                'created_at': stamp.isoformat(),
+                'updated_at': stamp.isoformat(),
+                'date': day.strftime('%Y-%m-%d'),
+            }
+        data[day] = notes
+    return data
+
+def timed(func) -> float:
+    """运行函数并返回耗时（毫秒）"""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+def bench_backend(storage, data: dict, range_days: int) -> dict:
+    """对单个后端测量保存、单日加载、范围扫描和全量扫描耗时"""
+    days = sorted(data)
+    lookup_order = list(days)
+    random.Random(7).shuffle(lookup_order)
+
+    def save_all():
+        for day in days:
+            storage.save_notes(data[day], day)
+
+    def load_all():
+        for day in lookup_order:
+            storage.get_daily_notes(day)
+
+    def range_scans():
+        for index in range(0, len(days), range_days):
+            window = days[index:index + range_days]
+            storage.get_notes_in_range(window[0], window[-1])
+
+    return {
+        "save": timed(save_all) / len(days),
+        "load": timed(load_all) / len(days),
+        "range": timed(range_scans) / max(1, len(days) // range_days),
+        "full": timed(storage.get_all_notes),
+    }
+
+def run_backends(args):
+    """比较各存储后端的延迟"""
+    data = generate_days(args.days, args.notes_per_day, args.content_size)
+    total_notes = sum(len(notes) for notes in data.values())
+    print(f"合成数据：{len(data)} 天，{total_notes} 个便签，正文约 {args.content_size} 字符")
+    print(f"{'backend':<8} {'save/day':>10} {'load/day':>10} {f'range/{args.range_days}d':>10} {'full scan':>10}")
+
+    work_dir = tempfile.mkdtemp(prefix="dictionote_bench_")
+    factories = {
+        "json": lambda: DailyStorage(str(Path(work_dir) / "json")),
+        "sqlite": lambda: SqliteStorage(str(Path(work_dir) / "notes.db")),
+        "memory": MemoryStorage,
+    }
+    try:
+        for name in args.backends:
+            storage = factories[name]()
+            result = bench_backend(storage, data, args.range_days)
+            if hasattr(storage, 'close'):
+                storage.close()
+            print(f"{name:<8} {result['save']:>8.3f}ms {result['load']:>8.3f}ms "
+                  f"{result['range']:>8.3f}ms {result['full']:>8.1f}ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def write_day_files(data: dict, directory: str) -> list:
+    """直接把合成数据写成每日文件，返回按日期排序的路径"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for day in sorted(data):
+        path = os.path.join(directory, f"{day.year}_{day.month:02d}_{day.day:02d}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(serialize_day(data[day]))
+        paths.append(path)
+    return paths
+
+def drop_page_cache(paths: list) -> bool:
+    """尽量把文件从页缓存中逐出（posix_fadvise），不支持时返回 False"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+def run_scan(args):
+    """比较不同并发数下全量扫描每日文件的吞吐量"""
+    data = generate_days(args.days, args.notes_per_day, args.content_size)
+    work_dir = tempfile.mkdtemp(prefix="dictionote_scan_")
+    try:
+        paths = write_day_files(data, work_dir)
+        total_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+        print(f"{len(paths)} 个每日文件，共 {total_mb:.1f} MB")
+        print(f"{'cache':<6} {'pool':<8} {'workers':>7} {'time':>9} {'files/s':>9} {'MB/s':>7}")
+
+        for cache in args.cache:
+            for pool in args.pools:
+                for workers in args.workers:
+                    if cache == "cold":
+                        if not drop_page_cache(paths):
+                            print("当前平台无法逐出页缓存，跳过冷缓存测试")
+                            break
+                    else:
+                        # 预热：先完整读一遍
+                        for path in paths:
+                            with open(path, 'rb') as f:
+                                f.read()
+
+                    start = time.perf_counter()
+                    count = sum(1 for _ in scan_day_files(paths, workers, use_processes=(pool == "process")))
+                    elapsed = time.perf_counter() - start
+                    assert count == len(paths)
+                    print(f"{cache:<6} {pool:<8} {workers:>7} {elapsed * 1000:>7.0f}ms "
+                          f"{count / elapsed:>9.0f} {total_mb / elapsed:>7.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_format(args):
+    """比较每日文件格式的大小、解析和序列化耗时"""
+    data = generate_days(args.days, args.notes_per_day, args.content_size)
+    days = [(day.strftime('%Y-%m-%d'), notes) for day, notes in sorted(data.items())]
+    print(f"合成数据：{len(days)} 天，每天平均 {sum(len(n) for _, n in days) / len(days):.1f} 个便签")
+    print(f"{'format':<8} {'bytes/day':>10} {'parse/day':>10} {'dump/day':>10}")
+
+    for fmt in FORMATS:
+        texts = []
+        dump_ms = timed(lambda: texts.extend(encode_day(notes, date_str, fmt) for date_str, notes in days))
+        parse_ms = timed(lambda: [loads_day(text, date_str) for text, (date_str, _) in zip(texts, days)])
+        size = sum(len(text.encode('utf-8')) for text in texts) / len(texts)
+        print(f"{fmt:<8} {size:>10.0f} {parse_ms / len(days) * 1000:>8.1f}us {dump_ms / len(days) * 1000:>8.1f}us")
+
+def run_partial(args):
+    """比较繁忙的一天中只修改一个便签时，整天保存与只保存变化便签的耗时"""
+    day = date(2024, 1, 1)
+    print(f"{'backend':<8} {'notes':>6} {'full/save':>10} {'dirty/save':>11}")
+    work_dir = tempfile.mkdtemp(prefix="dictionote_partial_")
+    try:
+        for count in args.notes:
+            template = next(iter(generate_days(1, 1, args.content_size).values()))["1"]
+            notes = {str(index): dict(template, id=str(index)) for index in range(1, count + 1)}
+            factories = {
+                "json": lambda: DailyStorage(str(Path(work_dir) / f"json_{count}")),
+                "compact": lambda: DailyStorage(str(Path(work_dir) / f"compact_{count}"), file_format="compact"),
+                "sqlite": lambda: SqliteStorage(str(Path(work_dir) / f"notes_{count}.db")),
+            }
+            for name in args.backends:
+                storage = factories[name]()
+                storage.save_notes(notes, day)
+                results = []
+                for dirty in (None, {"1"}):
+                    def edit_and_save():
+                        for index in range(args.saves):
+                            notes["1"]['content'] = f"edit {index}"
+                            storage.save_notes(notes, day, dirty=dirty)
+                    results.append(timed(edit_and_save) / args.saves)
+                if hasattr(storage, 'close'):
+                    storage.close()
+                print(f"{name:<8} {count:>6} {results[0]:>8.3f}ms {results[1]:>9.3f}ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_search(args):
+    """测量全文索引的构建、加载、增量更新和查询耗时"""
+    data = generate_days(args.days, args.notes_per_day, args.content_size)
+    documents = [
+        (f"{day.strftime('%Y-%m-%d')}_{note_id}", note['title'], note['content'])
+        for day, notes in sorted(data.items()) for note_id, note in notes.items()
+    ]
+    print(f"合成数据：{len(data)} 天，{len(documents)} 个便签，正文约 {args.content_size} 字符")
+    work_dir = tempfile.mkdtemp(prefix="dictionote_search_")
+    try:
+        index = SearchIndex(work_dir, lambda: iter(documents))
+        print(f"{'build':<10} {timed(index.rebuild):>9.0f}ms")
+        size_kb = os.path.getsize(index.snapshot_file) / 1024
+        print(f"{'snapshot':<10} {size_kb:>9.0f}KB")
+
+        reloaded = SearchIndex(work_dir)
+        print(f"{'load':<10} {timed(lambda: len(reloaded)):>9.0f}ms")
+
+        key, title, content = documents[len(documents) // 2]
+        update_ms = timed(lambda: [reloaded.update(key, title, content + f" edit{i}") for i in range(100)]) / 100
+        print(f"{'update':<10} {update_ms:>9.3f}ms")
+
+        texts = {doc_key: f"{doc_title}\n{doc_content}" for doc_key, doc_title, doc_content in documents}
+        for query in args.queries:
+            results = []
+            elapsed = timed(lambda: results.extend(reloaded.search(query, 50, texts.get)))
+            print(f"{query:<10} {elapsed:>9.2f}ms {len(results):>4} 条结果")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_bulk(args):
+    """比较逐个 create_future_note 与批量 create_future_notes 导入日程的耗时"""
+    rng = random.Random(7)
+    start = date.today() + timedelta(days=1)
+    items = [
+        (start + timedelta(days=rng.randrange(args.days)),
+         {'title': f"课程 {index}", 'content': " ".join(rng.choice(WORDS) for _ in range(20)),
+          'created_at': "2025-01-01T08:00:00", 'updated_at': "2025-01-01T08:00:00"})
+        for index in range(args.items)
+    ]
+    print(f"{args.items} 个便签分布在 {len({day for day, _ in items})} 天")
+    print(f"{'backend':<8} {'single':>10} {'bulk':>10} {'speedup':>8}")
+    work_dir = tempfile.mkdtemp(prefix="dictionote_bulk_")
+    try:
+        factories = {
+            "json": lambda name: DailyStorage(str(Path(work_dir) / name)),
+            "compact": lambda name: DailyStorage(str(Path(work_dir) / name), file_format="compact"),
+            "sqlite": lambda name: SqliteStorage(str(Path(work_dir) / f"{name}.db")),
+        }
+        for name in args.backends:
+            single = factories[name](f"{name}_single")
+            single_ms = timed(lambda: [single.create_future_note(day, note) for day, note in items])
+            bulk = factories[name](f"{name}_bulk")
+            bulk_ms = timed(lambda: bulk.create_future_notes(items))
+            for storage in (single, bulk):
+                if hasattr(storage, 'close'):
+                    storage.close()
+            print(f"{name:<8} {single_ms:>8.0f}ms {bulk_ms:>8.0f}ms {single_ms / bulk_ms:>7.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="DictiNote 存储基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backends = subparsers.add_parser("backends", help="比较各存储后端")
+    backends.add_argument("--days", type=int, default=1000)
+    backends.add_argument("--notes-per-day", type=int, default=3)
+    backends.add_argument("--content-size", type=int, default=500)
+    backends.add_argument("--range-days", type=int, default=30)
+    backends.add_argument("--backends", nargs="+", default=["json", "sqlite", "memory"],
+                          choices=["json", "sqlite", "memory"])
+    backends.set_defaults(func=run_backends)
+
+    scan = subparsers.add_parser("scan", help="并发扫描每日文件的吞吐量")
+    scan.add_argument("--days", type=int, default=3650)
+    scan.add_argument("--notes-per-day", type=int, default=3)
+    scan.add_argument("--content-size", type=int, default=500)
+    scan.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    scan.add_argument("--pools", nargs="+", default=["thread", "process"], choices=["thread", "process"])
+    scan.add_argument("--cache", nargs="+", default=["warm", "cold"], choices=["warm", "cold"])
+    scan.set_defaults(func=run_scan)
+
+    fmt = subparsers.add_parser("format", help="比较每日文件格式")
+    fmt.add_argument("--days", type=int, default=1000)
+    fmt.add_argument("--notes-per-day", type=int, default=3)
+    fmt.add_argument("--content-size", type=int, default=300)
+    fmt.set_defaults(func=run_format)
+
+    partial = subparsers.add_parser("partial", help="只修改一个便签时的保存耗时")
+    partial.add_argument("--notes", type=int, nargs="+", default=[5, 20, 100, 500])
+    partial.add_argument("--content-size", type=int, default=500)
+    partial.add_argument("--saves", type=int, default=50)
+    partial.add_argument("--backends", nargs="+", default=["json", "compact", "sqlite"],
+                         choices=["json", "compact", "sqlite"])
+    partial.set_defaults(func=run_partial)
+
+    search = subparsers.add_parser("search", help="全文索引的构建和查询耗时")
+    search.add_argument("--days", type=int, default=3650)
+    search.add_argument("--notes-per-day", type=int, default=3)
+    search.add_argument("--content-size", type=int, default=500)
+    search.add_argument("--queries", nargs="+",
+                        default=["abandon", "复习 计划", "\"阅读 写作\"", "acad*", "总结", "abstract 考试"])
+    search.set_defaults(func=run_search)
+
+    bulk = subparsers.add_parser("bulk", help="批量导入未来便签的耗时")
+    bulk.add_argument("--items", type=int, default=500)
+    bulk.add_argument("--days", type=int, default=120)
+    bulk.add_argument("--backends", nargs="+", default=["json", "compact", "sqlite"],
+                      choices=["json", "compact", "sqlite"])
+    bulk.set_defaults(func=run_bulk)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import sys
+import shutil
+import tempfile
+import traceback
+from typing import Callable, List
+
+def run_checks(checks: List[Callable[[str], None]], prefix: str) -> int:
+    """
+    在独立的临时目录中运行每项检查，返回失败数
+
+    Args:
+        checks: 检查函数，参数为临时目录
+        prefix: 临时目录名的前缀
+    """
+    failures = 0
+    for check in checks:
+        work_dir = tempfile.mkdtemp(prefix=prefix)
+        try:
+            check(work_dir)
+            print(f"[通过] {check.__name__}")
+        except Exception:
+            failures += 1
+            print(f"[失败] {check.__name__}")
+            traceback.print_exc()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return failures
+
+def report(failures: int):
+    """输出结果并以失败数决定退出码"""
+    print(f"失败 {failures} 项" if failures else "全部通过")
+    sys.exit(1 if failures else 0)
+
+def main(checks: List[Callable[[str], None]], prefix: str):
+    """运行全部检查并退出"""
+    report(run_checks(checks, prefix))
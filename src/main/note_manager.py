@@ -1,9 +1,17 @@
-import json
 import os
-from datetime import datetime, date
-from typing import List, Dict
+from datetime import datetime, date, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Set
 from ..utils.config_manager import ConfigManager
-from ..utils.daily_storage import DailyStorage
+from ..utils.revision_store import RevisionStore
+from ..utils.search_index import SearchIndex
+from ..utils.tag_index import TagIndex, extract_todos
+from ..utils.link_index import LinkIndex, link_target
+from ..utils.note_query import NoteQueryEngine
+from ..utils.note_manifest import note_meta
+from ..utils.recurrence import RecurrenceStore, occurs_on
+from ..utils.note_registry import NoteRegistry, new_uid, uid_timestamp
+from ..utils.note_iter import make_cursor, parse_cursor
+from ..utils.storage_backend import StorageBackend, create_storage
 
 class NoteManager:
     def __init__(self, config_manager: ConfigManager):
@@ -14,8 +22,46 @@ class NoteManager:
             config_manager: 配置管理器
         """
         self.config_manager = config_manager
-        self.storage = DailyStorage(config_manager.get("storage.notes_dir"))
+        self.storage: StorageBackend = create_storage(config_manager)
         self.notes: Dict[str, dict] = {}
+        # self.notes 中由重复规则展开、尚未写入存储的虚拟便签ID
+        self._virtual: Set[str] = set()
+        # 自上次保存以来新增、修改或删除的便签ID，保存时只写入这些便签
+        self._dirty: Set[str] = set()
+        # 保存便签后调用的函数，参数为保存的日期（YYYY-MM-DD），用于界面增量刷新
+        self._save_listeners: List[Callable[[str], None]] = []
+        
+        # 便签修订历史，放在便签目录的索引子目录中
+        notes_dir = config_manager.get("storage.notes_dir", "data/notes")
+        self.revisions = RevisionStore(
+            os.path.join(notes_dir, ".index", "revisions"),
+            config_manager.get("history.snapshot_interval", 20),
+            config_manager.get("history.coalesce_seconds", 60)
+        )
+        self.revisions.start_thin_out()
+        
+        # 全局注册表：便签 uid -> 所在日期和ID；首次启动时为旧便签分配 uid
+        self.registry = NoteRegistry(os.path.join(notes_dir, ".index"))
+        if not self.registry.loaded:
+            assigned = self.registry.migrate(self.storage)
+            if assigned:
+                print(f"已为 {assigned} 个旧便签分配全局ID")
+        
+        # 重复规则只保存一份，查看某天时才展开
+        self.recurrence = RecurrenceStore(os.path.join(notes_dir, "recurring.json"))
+        
+        # 全文索引，在后台加载（缺失时从全部便签重建），保存便签时增量更新
+        self.search_index = SearchIndex(os.path.join(notes_dir, ".index"), self._note_documents)
+        self.search_index.start_loading()
+        # 标签和待办索引，同样在后台加载，保存便签时只重新解析该便签
+        self.tag_index = TagIndex(os.path.join(notes_dir, ".index"), self._note_documents)
+        self.tag_index.start_loading()
+        # 链接和反向链接索引，保存时只比较该便签新旧的链接集合
+        self.link_index = LinkIndex(os.path.join(notes_dir, ".index"), self._note_documents)
+        self.link_index.start_loading()
+        self.query_engine = NoteQueryEngine(
+            self.search_index, self.storage.get_day_summaries, self._note_text, self.tag_index
+        )
         
         # 当前系统日期，用于检测日期变化
         self.current_date = datetime.now().date()
@@ -38,24 +84,66 @@ class NoteManager:
         """设置当前工作日期"""
         self.working_date = date
         self._load_notes()
+        self._prefetch_neighbours()
+    
+    def _prefetch_neighbours(self):
+        """在后台预读工作日期前后的便签，使连续翻页无需等待磁盘"""
+        radius = self.config_manager.get("storage.prefetch_days", 7)
+        if radius and hasattr(self.storage, 'prefetch'):
+            self.storage.prefetch(self.working_date, radius)
+    
+    def cache_stats(self) -> dict:
+        """获取存储层每日缓存的统计信息，后端不支持缓存时返回空字典"""
+        if hasattr(self.storage, 'cache_stats'):
+            return self.storage.cache_stats()
+        return {}
     
     def _load_notes(self):
         """从存储加载便签"""
         # 加载工作日期的便签
         self.notes = self.storage.get_daily_notes(self.working_date)
+        self._dirty.clear()
+        # 外部导入等途径加入的便签可能还没有 uid，下次编辑时再分配，浏览不改写文件
+        self._virtual = set()
+        self._merge_recurring()
+    
+    def _assign_uid(self, note_id: str, note: dict):
+        """为工作日期的便签分配全局 uid 并登记位置"""
+        note['uid'] = new_uid()
+        self.registry.register(note['uid'], self._revision_key(note_id))
+    
+    def _merge_recurring(self):
+        """把工作日期的重复规则展开为虚拟便签，已有同ID的真实便签时不展开"""
+        # 规则变化后重新展开，先移除之前展开的虚拟便签
+        for note_id in self._virtual:
+            self.notes.pop(note_id, None)
+        self._virtual = set()
+        for note_id, note in self.recurrence.expand_day(self.working_date).items():
+            if note_id not in self.notes:
+                self.notes[note_id] = note
+                self._virtual.add(note_id)
     
     def _save_notes(self):
-        """保存便签到存储"""
-        self.storage.save_notes(self.notes, self.working_date)
+        """保存便签到存储（只写入变化的便签，虚拟便签不写入）"""
+        notes = self.notes
+        if self._virtual:
+            notes = {note_id: note for note_id, note in self.notes.items() if note_id not in self._virtual}
+        if self.storage.save_notes(notes, self.working_date, dirty=self._dirty):
+            self._dirty.clear()
+    
+    def _next_note_id(self) -> str:
+        """工作日期中未被占用的便签ID"""
+        note_id = str(len(self.notes) + 1)
+        while note_id in self.notes:
+            note_id = str(int(note_id) + 1)
+        return note_id
     
     def create_note(self, title: str = "", content: str = "") -> dict:
         """创建新便签"""
         if not title:
             title = u"新建便签"
         
-        note_id = str(len(self.notes) + 1)
-        while note_id in self.notes:
-            note_id = str(int(note_id) + 1)
+        note_id = self._next_note_id()
         
         note = {
             'id': note_id,
@@ -67,9 +155,53 @@ class NoteManager:
         }
         
         self.notes[note_id] = note
+        self._assign_uid(note_id, note)
+        self._dirty.add(note_id)
         self._save_notes()
+        self._index_note(note)
         return note
     
+    def create_future_notes(self, items: List[tuple]) -> List[dict]:
+        """
+        批量创建未来日期的便签（例如导入课表），每个日期只写入一次
+        
+        Args:
+            items: [(日期, 标题, 内容)]
+            
+        Returns:
+            与 items 一一对应的结果 [{'date', 'id', 'ok', 'error'}]，成功的项带有 'uid'
+        """
+        now = datetime.now().isoformat()
+        notes = []
+        for day, title, content in items:
+            notes.append((day, {
+                'title': title or u"新建便签",
+                'content': content,
+                'created_at': now,
+                'updated_at': now,
+                'date': day.strftime('%Y-%m-%d'),
+                'uid': new_uid()
+            }))
+        # 先写入工作日期尚未保存的修改，批量写入后再重新加载
+        self._save_notes()
+        results = self.storage.create_future_notes(notes)
+        
+        saved_days = set()
+        self.registry.register_many({
+            note['uid']: make_cursor(result['date'], result['id'])
+            for (_, note), result in zip(notes, results) if result['ok']
+        })
+        for (day, note), result in zip(notes, results):
+            if result['ok']:
+                result['uid'] = note['uid']
+                self._update_indexes(make_cursor(result['date'], result['id']), note['title'], note['content'])
+                saved_days.add(result['date'])
+        if self.working_date.strftime('%Y-%m-%d') in saved_days:
+            self._load_notes()
+        for date_str in sorted(saved_days):
+            self._notify_saved(date_str)
+        return results
+    
     def get_note(self, note_id: str) -> dict:
         """获指定便签"""
         return self.notes.get(note_id)
@@ -78,31 +210,438 @@ class NoteManager:
         """更新便签"""
         note = self.notes.get(note_id)
         if note:
+            if note_id in self._virtual:
+                # 编辑某次重复时才写成真实便签，该日期不再由规则展开
+                self._virtual.discard(note_id)
+                self.recurrence.add_exception(note['recurrence'], self.working_date)
+            if not note.get('uid'):
+                # 未编辑过的重复便签，或外部导入后还没有 uid 的便签
+                self._assign_uid(note_id, note)
             if title is not None:
                 note['title'] = title
             if content is not None:
                 note['content'] = content
             note['updated_at'] = datetime.now().isoformat()
+            self._dirty.add(note_id)
             self._save_notes()
+            self.revisions.record(self._history_key(note_id), note.get('title', ''), note.get('content', ''))
+            self._index_note(note)
         return note
     
     def delete_note(self, note_id: str) -> bool:
-        """删除便签"""
+        """删除便签（删除前的内容保留在修订历史中）"""
+        if note_id in self._virtual:
+            # 删除某次重复：只记为例外，存储中没有这个便签
+            self.recurrence.add_exception(self.notes[note_id]['recurrence'], self.working_date)
+            self._virtual.discard(note_id)
+            del self.notes[note_id]
+            self._notify_saved()
+            return True
         if note_id in self.notes:
+            note = self.notes[note_id]
+            self.revisions.record(self._history_key(note_id), note.get('title', ''), note.get('content', ''), force=True)
             del self.notes[note_id]
+            self._dirty.add(note_id)
             self._save_notes()
+            if note.get('uid'):
+                self.registry.unregister(note['uid'])
+            key = self._revision_key(note_id)
+            self.search_index.remove(key)
+            self.tag_index.remove(key)
+            self.link_index.remove(key)
+            self._notify_saved()
             return True
         return False
     
-    def get_all_notes(self) -> List[dict]:
-        """获取所有便签"""
-        return list(self.notes.values()) 
+    def _revision_key(self, note_id: str, date: date = None) -> str:
+        """便签在索引和注册表中的键：日期_便签ID"""
+        return make_cursor((date or self.working_date).strftime('%Y-%m-%d'), note_id)
+    
+    def _history_key(self, note_id: str, date: date = None, uid: str = None) -> str:
+        """
+        便签在修订历史中的键：便签 uid（便签ID在删除后会被同一天的新便签复用，
+        uid 不会），没有 uid 的便签（未编辑过的重复便签）为 日期_便签ID
+        
+        旧版本以 日期_便签ID 为键的修订文件在首次访问时迁移到 uid 下。
+        """
+        legacy_key = self._revision_key(note_id, date)
+        if uid is None:
+            note = self.notes.get(note_id) if date is None or date == self.working_date else None
+            uid = note.get('uid') if note is not None else self.registry.uid_for(legacy_key)
+        if not uid:
+            return legacy_key
+        self.revisions.adopt(legacy_key, uid, uid_timestamp(uid))
+        return uid
+    
+    def list_revisions(self, note_id: str, date: date = None, uid: str = None) -> List[dict]:
+        """
+        列出便签的历史版本（从旧到新），默认为工作日期的便签
+        
+        已删除的便签需要提供其 uid。
+        """
+        return self.revisions.list_revisions(self._history_key(note_id, date, uid))
+    
+    def get_revision(self, note_id: str, index: int, date: date = None, uid: str = None) -> Optional[dict]:
+        """获取便签的某个历史版本（标题和正文），index 可为负数表示倒数"""
+        return self.revisions.get_revision(self._history_key(note_id, date, uid), index)
+    
+    def restore_revision(self, note_id: str, index: int, uid: str = None) -> Optional[dict]:
+        """
+        把工作日期的便签恢复为某个历史版本
+        
+        恢复已删除的便签时提供其 uid：便签以原 uid 重新创建，ID 已被占用时
+        使用新的ID。恢复本身也会记录为一个新版本。
+        """
+        if note_id in self.notes and uid is not None and self.notes[note_id].get('uid') != uid:
+            note_id = self._next_note_id()
+        revision = self.get_revision(note_id, index, uid=uid)
+        if revision is None:
+            return None
+        if note_id not in self.notes:
+            now = datetime.now().isoformat()
+            self.notes[note_id] = {
+                'id': note_id,
+                'created_at': now,
+                'date': self.working_date.strftime('%Y-%m-%d')
+            }
+            if uid is not None:
+                self.notes[note_id]['uid'] = uid
+                self.registry.register(uid, self._revision_key(note_id))
+            else:
+                self._assign_uid(note_id, self.notes[note_id])
+        return self.update_note(note_id, title=revision['title'], content=revision['content'])
+    
+    def _index_note(self, note: dict):
+        """工作日期的便签保存后更新各索引并通知监听者"""
+        self._update_indexes(self._revision_key(note['id']), note.get('title', ''), note.get('content', ''))
+        self._notify_saved()
+    
+    def _update_indexes(self, key: str, title: str, content: str):
+        """更新全文、标签待办和链接索引（只解析这一个便签）"""
+        self.search_index.update(key, title, content)
+        self.tag_index.update(key, title, content)
+        self.link_index.update(key, title, content)
+    
+    def add_save_listener(self, listener: Callable[[str], None]):
+        """注册保存监听：每次便签保存并更新索引后以日期（YYYY-MM-DD）调用"""
+        if listener not in self._save_listeners:
+            self._save_listeners.append(listener)
+    
+    def remove_save_listener(self, listener: Callable[[str], None]):
+        """取消保存监听"""
+        if listener in self._save_listeners:
+            self._save_listeners.remove(listener)
+    
+    def _notify_saved(self, date_str: str = None):
+        """通知监听者某个日期（默认为工作日期）的便签已保存"""
+        date_str = date_str or self.working_date.strftime('%Y-%m-%d')
+        for listener in list(self._save_listeners):
+            try:
+                listener(date_str)
+            except Exception as e:
+                print(f"保存监听处理失败: {e}")
+    
+    def _note_documents(self):
+        """重建索引时并发扫描全部便签，产出 (键, 标题, 正文)"""
+        for note in self.storage.iter_notes():
+            yield make_cursor(note['date'], note['id']), note.get('title', ''), note.get('content', '')
+    
+    def _note_text(self, key: str):
+        """读取便签的 "标题\n正文"，用于校验短语匹配"""
+        date_str, note_id = parse_cursor(key)
+        note = self.load_note(note_id, date.fromisoformat(date_str))
+        if note is None:
+            return None
+        return f"{note.get('title', '')}\n{note.get('content', '')}"
+    
+    def _with_uid(self, result: dict) -> dict:
+        """为搜索或查询结果补充便签的全局 uid"""
+        result['uid'] = self.registry.uid_for(result['key'])
+        return result
+    
+    def locate_note(self, uid: str) -> Optional[tuple]:
+        """按全局 uid 查找便签所在的 (日期, 便签ID)，不读取日期文件"""
+        key = self.registry.locate(uid)
+        if key is None:
+            return None
+        date_str, note_id = parse_cursor(key)
+        return date.fromisoformat(date_str), note_id
+    
+    def find_note(self, uid: str) -> Optional[dict]:
+        """按全局 uid 打开任意日期的便签，只读取该便签"""
+        location = self.locate_note(uid)
+        if location is None:
+            return None
+        day, note_id = location
+        return self.load_note(note_id, day)
+    
+    def search_notes(self, query: str, limit: int = 50) -> List[dict]:
+        """
+        全文搜索所有日期的便签，按相关度排序
+        
+        查询由空格分隔的词组成，各项需同时匹配；"带引号" 为短语，
+        以 * 结尾为前缀，#标签 匹配标签。
+        
+        Returns:
+            [{'key', 'uid', 'date', 'id', 'title', 'score'}]
+        """
+        return [self._with_uid(result) for result in self.search_index.search(query, limit, self._note_text)]
+    
+    def iter_search(self, query: str) -> Iterator[dict]:
+        """按相关度逐个产出搜索结果，见 search_notes"""
+        return (self._with_uid(result) for result in self.search_index.iter_search(query, self._note_text))
+    
+    def query_notes(self, query: str, limit: int = None) -> List[dict]:
+        """
+        执行结构化查询，例如 date:2025-01..2025-03 tag:work "deadline" -done
+        
+        Returns:
+            [{'key', 'uid', 'date', 'id', 'title'}]，日期新的在前；查询格式有误时返回空列表
+        """
+        try:
+            return [self._with_uid(result) for result in self.query_engine.run(query, limit)['results']]
+        except ValueError as e:
+            print(f"查询格式有误: {e}")
+            return []
+    
+    def explain_query(self, query: str) -> str:
+        """执行结构化查询并说明每一步使用的索引和保留的候选数"""
+        try:
+            return self.query_engine.explain(query)
+        except ValueError as e:
+            return f"查询格式有误: {e}"
+    
+    def rebuild_search_index(self) -> int:
+        """从全部便签重建全文索引，返回便签数"""
+        return self.search_index.rebuild()
+    
+    def notes_with_tag(self, tag: str) -> List[dict]:
+        """
+        所有日期中带有指定标签（可省略 #）的便签，不读取日期文件
+        
+        Returns:
+            [{'key', 'date', 'id', 'title', 'tags'}]，日期新的在前
+        """
+        return self.tag_index.notes_with_tag(tag)
+    
+    def open_todos(self, start: date = None, end: date = None) -> List[dict]:
+        """
+        范围内（包含首尾）所有未完成的 - [ ] 待办，不读取日期文件
+        
+        例如 open_todos(start=今天) 得到今天及以后的全部待办。给定 end 时
+        重复便签（尚未编辑过的发生）的待办也按每次发生展开。
+        
+        Returns:
+            [{'key', 'date', 'id', 'title', 'text'}]，按日期升序
+        """
+        todos = self.tag_index.open_todos(start, end)
+        if end is None:
+            return todos
+        for date_str, notes in self.recurrence.expand_range(start or end, end).items():
+            for note_id, note in notes.items():
+                for text in extract_todos(note['content'])[0]:
+                    todos.append({'key': make_cursor(date_str, note_id), 'date': date_str, 'id': note_id,
+                                  'title': note['title'], 'text': text})
+        todos.sort(key=lambda todo: todo['date'])
+        return todos
+    
+    def all_tags(self) -> Dict[str, int]:
+        """全部标签及其便签数，按便签数从多到少"""
+        return self.tag_index.tags()
+    
+    def get_agenda(self, days: int = None, start: date = None) -> List[dict]:
+        """
+        获取从 start（默认今天）起 days 天内的日程，按日期分组
+        
+        便签来自日期清单的逐便签元数据，待办来自标签待办索引，重复便签按规则
+        展开到范围内的每次发生，不读取日期文件。
+        
+        Args:
+            days: 天数，默认为配置 agenda.days
+            start: 起始日期（包含）
+            
+        Returns:
+            [{'date', 'notes'（便签元数据）, 'todos'（未完成待办）}]，按日期升序，跳过空日期
+        """
+        if days is None:
+            days = self.config_manager.get("agenda.days", 14)
+        start = start or datetime.now().date()
+        end = start + timedelta(days=max(days, 1) - 1)
+        agenda: Dict[str, dict] = {}
+        for date_str, summary in self.get_day_summaries(start, end).items():
+            if summary.get('notes'):
+                agenda[date_str] = {'date': date_str, 'notes': list(summary['notes']), 'todos': []}
+        for todo in self.open_todos(start, end):
+            day = agenda.setdefault(todo['date'], {'date': todo['date'], 'notes': [], 'todos': []})
+            day['todos'].append(todo)
+        return [agenda[date_str] for date_str in sorted(agenda)]
+    
+    def add_recurring_note(self, title: str, content: str, freq: str, start: date = None,
+                           interval: int = 1, weekdays: List[int] = None, until: date = None,
+                           template_id: str = None) -> Optional[dict]:
+        """
+        添加重复便签，规则只保存一次，不在每个日期写入副本
+        
+        Args:
+            freq: daily、weekly 或 monthly，配合 interval（每 N 个周期）和 weekdays（0 为周一）
+            start: 第一次发生的日期，默认为工作日期
+            until: 最后日期（包含），None 表示一直重复
+            template_id: 作为模板的工作日期便签。规则在工作日期发生时，该便签
+                就是这一天的发生（记为例外），不再另外展开一份
+            
+        Returns:
+            新规则，参数有误时返回 None
+        """
+        rule = self.recurrence.add_rule(title or u"新建便签", content, freq, start or self.working_date,
+                                        interval, weekdays, until)
+        if rule is None:
+            return None
+        template = self.notes.get(template_id) if template_id not in self._virtual else None
+        if template is not None and occurs_on(rule, self.working_date):
+            self.recurrence.add_exception(rule['id'], self.working_date)
+            rule = self.recurrence.get_rule(rule['id'])
+            template['recurrence'] = rule['id']
+            self._dirty.add(template_id)
+            self._save_notes()
+        self._merge_recurring()
+        self._notify_saved()
+        return rule
+    
+    def update_recurring_rule(self, rule_id: str, **fields) -> Optional[dict]:
+        """修改重复规则，已编辑过（转为真实便签）的发生不受影响"""
+        rule = self.recurrence.update_rule(rule_id, **fields)
+        if rule is not None:
+            self._merge_recurring()
+            self._notify_saved()
+        return rule
+    
+    def delete_recurring_rule(self, rule_id: str) -> bool:
+        """删除重复规则，已转为真实便签的发生保留"""
+        if not self.recurrence.remove_rule(rule_id):
+            return False
+        self._merge_recurring()
+        self._notify_saved()
+        return True
+    
+    def list_recurring_rules(self) -> List[dict]:
+        """全部重复规则"""
+        return self.recurrence.list_rules()
+    
+    def backlinks(self, note_id: str, date: date = None) -> List[dict]:
+        """
+        链接到该便签的其他便签（[[日期]] 或 [[标题]]），默认为工作日期的便签
+        
+        Returns:
+            [{'key', 'date', 'id', 'title'}]，日期新的在前
+        """
+        results = []
+        for key in self.link_index.backlinks(self._revision_key(note_id, date)):
+            date_str, source_id = parse_cursor(key)
+            results.append({'key': key, 'date': date_str, 'id': source_id, 'title': self.search_index.title(key)})
+        return results
+    
+    def resolve_link(self, text: str) -> Optional[tuple]:
+        """
+        解析 [[链接]] 的文字
+        
+        Returns:
+            (日期, 便签ID)；链接到日期时便签ID为 None，找不到同名便签时返回 None
+        """
+        target = link_target(text)
+        if target.startswith("date:"):
+            try:
+                return date.fromisoformat(target[len("date:"):]), None
+            except ValueError:
+                return None
+        keys = self.link_index.resolve_title(text)
+        if not keys:
+            return None
+        date_str, note_id = parse_cursor(keys[0])
+        return date.fromisoformat(date_str), note_id
+    
+    def rebuild_tag_index(self) -> int:
+        """从全部便签重建标签和待办索引，返回有标签或待办的便签数"""
+        return self.tag_index.rebuild()
+    
+    def close(self):
+        """退出前写入尚未落盘的修订历史和索引"""
+        self.revisions.flush()
+        self.search_index.flush()
+    
+    def get_day_summaries(self, start: date = None, end: date = None) -> Dict[str, dict]:
+        """
+        获取范围内每个日期的便签摘要（数量、标题、更新时间等）
+        
+        重复便签按规则展开到范围内的每次发生并计入摘要；省略首尾时
+        只展开到已有便签的最早和最晚日期。
+        """
+        summaries = self.storage.get_day_summaries(start, end)
+        if not self.recurrence.rules:
+            return summaries
+        start = start or (date.fromisoformat(min(summaries)) if summaries else None)
+        end = end or (date.fromisoformat(max(summaries)) if summaries else None)
+        if start is None or end is None:
+            return summaries
+        for date_str, notes in self.recurrence.expand_range(start, end).items():
+            summary = summaries.get(date_str)
+            summary = dict(summary) if summary is not None else {
+                'count': 0, 'titles': [], 'updated_at': '', 'chars': 0, 'notes': []
+            }
+            summary['notes'] = list(summary.get('notes', ()))
+            summary['titles'] = list(summary.get('titles', ()))
+            existing = {meta['id'] for meta in summary['notes']}
+            for note_id, note in notes.items():
+                if note_id in existing:
+                    continue
+                meta = note_meta(note_id, note)
+                summary['notes'].append(meta)
+                summary['titles'].append(meta['title'])
+                summary['count'] += 1
+                summary['chars'] = summary.get('chars', 0) + meta['chars']
+                summary['updated_at'] = max(summary.get('updated_at', ''), meta['updated_at'])
+            summaries[date_str] = summary
+        return dict(sorted(summaries.items()))
     
     def get_daily_notes(self, date: datetime = None) -> List[dict]:
         """获取指定日期的便签"""
         notes = self.storage.get_daily_notes(date)
         return list(notes.values())
     
+    def get_daily_meta(self, date: date = None) -> List[dict]:
+        """获取指定日期（默认为工作日期）各便签的标题、时间等元数据，不读取正文"""
+        date = date or self.working_date
+        if date == self.working_date:
+            return [note_meta(note_id, note) for note_id, note in self.notes.items()]
+        meta = self.storage.get_daily_meta(date)
+        for note_id, note in self.recurrence.expand_day(date).items():
+            if note_id not in meta:
+                meta[note_id] = note_meta(note_id, note)
+        return list(meta.values())
+    
+    def load_note(self, note_id: str, date: date = None) -> Optional[dict]:
+        """
+        打开便签时按需加载完整内容
+        
+        工作日期的便签已在内存中；其他日期只读取该便签的正文，
+        尚未编辑过的重复便签由规则展开。
+        """
+        if date is None or date == self.working_date:
+            return self.notes.get(note_id)
+        meta = self.storage.get_daily_meta(date).get(note_id)
+        if meta is None:
+            return self.recurrence.expand_day(date).get(note_id)
+        note = {key: value for key, value in meta.items() if key != 'chars'}
+        note['content'] = self.storage.get_note_body(date, note_id) or ''
+        uid = self.registry.uid_for(self._revision_key(note_id, date))
+        if uid is not None:
+            note['uid'] = uid
+        return note
+    
     def get_all_notes(self):
-        """获取所有便签"""
-        return self.storage.get_all_notes()
\ No newline at end of file
+        """获取所有便签（一次性载入内存，大量历史数据请使用 iter_notes）"""
+        return self.storage.get_all_notes()
+    
+    def iter_notes(self, start: date = None, end: date = None, limit: int = None,
+                   offset: int = 0, cursor: str = None) -> Iterator[dict]:
+        """按日期顺序惰性遍历便签，支持日期范围、limit/offset 和游标"""
+        return self.storage.iter_notes(start, end, limit, offset, cursor)
\ No newline at end of file
@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QTreeWidget, QTreeWidgetItem, QLabel
+)
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt, pyqtSignal
+try:
+    from ..main.note_manager import NoteManager
+except ImportError:
+    from src.main.note_manager import NoteManager
+
+WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+class AgendaDialog(QDialog):
+    """日程面板：按日期分组列出接下来 N 天的便签和未完成待办"""
+    # 某个日期的便签已保存，参数为 YYYY-MM-DD
+    daySaved = pyqtSignal(str)
+
+    def __init__(self, note_manager: NoteManager, open_note: Callable[[date, str], None], parent=None):
+        """
+        面板不阻塞主窗口；便签保存后只刷新该日期的分组
+
+        Args:
+            note_manager: 便签管理器
+            open_note: 打开便签的函数，参数为 (日期, 便签ID)
+        """
+        super().__init__(parent)
+        self.note_manager = note_manager
+        self.open_note = open_note
+        self.days = note_manager.config_manager.get("agenda.days", 14)
+        # 日期 -> 该日期的分组节点
+        self._day_items: Dict[str, QTreeWidgetItem] = {}
+
+        self.setWindowTitle("日程")
+        self.resize(420, 480)
+        layout = QVBoxLayout(self)
+
+        self.range_label = QLabel()
+        self.range_label.setStyleSheet("QLabel { color: #666; padding: 2px; }")
+        layout.addWidget(self.range_label)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.setStyleSheet("""
+            QTreeWidget {
+                background-color: white;
+                border: 1px solid #ccc;
+                border-radius: 3px;
+                color: #2c3e50;
+            }
+            QTreeWidget::item {
+                padding: 3px;
+            }
+            QTreeWidget::item:selected {
+                background-color: #d6eaf8;
+            }
+        """)
+        self.tree.itemActivated.connect(self.open_item)
+        layout.addWidget(self.tree)
+
+        # 保存可能发生在其他线程，经信号转到界面线程处理
+        self.daySaved.connect(self.refresh_day)
+        self._listener = self.daySaved.emit
+        self.note_manager.add_save_listener(self._listener)
+        self.refresh()
+
+    def date_range(self):
+        """当前显示的日期范围（包含首尾）"""
+        start = datetime.now().date()
+        return start, start + timedelta(days=max(self.days, 1) - 1)
+
+    def refresh(self):
+        """重新加载整个范围"""
+        start, end = self.date_range()
+        self.range_label.setText(f"{start.isoformat()} 至 {end.isoformat()}")
+        self.tree.clear()
+        self._day_items.clear()
+        for day in self.note_manager.get_agenda(self.days, start):
+            self._insert_day(day)
+
+    def refresh_day(self, date_str: str):
+        """只刷新一个日期的分组，日期不在显示范围内时忽略"""
+        start, end = self.date_range()
+        if not start.isoformat() <= date_str <= end.isoformat():
+            return
+        item = self._day_items.pop(date_str, None)
+        if item is not None:
+            self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(item))
+        agenda = self.note_manager.get_agenda(1, date.fromisoformat(date_str))
+        if agenda:
+            self._insert_day(agenda[0])
+
+    def _insert_day(self, day: dict):
+        """按日期顺序插入一个日期的分组"""
+        date_obj = date.fromisoformat(day['date'])
+        offset = (date_obj - datetime.now().date()).days
+        relative = {0: "今天", 1: "明天", 2: "后天"}.get(offset, f"{offset} 天后")
+        header = QTreeWidgetItem([f"{day['date']} {WEEKDAYS[date_obj.weekday()]} · {relative}"])
+        font = QFont(header.font(0))
+        font.setBold(True)
+        header.setFont(0, font)
+        header.setData(0, Qt.ItemDataRole.UserRole, (day['date'], None))
+
+        note_items = {}
+        for meta in day['notes']:
+            child = QTreeWidgetItem([f"📝 {meta.get('title') or '无标题'}"])
+            child.setData(0, Qt.ItemDataRole.UserRole, (day['date'], meta['id']))
+            header.addChild(child)
+            note_items[meta['id']] = child
+        # 待办列在所属便签下面
+        for todo in day['todos']:
+            child = QTreeWidgetItem([f"☐ {todo['text']}"])
+            child.setData(0, Qt.ItemDataRole.UserRole, (day['date'], todo['id']))
+            note_items.get(todo['id'], header).addChild(child)
+
+        position = sum(1 for date_str in self._day_items if date_str < day['date'])
+        self.tree.insertTopLevelItem(position, header)
+        self.tree.expandItem(header)
+        for index in range(header.childCount()):
+            header.child(index).setExpanded(True)
+        self._day_items[day['date']] = header
+
+    def open_item(self, item: QTreeWidgetItem):
+        """打开便签或待办所在的便签"""
+        date_str, note_id = item.data(0, Qt.ItemDataRole.UserRole)
+        if note_id is not None:
+            self.open_note(date.fromisoformat(date_str), note_id)
+
+    def done(self, result: int):
+        """关闭时取消保存监听"""
+        self.note_manager.remove_save_listener(self._listener)
+        super().done(result)
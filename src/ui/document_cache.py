@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Optional
+from PyQt6.QtGui import QTextDocument
+try:
+    from ..utils.text_buffer import TextBuffer
+except ImportError:
+    from src.utils.text_buffer import TextBuffer
+
+class DocumentCache:
+    def __init__(self, max_chars: int):
+        """
+        已打开便签的 QTextDocument 缓存（最近最少使用淘汰）
+
+        每个便签保留自己的文档、文本缓冲区、光标和滚动位置，切换便签时直接换上
+        缓存的文档，不重新排版，撤销历史也随文档保留。缓存按字符总数限制大小，
+        最近使用的文档（即编辑器当前显示的）不会被淘汰。
+
+        Args:
+            max_chars: 缓存中全部文档的字符总数上限
+        """
+        self.max_chars = max_chars
+        # 便签键 -> {'document', 'buffer', 'cursor', 'scroll'}，最近使用的在末尾
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def total_chars(self) -> int:
+        """缓存中全部文档的字符数"""
+        return sum(entry['document'].characterCount() for entry in self._entries.values())
+
+    def get(self, key: str) -> Optional[dict]:
+        """取出便签的缓存项并标记为最近使用，不存在时返回 None"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, document: QTextDocument, buffer: TextBuffer) -> dict:
+        """缓存便签的文档（替换已有的），并按字符总数淘汰最久未用的文档"""
+        entry = {'document': document, 'buffer': buffer, 'cursor': 0, 'scroll': 0}
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry
+
+    def remove(self, key: str):
+        """移除便签的缓存（便签被删除时）"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+
+    def _evict(self):
+        """超出上限时从最久未用的开始淘汰，至少保留最近使用的一个"""
+        total = self.total_chars()
+        while total > self.max_chars and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry['document'].characterCount()
@@ -2,37 +2,85 @@ from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QTextEdit, QLineEdit, QMessageBox, QPushButton,
     QMenu, QListWidget, QListWidgetItem, QApplication,
-    QCalendarWidget, QDialog, QLabel, QSplitter, QFontDialog
+    QCalendarWidget, QDialog, QLabel, QSplitter, QFontDialog, QProgressDialog
 )
-from PyQt6.QtGui import QIcon, QColor, QPixmap, QFont
-from PyQt6.QtCore import Qt, QPoint, QTimer, QDate, QTime
+from PyQt6.QtGui import (
+    QIcon, QColor, QPixmap, QFont, QKeySequence, QSyntaxHighlighter, QTextCharFormat, QTextCursor,
+    QTextDocument
+)
+from PyQt6.QtCore import Qt, QPoint, QTimer, QDate, QTime, pyqtSignal
 try:
     from ..main.note_manager import NoteManager
-    from ..utils.note_storage import NoteStorage
     from .color_dialog import ColorDialog
+    from .note_calendar import NoteCalendarWidget
+    from .search_dialog import SearchDialog
+    from .agenda_dialog import AgendaDialog
+    from .recurrence_dialog import RecurrenceDialog
+    from .document_cache import DocumentCache
+    from ..utils.link_index import LINK_PATTERN, link_at
+    from ..utils.text_buffer import TextBuffer, utf16_length
 except ImportError:
     # 当直接运行此文件时使用绝对导入
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
     from src.main.note_manager import NoteManager
-    from src.utils.note_storage import NoteStorage
     from src.ui.color_dialog import ColorDialog
+    from src.ui.note_calendar import NoteCalendarWidget
+    from src.ui.search_dialog import SearchDialog
+    from src.ui.agenda_dialog import AgendaDialog
+    from src.ui.recurrence_dialog import RecurrenceDialog
+    from src.ui.document_cache import DocumentCache
+    from src.utils.link_index import LINK_PATTERN, link_at
+    from src.utils.text_buffer import TextBuffer, utf16_length
 from datetime import datetime, timedelta
 import os
-import markdown
+import html
+
+class LinkHighlighter(QSyntaxHighlighter):
+    """把 [[链接]] 显示为蓝色下划线，只处理变化的文本块"""
+    def __init__(self, document):
+        super().__init__(document)
+        self.link_format = QTextCharFormat()
+        self.link_format.setForeground(QColor("#2980b9"))
+        self.link_format.setFontUnderline(True)
+    
+    def highlightBlock(self, text):
+        if '[[' not in text:
+            return
+        for match in LINK_PATTERN.finditer(text):
+            self.setFormat(match.start(), match.end() - match.start(), self.link_format)
 
 class MarkdownEditor(QTextEdit):
     """文本编辑器"""
+    # Ctrl+单击 [[链接]] 时发出，参数为链接文字
+    linkActivated = pyqtSignal(str)
+    # 用户编辑了内容时发出（载入文档时不发出）
+    contentEdited = pyqtSignal()
+    # 开始分块粘贴时发出，粘贴结束后另有一次 contentEdited
+    pasteStarted = pyqtSignal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAcceptRichText(False)  # 只接受纯文本
+        self.setMouseTracking(True)
         
         # 设置字体
         font = self.font()
         font.setFamily("Consolas")  # 使用等宽字体
         font.setPointSize(11)
         self.setFont(font)
+        
+        # 按文档的增量维护纯文本，避免每次按键都调用 toPlainText 复制整个文档
+        self.buffer = TextBuffer()
+        self.set_document(*self.create_document(""))
+        
+        # 大段粘贴分块插入的块大小，以及便签大小的提示上限（0 为不提示）
+        self.paste_chunk_chars = 200000
+        self.soft_limit_chars = 0
+        # 分块粘贴进行中，期间不发出 contentEdited，粘贴完成后发出一次
+        self.pasting = False
+        self._paste_cancelled = False
     
     def keyPressEvent(self, event):
         """处理按键事件"""
@@ -57,6 +105,156 @@ class MarkdownEditor(QTextEdit):
                 self.insertPlainText(indent)
         else:
             super().keyPressEvent(event)
+    
+    def create_document(self, text: str):
+        """为便签内容创建独立的文档（带链接高亮）和对应的文本缓冲区"""
+        document = QTextDocument()
+        document.setDefaultFont(self.font())
+        document.setPlainText(text)
+        # 高亮器属于文档，换回缓存的文档时不需要重新高亮
+        LinkHighlighter(document)
+        return document, TextBuffer(text)
+    
+    def set_document(self, document: QTextDocument, buffer: TextBuffer):
+        """换上另一个文档，之后的增量更新到它的缓冲区"""
+        old = self.document()
+        if old is document:
+            return
+        try:
+            old.contentsChange.disconnect(self._on_contents_change)
+        except TypeError:
+            # QTextEdit 自带的初始文档没有连接
+            pass
+        # 保持 Python 引用，文档被缓存淘汰后仍可安全显示
+        self._document = document
+        self.buffer = buffer
+        self.setDocument(document)
+        if document.defaultFont() != self.font():
+            # 缓存期间修改过编辑器字体
+            document.setDefaultFont(self.font())
+        document.contentsChange.connect(self._on_contents_change)
+    
+    def plain_text(self) -> str:
+        """当前的纯文本（由缓冲区拼接，与 toPlainText 一致）"""
+        return self.buffer.text()
+    
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        """把文档的一次修改应用到缓冲区，只读取新增的文本"""
+        document = self.document()
+        # 文档末尾有一个隐含的段落分隔符，修改范围可能把它算在内
+        doc_length = document.characterCount() - 1
+        added = max(0, min(added, doc_length - position))
+        removed = len(self.buffer) + added - doc_length
+        try:
+            text = ""
+            if added:
+                cursor = QTextCursor(document)
+                cursor.setPosition(position)
+                cursor.setPosition(position + added, QTextCursor.MoveMode.KeepAnchor)
+                # 与 toPlainText 相同的换行和不换行空格处理
+                text = (cursor.selectedText().replace('\u2029', '\n')
+                        .replace('\u2028', '\n').replace('\u00a0', ' '))
+            self.buffer.apply(position, removed, text)
+        except ValueError:
+            # 增量与缓冲区对不上时退回完整同步
+            self.buffer.reset(self.toPlainText())
+        if not self.pasting:
+            self.contentEdited.emit()
+    
+    def insertFromMimeData(self, source):
+        """粘贴或拖放纯文本：超过提示上限时先确认，大段文本分块插入"""
+        if not source.hasText():
+            super().insertFromMimeData(source)
+            return
+        text = source.text().replace('\r\n', '\n').replace('\r', '\n')
+        cursor = self.textCursor()
+        
+        if self.soft_limit_chars:
+            new_length = len(self.buffer) - (cursor.selectionEnd() - cursor.selectionStart()) + utf16_length(text)
+            if new_length > self.soft_limit_chars:
+                reply = QMessageBox.question(
+                    self,
+                    "便签过大",
+                    f"粘贴后便签将有约 {new_length:,} 个字符，超过建议的 {self.soft_limit_chars:,} 个。\n"
+                    f"过大的便签保存、搜索和切换都会变慢，建议拆分为多个便签。仍要粘贴吗？",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                    QMessageBox.StandardButton.No
+                )
+                if reply != QMessageBox.StandardButton.Yes:
+                    return
+        
+        if len(text) <= self.paste_chunk_chars:
+            super().insertFromMimeData(source)
+            return
+        self._paste_in_chunks(cursor, text)
+    
+    def _paste_in_chunks(self, cursor: QTextCursor, text: str):
+        """
+        分块插入大段文本，每块之后处理事件并更新进度
+        
+        各块合并为一个撤销步骤；粘贴期间编辑器只读，完成（或取消）后才发出一次
+        contentEdited，保存推迟到粘贴结束。粘贴中途被 cancel_paste 结束或换了
+        文档时停止插入，已插入的部分由调用 cancel_paste 的一方保存。
+        """
+        document = self.document()
+        progress = QProgressDialog("正在粘贴…", "取消", 0, len(text), self)
+        progress.setWindowTitle("粘贴")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+        read_only = self.isReadOnly()
+        self.setReadOnly(True)
+        self.pasting = True
+        self._paste_cancelled = False
+        self.pasteStarted.emit()
+        try:
+            for start in range(0, len(text), self.paste_chunk_chars):
+                if progress.wasCanceled() or self._paste_cancelled or self.document() is not document:
+                    break
+                if start == 0:
+                    cursor.beginEditBlock()
+                else:
+                    # 接到上一块的撤销步骤中
+                    cursor.joinPreviousEditBlock()
+                cursor.insertText(text[start:start + self.paste_chunk_chars])
+                cursor.endEditBlock()
+                progress.setValue(min(len(text), start + self.paste_chunk_chars))
+                QApplication.processEvents()
+        finally:
+            self.pasting = False
+            self.setReadOnly(read_only)
+            progress.close()
+        
+        if self.document() is document:
+            self.setTextCursor(cursor)
+            self.ensureCursorVisible()
+            self.contentEdited.emit()
+    
+    def cancel_paste(self):
+        """结束进行中的分块粘贴（处理完当前块后停止）"""
+        self._paste_cancelled = True
+    
+    def link_at_position(self, pos) -> str:
+        """视口坐标处的 [[链接]] 文字，不在链接上时返回 None"""
+        cursor = self.cursorForPosition(pos)
+        return link_at(cursor.block().text(), cursor.positionInBlock())
+    
+    def mouseMoveEvent(self, event):
+        """按住 Ctrl 指向链接时显示手形光标"""
+        on_link = (event.modifiers() & Qt.KeyboardModifier.ControlModifier and
+                   self.link_at_position(event.position().toPoint()) is not None)
+        self.viewport().setCursor(Qt.CursorShape.PointingHandCursor if on_link else Qt.CursorShape.IBeamCursor)
+        super().mouseMoveEvent(event)
+    
+    def mouseReleaseEvent(self, event):
+        """Ctrl+单击链接时打开链接"""
+        if (event.button() == Qt.MouseButton.LeftButton and
+                event.modifiers() & Qt.KeyboardModifier.ControlModifier and
+                not self.textCursor().hasSelection()):
+            text = self.link_at_position(event.position().toPoint())
+            if text is not None:
+                self.linkActivated.emit(text)
+                return
+        super().mouseReleaseEvent(event)
 
 class MainWindow(QMainWindow):
     def __init__(self, note_manager: NoteManager):
@@ -65,6 +263,20 @@ class MainWindow(QMainWindow):
         self.config_manager = note_manager.config_manager
         self.current_note = None  # 添加当前便签的引用
         
+        # 编辑标题或内容时只重新计时，停止输入后才取出完整文本保存
+        self._pending_note_id = None
+        self._pending_title = None
+        self._pending_content = False
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(self.config_manager.get("editor.save_delay_ms", 500))
+        self.save_timer.timeout.connect(self.flush_pending_edit)
+        
+        # 每个打开过的便签一个文档，切换便签时直接换上
+        self.document_cache = DocumentCache(self.config_manager.get("editor.document_cache_chars", 4000000))
+        self._document_key = None
+        self.agenda_dialog = None  # 非模态的日程面板
+        
         # 从配置加载颜色
         self.colors = {
             "editor_bg": QColor(self.config_manager.get("colors.editor_bg", "#ffffff")),
@@ -242,6 +454,34 @@ class MainWindow(QMainWindow):
         self.list_button.clicked.connect(self.show_notes_list)
         title_container.addWidget(self.list_button)
         
+        # 搜索按钮（Ctrl+F）
+        self.search_button = QPushButton()
+        search_icon = QIcon.fromTheme("edit-find")
+        if search_icon.isNull():
+            self.search_button.setText("🔍")
+        else:
+            self.search_button.setIcon(search_icon)
+        self.search_button.setToolTipDuration(2000)
+        self.search_button.setToolTip("搜索所有便签 (Ctrl+F)")
+        self.search_button.setFixedSize(24, 24)
+        self.search_button.setShortcut(QKeySequence("Ctrl+F"))
+        self.search_button.clicked.connect(self.show_search)
+        title_container.addWidget(self.search_button)
+        
+        # 日程按钮（Ctrl+G）
+        self.agenda_button = QPushButton()
+        agenda_icon = QIcon.fromTheme("x-office-calendar")
+        if agenda_icon.isNull():
+            self.agenda_button.setText("📅")
+        else:
+            self.agenda_button.setIcon(agenda_icon)
+        self.agenda_button.setToolTipDuration(2000)
+        self.agenda_button.setToolTip("接下来几天的便签和待办 (Ctrl+G)")
+        self.agenda_button.setFixedSize(24, 24)
+        self.agenda_button.setShortcut(QKeySequence("Ctrl+G"))
+        self.agenda_button.clicked.connect(self.show_agenda)
+        title_container.addWidget(self.agenda_button)
+        
         # 添加弹簧，使标题区域靠左
         title_container.addStretch()
         
@@ -274,6 +514,14 @@ class MainWindow(QMainWindow):
         self.delete_button.clicked.connect(self.delete_note)
         right_buttons.addWidget(self.delete_button)
         
+        # 重复按钮
+        self.repeat_button = QPushButton("🔁")
+        self.repeat_button.setToolTipDuration(2000)
+        self.repeat_button.setToolTip("设为重复便签")
+        self.repeat_button.setFixedSize(24, 24)
+        self.repeat_button.clicked.connect(self.show_recurrence)
+        right_buttons.addWidget(self.repeat_button)
+        
         # 设置按钮
         self.settings_button = QPushButton()
         self.settings_button.setIcon(QIcon("resources/icons/settings.png"))
@@ -322,9 +570,22 @@ class MainWindow(QMainWindow):
         
         # 编辑器
         self.note_edit = MarkdownEditor()
-        self.note_edit.textChanged.connect(self.on_text_changed)
+        self.note_edit.contentEdited.connect(self.on_text_changed)
+        self.note_edit.pasteStarted.connect(self.on_paste_started)
+        self.note_edit.linkActivated.connect(self.follow_link)
+        self.note_edit.paste_chunk_chars = self.config_manager.get("editor.paste_chunk_chars", 200000)
+        self.note_edit.soft_limit_chars = self.config_manager.get("editor.soft_limit_chars", 1000000)
         edit_layout.addWidget(self.note_edit)
         
+        # 反向链接：链接到当前便签的其他便签
+        self.backlinks_label = QLabel()
+        self.backlinks_label.setTextFormat(Qt.TextFormat.RichText)
+        self.backlinks_label.setWordWrap(True)
+        self.backlinks_label.setStyleSheet("QLabel { color: #666; padding: 4px; border-top: 1px solid #eee; }")
+        self.backlinks_label.linkActivated.connect(self.open_backlink)
+        self.backlinks_label.hide()
+        edit_layout.addWidget(self.backlinks_label)
+        
         # 添加到主布局
         layout.addWidget(edit_container)
         
@@ -445,15 +706,17 @@ class MainWindow(QMainWindow):
     
     def create_note(self):
         """创建新便签"""
+        self.flush_pending_edit()
         note = self.note_manager.create_note(u"新建便签")
         self.current_note = note
         self.title_edit.setText(note['title'])
-        self.note_edit.clear()
+        self.show_note_document(note)
     
     def delete_note(self):
         """删除当前便签"""
         if not self.current_note:
             return
+        self.flush_pending_edit()
         
         reply = QMessageBox.question(
             self,
@@ -472,6 +735,7 @@ class MainWindow(QMainWindow):
             
             # 删除便签
             if self.note_manager.delete_note(note_id):
+                self.document_cache.remove(self.document_key(self.current_note))
                 # 重新加载当前日期的便签
                 self.note_manager._load_notes()
                 notes = self.note_manager.notes
@@ -518,13 +782,10 @@ class MainWindow(QMainWindow):
             }
         """)
         
-        # 获取当前日期的便签
-        notes = self.note_manager.notes
-        
-        # 添加便签到列表
-        for note_id, note in notes.items():
-            item = QListWidgetItem(note.get('title', '无标题'))
-            item.setData(Qt.ItemDataRole.UserRole, note)
+        # 列表只需要标题，正文在打开时再加载
+        for meta in self.note_manager.get_daily_meta():
+            item = QListWidgetItem(meta.get('title', '无标题'))
+            item.setData(Qt.ItemDataRole.UserRole, meta['id'])
             list_widget.addItem(item)
         
         layout.addWidget(list_widget)
@@ -536,8 +797,8 @@ class MainWindow(QMainWindow):
         open_button = QPushButton("打开")
         def open_selected_note():
             if list_widget.currentItem():
-                note = list_widget.currentItem().data(Qt.ItemDataRole.UserRole)
-                self.current_note = note
+                note_id = list_widget.currentItem().data(Qt.ItemDataRole.UserRole)
+                self.current_note = self.note_manager.load_note(note_id)
                 self.update_ui()
                 dialog.accept()
         open_button.clicked.connect(open_selected_note)
@@ -559,6 +820,45 @@ class MainWindow(QMainWindow):
         
         dialog.exec()
     
+    def show_search(self):
+        """显示全文搜索对话框"""
+        dialog = SearchDialog(self.note_manager, self.open_note, self)
+        dialog.exec()
+    
+    def show_recurrence(self):
+        """以当前便签为模板设置重复规则"""
+        self.flush_pending_edit()
+        dialog = RecurrenceDialog(self.note_manager, self.current_note, self)
+        dialog.exec()
+        # 规则变化后工作日期的虚拟便签可能增减
+        if self.current_note and self.current_note.get('id') not in self.note_manager.notes:
+            self.current_note = next(iter(self.note_manager.notes.values()), None)
+            self.update_ui()
+    
+    def show_agenda(self):
+        """显示日程面板（不阻塞编辑，已打开时切到前台）"""
+        if self.agenda_dialog is None or not self.agenda_dialog.isVisible():
+            self.agenda_dialog = AgendaDialog(self.note_manager, self.open_note, self)
+            self.agenda_dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            self.agenda_dialog.destroyed.connect(lambda: setattr(self, 'agenda_dialog', None))
+        self.agenda_dialog.show()
+        self.agenda_dialog.raise_()
+        self.agenda_dialog.activateWindow()
+    
+    def open_note(self, date_obj, note_id: str):
+        """切换到指定日期并打开其中的便签（历史日期只读）"""
+        self.set_working_date(date_obj)
+        is_history = date_obj < datetime.now().date()
+        self.note_edit.setReadOnly(is_history)
+        self.title_edit.setReadOnly(is_history)
+        
+        note = self.note_manager.load_note(note_id)
+        if note is None:
+            QMessageBox.information(self, "提示", "该便签已不存在")
+            return
+        self.current_note = note
+        self.update_ui()
+    
     def show_calendar(self):
         """显示日历对话框"""
         dialog = QDialog(self)
@@ -567,8 +867,8 @@ class MainWindow(QMainWindow):
         
         layout = QVBoxLayout(dialog)
         
-        # 日历控件
-        calendar = QCalendarWidget()
+        # 日历控件（根据便签清单标记有便签的日期）
+        calendar = NoteCalendarWidget(self.note_manager.get_day_summaries)
         # 移除最小日期限制，允许查看历史便签
         # calendar.setMinimumDate(datetime.now().date())
         
@@ -586,14 +886,17 @@ class MainWindow(QMainWindow):
             selected_date = date.toPyDate()
             current_date = datetime.now().date()
             
+            summary = calendar.summary_for(date)
+            note_info = f" · {summary['count']} 个便签" if summary else ""
+            
             if selected_date > current_date:
-                date_label.setText("未来日期 - 可以创建新便签")
+                date_label.setText("未来日期 - 可以创建新便签" + note_info)
                 date_label.setStyleSheet("QLabel { color: #27ae60; }")  # 绿色
             elif selected_date < current_date:
-                date_label.setText("历史日期 - 仅可查看")
+                date_label.setText("历史日期 - 仅可查看" + note_info)
                 date_label.setStyleSheet("QLabel { color: #e74c3c; }")  # 红色
             else:
-                date_label.setText("当前日期")
+                date_label.setText("当前日期" + note_info)
                 date_label.setStyleSheet("QLabel { color: #2980b9; }")  # 蓝色
         
         # 连接日期变化信号
@@ -649,6 +952,7 @@ class MainWindow(QMainWindow):
     
     def set_working_date(self, date_obj):
         """设置工作日期并更新显示"""
+        self.flush_pending_edit()
         self.note_manager.set_working_date(date_obj)
         # 更新日期按钮显示为工作日期
         self.date_button.setText(date_obj.strftime("%Y-%m-%d"))
@@ -668,8 +972,7 @@ class MainWindow(QMainWindow):
         self.note_edit.setReadOnly(is_history)
         self.title_edit.setReadOnly(is_history)
         
-        # 加载便签
-        self.note_manager._load_notes()  # 重新加载当前工作日期的便签
+        # set_working_date 已加载该日期的便签
         notes = self.note_manager.notes
         
         if not notes:
@@ -696,7 +999,9 @@ class MainWindow(QMainWindow):
     
     def load_notes_for_date(self, date):
         """加载指定日期的便签"""
-        notes = self.note_manager.get_daily_notes(date.toPyDate())
+        date_obj = date.toPyDate()
+        # 菜单只需要标题和创建时间，选中后再加载正文
+        notes = self.note_manager.get_daily_meta(date_obj)
         if notes:
             # 示该日期便签列表
             menu = QMenu(self)
@@ -704,7 +1009,9 @@ class MainWindow(QMainWindow):
             
             for note in sorted(notes, key=lambda x: x.get('created_at', ''), reverse=True):
                 action = menu.addAction(note.get('title', '无标题'))
-                action.triggered.connect(lambda checked, n=note: self.switch_to_note(n))
+                action.triggered.connect(
+                    lambda checked, note_id=note['id']: self.switch_to_note(self.note_manager.load_note(note_id, date_obj))
+                )
             
             # 在列表按钮位置示菜单
             button_pos = self.list_button.mapToGlobal(QPoint(0, self.list_button.height()))
@@ -720,6 +1027,8 @@ class MainWindow(QMainWindow):
     
     def update_ui(self):
         """更新界面显示"""
+        # 编辑器中仍是上一个便签的内容，先保存
+        self.flush_pending_edit()
         if self.current_note and 'id' in self.current_note:
             # 暂时断开信号连接，避免触发更新
             self.title_edit.blockSignals(True)
@@ -730,31 +1039,112 @@ class MainWindow(QMainWindow):
                 self.title_edit.setText(self.current_note.get('title', ''))
                 
                 # 更新内容
-                content = self.current_note.get('content', '')
-                self.note_edit.setPlainText(content)
-                
-                # 将光标移到开始位置
-                cursor = self.note_edit.textCursor()
-                cursor.movePosition(cursor.MoveOperation.Start)  # 使用正确的枚举值
-                self.note_edit.setTextCursor(cursor)
+                self.show_note_document(self.current_note)
             finally:
                 # 恢复信号连接
                 self.title_edit.blockSignals(False)
                 self.note_edit.blockSignals(False)
+        self.update_backlinks()
+    
+    def document_key(self, note: dict) -> str:
+        """便签在文档缓存中的键（日期_便签ID）"""
+        date_str = note.get('date') or self.note_manager.working_date.strftime('%Y-%m-%d')
+        return f"{date_str}_{note['id']}"
+    
+    def show_note_document(self, note: dict):
+        """
+        在编辑器中显示便签：换上缓存的文档并恢复光标和滚动位置，
+        没有缓存或内容已在别处改变（如恢复修订）时新建文档
+        """
+        scroll_bar = self.note_edit.verticalScrollBar()
+        # 记下当前文档的位置，换回来时恢复
+        previous = self.document_cache.get(self._document_key) if self._document_key else None
+        if previous is not None and previous['document'] is self.note_edit.document():
+            previous['cursor'] = self.note_edit.textCursor().position()
+            previous['scroll'] = scroll_bar.value()
+        
+        key = self.document_key(note)
+        content = note.get('content', '')
+        entry = self.document_cache.get(key)
+        if entry is None or entry['buffer'].text() != content:
+            entry = self.document_cache.put(key, *self.note_edit.create_document(content))
+        self._document_key = key
+        self.note_edit.set_document(entry['document'], entry['buffer'])
+        
+        cursor = self.note_edit.textCursor()
+        cursor.setPosition(min(entry['cursor'], entry['document'].characterCount() - 1))
+        self.note_edit.setTextCursor(cursor)
+        scroll_bar.setValue(entry['scroll'])
+    
+    def update_backlinks(self):
+        """显示链接到当前便签的其他便签（来自反向链接索引）"""
+        backlinks = []
+        if self.current_note and 'id' in self.current_note:
+            backlinks = self.note_manager.backlinks(self.current_note['id'])
+        if not backlinks:
+            self.backlinks_label.hide()
+            return
+        links = [
+            f"<a href='{link['date']}|{link['id']}'>{html.escape(link['title'] or '无标题')}</a>"
+            f"<span style='color:#aaa'> {link['date']}</span>"
+            for link in backlinks
+        ]
+        self.backlinks_label.setText("反向链接：" + " · ".join(links))
+        self.backlinks_label.show()
+    
+    def open_backlink(self, href: str):
+        """打开反向链接指向的便签"""
+        date_str, _, note_id = href.partition('|')
+        self.open_note(datetime.strptime(date_str, '%Y-%m-%d').date(), note_id)
+    
+    def follow_link(self, text: str):
+        """打开 [[链接]]：日期链接打开该日期，标题链接打开最近的同名便签"""
+        target = self.note_manager.resolve_link(text)
+        if target is None:
+            QMessageBox.information(self, "提示", f"没有找到标题为“{text}”的便签")
+            return
+        date_obj, note_id = target
+        if note_id is None:
+            self.open_notes_file(QDate(date_obj.year, date_obj.month, date_obj.day))
+        else:
+            self.open_note(date_obj, note_id)
     
     def on_title_changed(self, text):
-        """当标题改变时"""
+        """当标题改变时：记下新标题，与内容一起按计时保存"""
         if self.current_note and 'id' in self.current_note:
-            self.note_manager.update_note(self.current_note['id'], title=text)
+            self._pending_note_id = self.current_note['id']
+            self._pending_title = text
+            self.save_timer.start()
     
     def on_text_changed(self):
-        """当内容改变时"""
+        """当内容改变时：编辑器已增量更新缓冲区，这里只重新开始保存计时"""
         if self.current_note and 'id' in self.current_note:
-            content = self.note_edit.toPlainText()  # 使用 toPlainText
-            self.note_manager.update_note(
-                self.current_note['id'],
-                content=content
-            )
+            self._pending_note_id = self.current_note['id']
+            self._pending_content = True
+            self.save_timer.start()
+    
+    def on_paste_started(self):
+        """分块粘贴开始：记下粘贴到的便签，粘贴期间不按计时保存"""
+        if self.current_note and 'id' in self.current_note:
+            self._pending_note_id = self.current_note['id']
+            self._pending_content = True
+        self.save_timer.stop()
+    
+    def flush_pending_edit(self):
+        """保存尚未保存的编辑，此时才拼接完整文本"""
+        if self.note_edit.pasting:
+            # 粘贴中途切换便签或关闭窗口：结束粘贴，先保存已插入的部分，
+            # 之后编辑器就会换上别的文档
+            self.note_edit.cancel_paste()
+        self.save_timer.stop()
+        note_id = self._pending_note_id
+        if note_id is None:
+            return
+        title, self._pending_title = self._pending_title, None
+        content = self.note_edit.plain_text() if self._pending_content else None
+        self._pending_note_id = None
+        self._pending_content = False
+        self.note_manager.update_note(note_id, title=title, content=content)
     
     def show_settings(self):
         """显示设置窗口"""
@@ -777,8 +1167,12 @@ class MainWindow(QMainWindow):
     def update_date_button(self):
         """更新日期按钮显示"""
         current_date = datetime.now()
+        if self.note_edit.pasting:
+            # 分块粘贴期间不切换日期，下次再检查
+            return
         
-        # 检查日期变化
+        # 检查日期变化（先保存未保存的编辑，日期变化会切换工作日期）
+        self.flush_pending_edit()
         if self.note_manager.check_date_change():
             # 如果日期已变化，更新显示并创建新便签
             self.date_button.setText(current_date.strftime("%Y-%m-%d"))
@@ -947,6 +1341,8 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         """关闭窗口时的处理"""
         self.is_closing = True
+        self.flush_pending_edit()
+        self.note_manager.close()
         if hasattr(self, 'idle_screen'):
             self.idle_screen.close()  # 关闭待机界面
         event.accept()
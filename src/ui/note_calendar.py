@@ -0,0 +1,69 @@
+import math
+from datetime import date, timedelta
+from typing import Callable, Dict
+from PyQt6.QtWidgets import QCalendarWidget
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtCore import Qt, QDate, QRect
+
+# 热力图的正文字数分级（对数刻度），超过最后一级按最深色显示
+HEAT_LEVELS = 4
+
+class NoteCalendarWidget(QCalendarWidget):
+    """带便签标记和密度热力图的日历"""
+    def __init__(self, summary_provider: Callable[[date, date], Dict[str, dict]], parent=None):
+        """
+        Args:
+            summary_provider: 按日期范围返回 {日期: 摘要} 的函数，
+                摘要来自预先计算的清单，不应读取每日文件
+        """
+        super().__init__(parent)
+        self.summary_provider = summary_provider
+        self.summaries: Dict[str, dict] = {}
+        self.heat_color = QColor("#3498db")
+        self.past_marker_color = QColor("#2980b9")
+        self.future_marker_color = QColor("#27ae60")
+        self.currentPageChanged.connect(lambda year, month: self.refresh())
+        self.refresh()
+
+    def refresh(self):
+        """重新读取当前页面可见日期的摘要并重绘"""
+        first = date(self.yearShown(), self.monthShown(), 1)
+        # 日历页面会显示上月末和下月初的若干天
+        start = first - timedelta(days=7)
+        end = first + timedelta(days=31 + 14)
+        self.summaries = self.summary_provider(start, end)
+        self.updateCells()
+
+    def summary_for(self, qdate: QDate) -> dict:
+        """获取指定日期的摘要，没有便签时返回 None"""
+        return self.summaries.get(qdate.toString("yyyy-MM-dd"))
+
+    def heat_level(self, summary: dict) -> int:
+        """根据正文字数计算热力等级（1 到 HEAT_LEVELS）"""
+        chars = summary.get('chars', 0)
+        return max(1, min(HEAT_LEVELS, int(math.log10(chars + 1))))
+
+    def paintCell(self, painter: QPainter, rect: QRect, qdate: QDate):
+        """在默认绘制的基础上叠加热力背景和便签标记"""
+        super().paintCell(painter, rect, qdate)
+        summary = self.summary_for(qdate)
+        if not summary:
+            return
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # 按便签量加深背景
+        heat = QColor(self.heat_color)
+        heat.setAlpha(30 + 35 * (self.heat_level(summary) - 1))
+        painter.fillRect(rect.adjusted(1, 1, -1, -1), heat)
+
+        # 右上角圆点：未来计划为绿色，其余为蓝色
+        is_future = qdate.toPyDate() > date.today()
+        marker = self.future_marker_color if is_future else self.past_marker_color
+        radius = 3
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(marker)
+        painter.drawEllipse(rect.right() - 3 * radius, rect.top() + radius, 2 * radius, 2 * radius)
+
+        painter.restore()
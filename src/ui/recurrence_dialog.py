@@ -0,0 +1,144 @@
+from datetime import date
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit, QComboBox,
+    QSpinBox, QCheckBox, QDateEdit, QListWidget, QListWidgetItem, QPushButton,
+    QLabel, QMessageBox, QWidget
+)
+from PyQt6.QtCore import Qt, QDate
+try:
+    from ..main.note_manager import NoteManager
+    from ..utils.recurrence import describe
+except ImportError:
+    from src.main.note_manager import NoteManager
+    from src.utils.recurrence import describe
+
+# 下拉框中的频率：(显示文字, 规则中的 freq, 间隔单位)
+FREQUENCY_CHOICES = [("每天", "daily", "天"), ("每周", "weekly", "周"), ("每月", "monthly", "个月")]
+
+class RecurrenceDialog(QDialog):
+    """重复便签对话框：把当前便签设为重复，并管理已有的重复规则"""
+
+    def __init__(self, note_manager: NoteManager, note: dict = None, parent=None):
+        """
+        Args:
+            note_manager: 便签管理器
+            note: 作为模板的便签（标题和内容），为空时新建空白规则
+        """
+        super().__init__(parent)
+        self.note_manager = note_manager
+        self.note = note or {}
+
+        self.setWindowTitle("重复便签")
+        self.resize(400, 440)
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        self.title_edit = QLineEdit(self.note.get('title', ''))
+        form.addRow("标题", self.title_edit)
+
+        self.freq_combo = QComboBox()
+        for label, _, _ in FREQUENCY_CHOICES:
+            self.freq_combo.addItem(label)
+        self.freq_combo.currentIndexChanged.connect(self.on_freq_changed)
+        form.addRow("重复", self.freq_combo)
+
+        # 间隔：每 N 天/周/月，用于自定义的重复周期
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setRange(1, 365)
+        self.interval_spin.setPrefix("每 ")
+        form.addRow("间隔", self.interval_spin)
+
+        self.weekday_row = QWidget()
+        weekday_layout = QHBoxLayout(self.weekday_row)
+        weekday_layout.setContentsMargins(0, 0, 0, 0)
+        self.weekday_checks = []
+        for name in "一二三四五六日":
+            check = QCheckBox(name)
+            weekday_layout.addWidget(check)
+            self.weekday_checks.append(check)
+        form.addRow("星期", self.weekday_row)
+
+        working_date = note_manager.working_date
+        self.start_edit = QDateEdit(QDate(working_date.year, working_date.month, working_date.day))
+        self.start_edit.setCalendarPopup(True)
+        self.start_edit.setDisplayFormat("yyyy-MM-dd")
+        self.start_edit.dateChanged.connect(self.on_freq_changed)
+        form.addRow("开始", self.start_edit)
+
+        until_row = QHBoxLayout()
+        self.until_check = QCheckBox("结束于")
+        self.until_edit = QDateEdit(self.start_edit.date().addMonths(1))
+        self.until_edit.setCalendarPopup(True)
+        self.until_edit.setDisplayFormat("yyyy-MM-dd")
+        self.until_edit.setEnabled(False)
+        self.until_check.toggled.connect(self.until_edit.setEnabled)
+        until_row.addWidget(self.until_check)
+        until_row.addWidget(self.until_edit)
+        form.addRow("", until_row)
+        layout.addLayout(form)
+
+        layout.addWidget(QLabel("已有的重复规则"))
+        self.rule_list = QListWidget()
+        layout.addWidget(self.rule_list)
+
+        button_layout = QHBoxLayout()
+        self.delete_button = QPushButton("删除规则")
+        self.delete_button.clicked.connect(self.delete_rule)
+        button_layout.addWidget(self.delete_button)
+        button_layout.addStretch()
+        add_button = QPushButton("添加")
+        add_button.clicked.connect(self.add_rule)
+        button_layout.addWidget(add_button)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.on_freq_changed()
+        self.refresh_rules()
+
+    def on_freq_changed(self, *args):
+        """切换频率时更新间隔单位，并只在每周重复时显示星期"""
+        _, freq, unit = FREQUENCY_CHOICES[self.freq_combo.currentIndex()]
+        self.interval_spin.setSuffix(f" {unit}")
+        self.weekday_row.setVisible(freq == "weekly")
+        if freq == "weekly" and not any(check.isChecked() for check in self.weekday_checks):
+            self.weekday_checks[self.start_edit.date().toPyDate().weekday()].setChecked(True)
+
+    def refresh_rules(self):
+        """刷新已有规则列表"""
+        self.rule_list.clear()
+        for rule in self.note_manager.list_recurring_rules():
+            item = QListWidgetItem(f"{rule['title'] or '无标题'} — {describe(rule)}，从 {rule['start']} 开始")
+            item.setData(Qt.ItemDataRole.UserRole, rule['id'])
+            self.rule_list.addItem(item)
+        self.delete_button.setEnabled(self.rule_list.count() > 0)
+
+    def add_rule(self):
+        """按表单添加重复规则"""
+        _, freq, _ = FREQUENCY_CHOICES[self.freq_combo.currentIndex()]
+        weekdays = [index for index, check in enumerate(self.weekday_checks) if check.isChecked()]
+        start: date = self.start_edit.date().toPyDate()
+        until = self.until_edit.date().toPyDate() if self.until_check.isChecked() else None
+        rule = self.note_manager.add_recurring_note(
+            self.title_edit.text(), self.note.get('content', ''), freq, start,
+            self.interval_spin.value(), weekdays if freq == "weekly" else None, until,
+            template_id=self.note.get('id')
+        )
+        if rule is None:
+            QMessageBox.warning(self, "提示", "无法添加重复规则，请检查开始和结束日期")
+            return
+        self.refresh_rules()
+
+    def delete_rule(self):
+        """删除选中的规则，已编辑过的发生会保留"""
+        item = self.rule_list.currentItem()
+        if item is None:
+            return
+        reply = QMessageBox.question(
+            self, "确认删除", "删除该重复规则？已编辑过的便签会保留。",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.note_manager.delete_recurring_rule(item.data(Qt.ItemDataRole.UserRole))
+            self.refresh_rules()
@@ -0,0 +1,206 @@
+import html
+import threading
+from datetime import date
+from typing import Callable, List
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel
+)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+try:
+    from ..main.note_manager import NoteManager
+    from ..utils.search_index import make_snippet
+    from ..utils.note_query import is_structured
+except ImportError:
+    from src.main.note_manager import NoteManager
+    from src.utils.search_index import make_snippet
+    from src.utils.note_query import is_structured
+
+# 停止输入多久后开始搜索（毫秒）
+SEARCH_DELAY_MS = 120
+# 每次搜索最多显示的结果数
+MAX_RESULTS = 100
+# 每凑够多少条结果向界面推送一次
+RESULT_BATCH = 10
+
+def as_you_type_query(text: str) -> str:
+    """边输入边搜索时，把尚未输完的最后一个词当作前缀"""
+    if not text or text[-1].isspace() or text.count('"') % 2:
+        return text
+    last = text.split()[-1]
+    if last.endswith('*') or last.startswith(('#', '-')) or last.endswith('"') or ':' in last:
+        return text
+    return text + '*'
+
+class SearchDialog(QDialog):
+    """跨日期全文搜索对话框：边输入边在后台搜索，结果分批显示"""
+    # (搜索代数, 结果批次)，由后台线程发出，在界面线程处理
+    resultsReady = pyqtSignal(int, list)
+    searchFinished = pyqtSignal(int, int)
+
+    def __init__(self, note_manager: NoteManager, open_note: Callable[[date, str], None], parent=None):
+        """
+        Args:
+            note_manager: 便签管理器
+            open_note: 打开便签的函数，参数为 (日期, 便签ID)
+        """
+        super().__init__(parent)
+        self.note_manager = note_manager
+        self.open_note = open_note
+        # 每次输入变化时递增，后台线程发现代数过期即停止
+        self._generation = 0
+        self._result_count = 0
+
+        self.setWindowTitle("搜索便签")
+        self.resize(480, 420)
+        layout = QVBoxLayout(self)
+
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText('关键词、"短语"、前缀*、#标签、is:todo、date:2025-01..2025-03、-排除')
+        self.query_edit.setClearButtonEnabled(True)
+        layout.addWidget(self.query_edit)
+
+        self.result_list = QListWidget()
+        self.result_list.setStyleSheet("""
+            QListWidget {
+                background-color: white;
+                border: 1px solid #ccc;
+                border-radius: 3px;
+                color: #2c3e50;
+            }
+            QListWidget::item {
+                border-bottom: 1px solid #eee;
+            }
+            QListWidget::item:selected {
+                background-color: #d6eaf8;
+            }
+        """)
+        layout.addWidget(self.result_list)
+
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("QLabel { color: #666; padding: 2px; }")
+        layout.addWidget(self.status_label)
+
+        # 输入时只重启计时器，不在界面线程中搜索
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.start_search)
+        self.query_edit.textChanged.connect(self.on_query_changed)
+        self.query_edit.returnPressed.connect(self.open_current)
+
+        self.resultsReady.connect(self.add_results)
+        self.searchFinished.connect(self.on_search_finished)
+        self.result_list.itemActivated.connect(lambda item: self.open_item(item))
+
+    def on_query_changed(self, text: str):
+        """输入变化：作废正在进行的搜索并重新计时"""
+        self._generation += 1
+        self.search_timer.start()
+
+    def start_search(self):
+        """在后台线程中执行当前查询"""
+        self._generation += 1
+        generation = self._generation
+        query = as_you_type_query(self.query_edit.text().strip())
+        self.result_list.clear()
+        self._result_count = 0
+        if not query:
+            self.status_label.clear()
+            return
+        self.status_label.setText("搜索中…")
+        thread = threading.Thread(
+            target=self._run_search, args=(generation, query),
+            name="NoteSearch", daemon=True
+        )
+        thread.start()
+
+    def _run_search(self, generation: int, query: str):
+        """后台线程：逐个取出结果并生成摘要，分批推送；查询过期时立即停止"""
+        batch: List[dict] = []
+        count = 0
+        try:
+            if is_structured(query):
+                # 带字段或排除项的查询交给结构化查询引擎
+                results = iter(self.note_manager.query_notes(query, MAX_RESULTS))
+            else:
+                results = self.note_manager.iter_search(query)
+            for result in results:
+                if generation != self._generation:
+                    return
+                note = self.note_manager.load_note(result['id'], date.fromisoformat(result['date']))
+                if note is None:
+                    continue
+                result['snippet'] = make_snippet(note.get('content', ''), query)
+                batch.append(result)
+                count += 1
+                if len(batch) >= RESULT_BATCH or count >= MAX_RESULTS:
+                    self.resultsReady.emit(generation, batch)
+                    batch = []
+                if count >= MAX_RESULTS:
+                    break
+            if generation != self._generation:
+                return
+            if batch:
+                self.resultsReady.emit(generation, batch)
+            self.searchFinished.emit(generation, count)
+        except Exception as e:
+            print(f"搜索便签失败: {e}")
+
+    def add_results(self, generation: int, results: list):
+        """把一批结果加入列表（过期查询的结果直接丢弃）"""
+        if generation != self._generation:
+            return
+        for result in results:
+            label = QLabel(self.format_result(result))
+            label.setTextFormat(Qt.TextFormat.RichText)
+            label.setWordWrap(True)
+            label.setStyleSheet("QLabel { padding: 6px; }")
+            item = QListWidgetItem()
+            item.setData(Qt.ItemDataRole.UserRole, (result['date'], result['id']))
+            item.setSizeHint(label.sizeHint())
+            self.result_list.addItem(item)
+            self.result_list.setItemWidget(item, label)
+        self._result_count += len(results)
+        if self.result_list.currentRow() < 0 and self.result_list.count():
+            self.result_list.setCurrentRow(0)
+        self.status_label.setText(f"已找到 {self._result_count} 个便签…")
+
+    def on_search_finished(self, generation: int, count: int):
+        """搜索结束时更新状态"""
+        if generation != self._generation:
+            return
+        if count >= MAX_RESULTS:
+            self.status_label.setText(f"显示前 {count} 个结果")
+        else:
+            self.status_label.setText(f"共 {count} 个便签" if count else "没有匹配的便签")
+
+    def format_result(self, result: dict) -> str:
+        """结果的富文本：日期、标题和高亮的摘要"""
+        snippet, spans = result['snippet']
+        parts = []
+        position = 0
+        for start, end in spans:
+            parts.append(html.escape(snippet[position:start]))
+            parts.append(f"<b style='background-color:#fff3b0'>{html.escape(snippet[start:end])}</b>")
+            position = end
+        parts.append(html.escape(snippet[position:]))
+        title = html.escape(result['title'] or '无标题')
+        return (f"<span style='color:#888'>{result['date']}</span>&nbsp; <b>{title}</b>"
+                f"<br><span style='color:#555'>{''.join(parts)}</span>")
+
+    def open_current(self):
+        """回车打开当前选中的结果"""
+        item = self.result_list.currentItem()
+        if item is not None:
+            self.open_item(item)
+
+    def open_item(self, item: QListWidgetItem):
+        """打开结果对应的便签并关闭对话框"""
+        date_str, note_id = item.data(Qt.ItemDataRole.UserRole)
+        self.open_note(date.fromisoformat(date_str), note_id)
+        self.accept()
+
+    def done(self, result: int):
+        """关闭时作废正在进行的搜索"""
+        self._generation += 1
+        super().done(result)
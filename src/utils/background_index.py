@@ -0,0 +1,130 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+class BackgroundIndex:
+    # 出错提示和加载线程使用的名称，由子类设置
+    index_name = "索引"
+    thread_name = "IndexLoad"
+
+    def __init__(self, documents: Callable[[], Iterable[Tuple[str, str, str]]] = None):
+        """
+        在后台加载、在锁外重建的便签索引的基类
+
+        加载和重建由 _load_lock 串行化；重建扫描全部便签时不持有 _lock，
+        新数据建好后在锁内换上，查询在此期间仍使用旧数据。重建期间到达的
+        更新只排队、立即返回，换上新数据后按原顺序重放。
+
+        子类实现 _load、_build、_install、_apply_locked、_size 和 _save_locked，
+        更新便签时调用 _submit。
+
+        Args:
+            documents: 重建索引时遍历全部便签的函数，产出 (键, 标题, 正文)
+        """
+        self.documents = documents
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        # 重建期间到达的更新：便签键 -> 传给 _apply_locked 的值
+        self._building = False
+        self._pending: Dict[str, Any] = {}
+        self._load_thread: Optional[threading.Thread] = None
+
+    def start_loading(self):
+        """在后台线程中加载（或重建）索引，首次查询时无需等待"""
+        if self._loaded or (self._load_thread is not None and self._load_thread.is_alive()):
+            return
+        self._load_thread = threading.Thread(target=self._ensure_loaded, name=self.thread_name, daemon=True)
+        self._load_thread.start()
+
+    def _ensure_loaded(self):
+        """确保索引已加载，快照缺失或损坏时从全部便签重建"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            with self._lock:
+                if self._load():
+                    self._loaded = True
+                    return
+            self.rebuild()
+
+    def rebuild(self) -> int:
+        """从全部便签重建索引，返回索引中的便签数"""
+        if self.documents is None:
+            return 0
+        with self._lock:
+            self._building = True
+            self._pending = {}
+        try:
+            built = self._build(self.documents())
+        except Exception as e:
+            print(f"重建{self.index_name}失败: {e}")
+            built = None
+        with self._lock:
+            if built is not None:
+                self._install(built)
+            self._building = False
+            self._loaded = True
+            pending, self._pending = self._pending, {}
+            for key, value in pending.items():
+                # 照常写日志：重建成功时随后写入的快照已包含这些更新，失败时旧数据保留
+                self._apply_locked(key, value)
+            count = self._size()
+            saved = None
+            if built is not None:
+                try:
+                    saved = self._save_locked()
+                except Exception as e:
+                    print(f"保存{self.index_name}失败: {e}")
+        if saved is not None:
+            try:
+                self._save_unlocked(saved)
+            except Exception as e:
+                print(f"保存{self.index_name}失败: {e}")
+        return count
+
+    def _defer(self, key: str, value: Any) -> bool:
+        """正在重建时把更新排队，返回是否已排队"""
+        with self._lock:
+            if self._building:
+                self._pending[key] = value
+            return self._building
+
+    def _submit(self, key: str, value: Any):
+        """应用一个便签的更新并写日志，正在重建时排队、不等待"""
+        if self._defer(key, value):
+            return
+        self._ensure_loaded()
+        with self._lock:
+            if not self._defer(key, value):
+                self._apply_locked(key, value)
+
+    # ---- 子类实现 ----
+
+    def _load(self) -> bool:
+        """从快照和日志加载（调用方持有锁），快照缺失或损坏时返回 False"""
+        raise NotImplementedError
+
+    def _build(self, documents: Iterable[Tuple[str, str, str]]) -> Any:
+        """在锁外从全部便签建出新数据"""
+        raise NotImplementedError
+
+    def _install(self, built: Any):
+        """换上 _build 的结果（调用方持有锁）"""
+        raise NotImplementedError
+
+    def _apply_locked(self, key: str, value: Any):
+        """应用一个便签的更新并写日志（调用方持有锁）"""
+        raise NotImplementedError
+
+    def _size(self) -> int:
+        """索引中的便签数（调用方持有锁）"""
+        raise NotImplementedError
+
+    def _save_locked(self) -> Any:
+        """重建后在锁内写入快照；需要在锁外完成的部分作为返回值交给 _save_unlocked"""
+        raise NotImplementedError
+
+    def _save_unlocked(self, saved: Any):
+        """在锁外完成快照写入"""
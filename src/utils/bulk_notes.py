@@ -0,0 +1,53 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def group_future_items(items: Iterable[Tuple[date, dict]]) -> Tuple[Dict[date, List[Tuple[int, dict]]], List[dict]]:
+    """
+    把批量创建的便签按日期分组，过去的日期直接记为失败
+
+    Args:
+        items: (日期, 便签) 序列
+
+    Returns:
+        ({日期: [(序号, 便签)]}（按日期升序）, 每项的结果 [{'date', 'id', 'ok', 'error'}]）
+    """
+    today = date.today()
+    groups: Dict[date, List[Tuple[int, dict]]] = {}
+    results = []
+    for index, (day, note) in enumerate(items):
+        result = {'date': day.isoformat(), 'id': None, 'ok': False, 'error': None}
+        if day < today:
+            result['error'] = "不能在过去的日期创建便签"
+        else:
+            groups.setdefault(day, []).append((index, note))
+        results.append(result)
+    return dict(sorted(groups.items())), results
+
+def add_to_day(notes: Dict[str, dict], entries: List[Tuple[int, dict]], results: List[dict]) -> List[str]:
+    """
+    为同一天的新便签依次分配ID（写入便签的 id 字段）并加入 notes，
+    一次扫描完成，不逐个从头探测
+
+    Returns:
+        新便签的ID
+    """
+    new_ids = []
+    candidate = len(notes) + 1
+    for index, note in entries:
+        while str(candidate) in notes:
+            candidate += 1
+        note_id = str(candidate)
+        notes[note_id] = dict(note, id=note_id)
+        results[index]['id'] = note_id
+        new_ids.append(note_id)
+        candidate += 1
+    return new_ids
+
+def finish_day(entries: List[Tuple[int, dict]], results: List[dict], error: Optional[str] = None):
+    """记录一天中各项的写入结果，失败时该天的ID作废"""
+    for index, _ in entries:
+        if error is None:
+            results[index]['ok'] = True
+        else:
+            results[index]['id'] = None
+            results[index]['error'] = error
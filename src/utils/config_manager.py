@@ -17,7 +17,40 @@ class ConfigManager:
         self.default_config = {
             "storage": {
                 "notes_dir": "data/notes",
-                "dict_path": "dict/dictionary.mdx"
+                "dict_path": "dict/dictionary.mdx",
+                # 存储后端：json（每日一个文件）、sqlite 或 memory（不落盘）
+                "backend": "json",
+                "sqlite_path": "data/notes.db",
+                # 内存中缓存的已解析天数（LRU），0 表示禁用
+                "cache_days": 64,
+                # 切换日期后在后台预读前后多少天，0 表示禁用
+                "prefetch_days": 7,
+                # 全量扫描（导出、重建索引等）时并发读取文件的线程数，0 表示自动
+                "scan_workers": 0,
+                # 每日文件格式：json（带缩进）或 compact（紧凑格式），读取时自动识别
+                "format": "json",
+                # 目录布局：flat（单一目录）或 sharded（按 年/月 分目录），切换后在后台迁移
+                "layout": "flat"
+            },
+            "history": {
+                # 每隔多少个版本保存一次全文快照，其余版本只保存增量
+                "snapshot_interval": 20,
+                # 该时间（秒）内的连续保存合并为一个版本
+                "coalesce_seconds": 60
+            },
+            "agenda": {
+                # 日程视图显示从今天起多少天内的便签和待办
+                "days": 14
+            },
+            "editor": {
+                # 停止输入多久（毫秒）后保存，期间的修改只更新内存中的文本缓冲区
+                "save_delay_ms": 500,
+                # 缓存已打开便签的文档（保留撤销历史和滚动位置），按字符总数限制
+                "document_cache_chars": 4000000,
+                # 超过该字符数的粘贴分块插入，期间界面保持响应并显示进度
+                "paste_chunk_chars": 200000,
+                # 便签超过该字符数前提示（每次保存都要重写整个日期文件、修订历史和索引），0 为不提示
+                "soft_limit_chars": 1000000
             },
             "colors": {
                 "editor_bg": "#ffffff",
@@ -1,27 +1,345 @@
 import os
-import json
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime, date
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .day_cache import DayCache
+from .prefetcher import DayPrefetcher
+from .note_manifest import NoteManifest, summarize_day
+from .note_codec import FORMAT_JSON, encode_note, join_notes, loads_day
+from .note_iter import effective_start, iter_day_notes
+from .day_scanner import scan_day_files
+from .file_utils import atomic_write_text
+from .bulk_notes import add_to_day, finish_day, group_future_items
+
+# 每日便签文件名格式：YYYY_MM_DD.json
+DAILY_FILE_PATTERN = re.compile(r'^(\d{4})_(\d{2})_(\d{2})\.json$')
+
+# 保留逐便签序列化结果的最近写入天数
+FRAGMENT_CACHE_DAYS = 8
+
+# 目录布局：flat 为所有文件放在同一目录，sharded 为按 YYYY/MM 分目录
+LAYOUT_FLAT = "flat"
+LAYOUT_SHARDED = "sharded"
+
+def parse_daily_filename(filename: str) -> Optional[date]:
+    """从每日便签文件名解析日期，不匹配时返回 None"""
+    match = DAILY_FILE_PATTERN.match(filename)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+def list_day_files(storage_dir: str, start: date = None, end: date = None) -> Dict[str, date]:
+    """
+    列出目录中范围内（包含首尾）的每日文件，返回 {文件路径: 日期}
+
+    两种布局的文件都会列出；分片目录只进入与范围相交的年份和月份。
+    """
+    def in_range(day: date) -> bool:
+        return not (start is not None and day < start) and not (end is not None and day > end)
+
+    files = {}
+    for entry in os.scandir(storage_dir):
+        if entry.is_file():
+            day = parse_daily_filename(entry.name)
+            if day is not None and in_range(day):
+                files[entry.path] = day
+            continue
+        if not (entry.is_dir() and len(entry.name) == 4 and entry.name.isdigit()):
+            continue
+        year = int(entry.name)
+        if (start is not None and year < start.year) or (end is not None and year > end.year):
+            continue
+        for month_entry in os.scandir(entry.path):
+            if not (month_entry.is_dir() and month_entry.name.isdigit()):
+                continue
+            month = (year, int(month_entry.name))
+            if (start is not None and month < (start.year, start.month)) or \
+                    (end is not None and month > (end.year, end.month)):
+                continue
+            for file_entry in os.scandir(month_entry.path):
+                day = parse_daily_filename(file_entry.name)
+                if day is not None and in_range(day):
+                    files[file_entry.path] = day
+    return files
+
+def _file_stamp(file_path: str) -> Optional[tuple]:
+    """获取文件的 (mtime, 大小) 校验戳，文件不存在时返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 class DailyStorage:
-    def __init__(self, storage_dir: str = "data/notes"):
+    def __init__(self, storage_dir: str = "data/notes", cache_days: int = 64, scan_workers: int = 0,
+                 file_format: str = FORMAT_JSON, layout: str = LAYOUT_FLAT):
         self.storage_dir = storage_dir
+        # 新文件写入的目录布局，另一种布局下的文件仍可读取，并可在后台迁移
+        self.layout = layout
+        # 写入和迁移同一文件时互斥
+        self._file_lock = threading.RLock()
+        self._migration_thread = None
+        # 写入每日文件时使用的格式，读取时两种格式都支持
+        self.file_format = file_format
+        # 全量扫描时并发读取文件的线程数，0 表示自动
+        self.scan_workers = scan_workers
         os.makedirs(storage_dir, exist_ok=True)
+        # 已解析的每日便签缓存，通过文件 mtime 和大小校验
+        self.cache = DayCache(cache_days)
+        # 最近写入的日期中每个便签的 (便签副本, 序列化结果)，部分保存时复用
+        self._fragments: "OrderedDict[str, Tuple[str, Dict[str, Tuple[dict, str]]]]" = OrderedDict()
+        self.prefetcher = DayPrefetcher(self.get_daily_notes)
+        # 已读取过的空日期文件的校验戳，校正清单时不再重复读取
+        self._empty_days: Dict[str, tuple] = {}
+        # 每个日期的便签摘要，缺失时从每日文件重建，否则补上外部加入的文件
+        self.manifest = NoteManifest(os.path.join(storage_dir, ".index"))
+        if not self.manifest.load() or not self.manifest.is_current():
+            self.rebuild_manifest()
+        else:
+            self.sync_manifest()
     
-    def get_daily_file(self, date_obj: date) -> str:
-        """获取指定日期的文件路径"""
+    def cache_stats(self) -> dict:
+        """获取每日便签缓存的统计信息"""
+        stats = self.cache.stats()
+        stats["prefetched"] = self.prefetcher.loaded_days
+        return stats
+    
+    def prefetch(self, center: date, radius: int = 7):
+        """在后台预读 center 前后 radius 天的便签到缓存"""
+        # 缓存装不下的部分预读了也会立即被淘汰
+        radius = min(radius, max(0, (self.cache.max_days - 1) // 2))
+        self.prefetcher.request(center, radius)
+    
+    def _encode_day(self, key: str, notes: Dict[str, dict], dirty: Optional[Iterable[str]]) -> str:
+        """
+        序列化一天的便签，只重新序列化变化的便签
+
+        Args:
+            key: 日期（YYYY-MM-DD）
+            notes: 该日全部便签
+            dirty: 变化的便签ID，None 表示全部重新序列化
+        """
+        cached = self._fragments.pop(key, None)
+        if dirty is None or cached is None or cached[0] != self.file_format:
+            previous = {}
+        else:
+            previous = cached[1]
+        dirty = set(dirty or ())
+
+        fragments = {}
+        for note_id, note in notes.items():
+            entry = previous.get(note_id)
+            # 未标记为脏但与上次写入的内容不同（调用方没有跟踪修改）时同样重新序列化
+            if entry is None or note_id in dirty or entry[0] != note:
+                entry = (dict(note), encode_note(note_id, note, key, self.file_format))
+            fragments[note_id] = entry
+
+        self._fragments[key] = (self.file_format, fragments)
+        while len(self._fragments) > FRAGMENT_CACHE_DAYS:
+            self._fragments.popitem(last=False)
+        return join_notes((fragment for _, fragment in fragments.values()), self.file_format)
+    
+    def _write_day(self, date_obj: date, notes: Dict[str, dict], dirty: Optional[Iterable[str]] = None,
+                   summaries: Dict[str, Optional[dict]] = None):
+        """
+        写入一天的便签文件，并同步更新缓存和清单
+        
+        Args:
+            summaries: 提供时把清单条目放入其中，由调用方批量更新清单
+        """
+        key = date_obj.strftime('%Y-%m-%d')
+        text = self._encode_day(key, notes, dirty)
+        with self._file_lock:
+            file_path = self._layout_path(date_obj, self.layout)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # 先写临时文件再替换，后台扫描等并发读取不会读到写了一半的文件
+            atomic_write_text(file_path, text)
+            # 删除另一种布局下的旧文件，避免同一天出现两份
+            old_path = self._layout_path(date_obj, self._other_layout())
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        
+        stamp = _file_stamp(file_path)
+        if stamp is not None:
+            self.cache.put(key, stamp, notes)
+        entry = summarize_day(notes, text)
+        if entry is None:
+            self._empty_days[key] = stamp
+        else:
+            self._empty_days.pop(key, None)
+        if summaries is not None:
+            summaries[key] = entry
+        else:
+            self.manifest.update(key, entry)
+    
+    def _other_layout(self) -> str:
+        """另一种目录布局"""
+        return LAYOUT_FLAT if self.layout == LAYOUT_SHARDED else LAYOUT_SHARDED
+    
+    def _layout_path(self, date_obj: date, layout: str) -> str:
+        """指定布局下某一天的文件路径"""
         filename = f"{date_obj.year}_{date_obj.month:02d}_{date_obj.day:02d}.json"
+        if layout == LAYOUT_SHARDED:
+            return os.path.join(self.storage_dir, f"{date_obj.year}", f"{date_obj.month:02d}", filename)
         return os.path.join(self.storage_dir, filename)
     
-    def save_notes(self, notes: Dict[str, dict], working_date: date = None) -> bool:
-        """保存便签到指定日期的文件"""
+    def list_day_files(self, start: date = None, end: date = None) -> Dict[str, date]:
+        """列出范围内（包含首尾）的每日文件，返回 {文件路径: 日期}，见 list_day_files"""
+        return list_day_files(self.storage_dir, start, end)
+    
+    def migrate_layout(self) -> int:
+        """
+        把另一种布局下的文件逐个移动到当前布局，返回移动的文件数
+
+        每次只在互斥锁内移动一个文件，迁移过程中可以正常读写。
+        """
+        moved = 0
+        other = self._other_layout()
+        for file_path, day in sorted(self.list_day_files().items(), key=lambda item: item[1]):
+            with self._file_lock:
+                if file_path != self._layout_path(day, other) or not os.path.exists(file_path):
+                    continue
+                target = self._layout_path(day, self.layout)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.exists(target):
+                    # 目标已由新的保存写入，旧文件作废
+                    os.remove(file_path)
+                else:
+                    os.replace(file_path, target)
+                moved += 1
+                if other == LAYOUT_SHARDED:
+                    self._remove_empty_shards(file_path)
+        return moved
+    
+    def _remove_empty_shards(self, file_path: str):
+        """删除迁移后变空的月份和年份目录"""
+        month_dir = os.path.dirname(file_path)
+        for directory in (month_dir, os.path.dirname(month_dir)):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+    
+    def start_layout_migration(self):
+        """在后台线程中迁移目录布局"""
+        if self._migration_thread is not None and self._migration_thread.is_alive():
+            return
+        
+        def run():
+            try:
+                moved = self.migrate_layout()
+                if moved:
+                    print(f"已迁移 {moved} 个便签文件到 {self.layout} 布局")
+            except Exception as e:
+                print(f"迁移便签目录布局失败: {e}")
+        
+        self._migration_thread = threading.Thread(target=run, name="LayoutMigration", daemon=True)
+        self._migration_thread.start()
+    
+    def rebuild_manifest(self, workers: int = None):
+        """并发扫描全部每日文件，重新生成清单"""
+        days = self.list_day_files()
+        
+        entries = {}
+        for file_path, text, notes in scan_day_files(sorted(days), workers or self.scan_workers):
+            if notes is None:
+                continue
+            entry = summarize_day(notes, text)
+            if entry is not None:
+                entries[days[file_path].strftime('%Y-%m-%d')] = entry
+        self.manifest.replace_all(entries)
+    
+    def sync_manifest(self, start: date = None, end: date = None, workers: int = None) -> int:
+        """
+        对照目录列表校正范围内的清单，返回校正的日期数
+
+        同步或从备份恢复等途径在外部加入的每日文件不在清单中，读取后补上；
+        文件已不存在的日期从清单中移除。只列出目录，只读取清单中缺少的文件。
+        """
+        # 先取清单再列目录：其间新写入的文件只会被多读一次，不会被误删
+        known = set(self.manifest.dates(start, end))
+        files = {day.strftime('%Y-%m-%d'): path for path, day in self.list_day_files(start, end).items()}
+        missing = [date_str for date_str in sorted(set(files) - known)
+                   if self._empty_days.get(date_str) != _file_stamp(files[date_str])]
+        changes: Dict[str, Optional[dict]] = {}
+        for date_str in known - set(files):
+            # 布局迁移可能正在移动该文件，确认不存在后再移除
+            if not os.path.exists(self.get_daily_file(date.fromisoformat(date_str))):
+                changes[date_str] = None
+        paths = [files[date_str] for date_str in missing]
+        for date_str, (file_path, text, notes) in zip(missing, scan_day_files(paths, workers or self.scan_workers)):
+            if notes is None:
+                continue
+            entry = summarize_day(notes, text)
+            if entry is None:
+                self._empty_days[date_str] = _file_stamp(file_path)
+            else:
+                changes[date_str] = entry
+        if changes:
+            self.manifest.update_many(changes)
+        return len(changes)
+    
+    def scan_notes(self, start: date = None, end: date = None, workers: int = None) -> Iterator[Tuple[str, Dict[str, dict]]]:
+        """
+        并发读取范围内的每日文件，按日期升序产出 (日期, {便签ID: 便签})
+
+        用于全量遍历，不经过也不填充每日缓存。读取前先对照目录校正清单。
+        """
+        self.sync_manifest(start, end, workers)
+        dates = self.manifest.dates(start, end)
+        paths = [self.get_daily_file(date.fromisoformat(date_str)) for date_str in dates]
+        for date_str, (_, _, notes) in zip(dates, scan_day_files(paths, workers or self.scan_workers)):
+            if notes:
+                yield date_str, notes
+    
+    def get_day_summaries(self, start: date = None, end: date = None) -> Dict[str, dict]:
+        """从清单获取范围内（包含首尾）每个日期的摘要，不读取每日文件"""
+        return self.manifest.summaries(start, end)
+    
+    def get_daily_meta(self, date: datetime = None) -> Dict[str, dict]:
+        """从清单获取指定日期各便签的元数据（不含正文），不读取每日文件"""
+        if date is None:
+            date = datetime.now()
+        key = date.strftime('%Y-%m-%d')
+        entry = self.manifest.get(key)
+        if entry is None:
+            return {}
+        return {meta['id']: dict(meta, date=key) for meta in entry['notes']}
+    
+    def get_note_body(self, date: datetime, note_id: str) -> Optional[str]:
+        """按需读取单个便签的正文，便签不存在时返回 None"""
+        note = self.get_daily_notes(date).get(note_id)
+        return note.get('content', '') if note is not None else None
+    
+    def get_daily_file(self, date_obj: date) -> str:
+        """获取指定日期的文件路径（文件仍在另一种布局下时返回其实际位置）"""
+        file_path = self._layout_path(date_obj, self.layout)
+        if not os.path.exists(file_path):
+            old_path = self._layout_path(date_obj, self._other_layout())
+            if os.path.exists(old_path):
+                return old_path
+        return file_path
+    
+    def save_notes(self, notes: Dict[str, dict], working_date: date = None,
+                   dirty: Optional[Iterable[str]] = None) -> bool:
+        """
+        保存便签到指定日期的文件
+        
+        Args:
+            notes: 该日全部便签
+            working_date: 日期，默认为今天
+            dirty: 新增、修改或删除的便签ID，只有这些便签会重新序列化；None 表示全部
+        """
         try:
             if working_date is None:
                 working_date = date.today()
             
-            file_path = self.get_daily_file(working_date)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(notes, f, ensure_ascii=False, indent=2)
+            self._write_day(working_date, notes, dirty)
             return True
         except Exception as e:
             print(f"保存便签失败: {e}")
@@ -32,13 +350,9 @@ class DailyStorage:
         all_notes = {}
         
         try:
-            # 遍历目录下的所有 json 文件
-            for filename in os.listdir(self.storage_dir):
-                if filename.endswith('.json'):
-                    file_path = os.path.join(self.storage_dir, filename)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        day_notes = json.load(f)
-                        all_notes.update(day_notes)
+            # 只读取清单中有便签的日期（读取前已对照目录补上外部加入的文件）
+            for _, notes in self.scan_notes():
+                all_notes.update(notes)
             
             return all_notes
         except Exception as e:
@@ -50,13 +364,24 @@ class DailyStorage:
         if date is None:
             date = datetime.now()
             
-        file_path = self.get_daily_file(date)
-        if not os.path.exists(file_path):
-            return {}
-            
+        key = date.strftime('%Y-%m-%d')
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # 解析路径并打开文件期间不允许后台迁移移动该文件
+            with self._file_lock:
+                file_path = self.get_daily_file(date)
+                stamp = _file_stamp(file_path)
+                if stamp is None:
+                    return {}
+                
+                notes = self.cache.get(key, stamp)
+                if notes is not None:
+                    return notes
+                f = open(file_path, 'r', encoding='utf-8')
+            
+            with f:
+                notes = loads_day(f.read(), key)
+            self.cache.put(key, stamp, notes)
+            return notes
         except Exception as e:
             print(f"加载便签失败: {e}")
             return {}
@@ -66,60 +391,77 @@ class DailyStorage:
         if future_date < date.today():
             return False
         
-        file_path = self.get_daily_file(future_date)
-        notes = {}
-        
         # 如果文件已存在，先读取现有内容
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    notes = json.load(f)
-            except Exception:
-                pass
+        notes = self.get_daily_notes(future_date)
         
         # 如果是新文件，直接使用传入的便签作为第一个便签
         if not notes:
-            notes["1"] = note
+            note_id = "1"
         else:
             # 如果文件已存在，添加新便签
             note_id = str(len(notes) + 1)
             while note_id in notes:
                 note_id = str(int(note_id) + 1)
-            notes[note_id] = note
+        notes[note_id] = dict(note, id=note_id)
         
         # 保存文件
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(notes, f, ensure_ascii=False, indent=2)
+            self._write_day(future_date, notes, [note_id])
             return True
         except Exception as e:
             print(f"创建未来便签失败: {e}")
-            return False 
+            return False
     
-    def get_all_notes(self) -> Dict[str, dict]:
-        """获取所有便签"""
-        all_notes = {}
+    def create_future_notes(self, items: Iterable[Tuple[date, dict]]) -> List[dict]:
+        """
+        批量创建未来日期的便签：按日期分组，每个日期只读取一次、原子写入一次
         
-        # 遍历存储目录中的所有 json 文件
-        for filename in os.listdir(self.storage_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.storage_dir, filename)
-                try:
-                    # 从文件名获取日期
-                    date_str = filename.replace('.json', '').replace('_', '-')
-                    
-                    # 读取文件内容
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        notes = json.load(f)
-                        
-                    # 为每个便签添加日期信息
-                    for note_id, note in notes.items():
-                        note['date'] = date_str
-                        note['id'] = note_id
-                        all_notes[f"{date_str}_{note_id}"] = note
-                        
-                except Exception as e:
-                    print(f"读取文件 {filename} 时出错: {e}")
-                    continue
+        Args:
+            items: (日期, 便签) 序列
+            
+        Returns:
+            与 items 一一对应的结果 [{'date', 'id', 'ok', 'error'}]
+        """
+        groups, results = group_future_items(items)
+        summaries: Dict[str, Optional[dict]] = {}
+        for day, entries in groups.items():
+            notes = self.get_daily_notes(day)
+            new_ids = add_to_day(notes, entries, results)
+            try:
+                self._write_day(day, notes, new_ids, summaries)
+                finish_day(entries, results)
+            except Exception as e:
+                print(f"批量创建便签失败（{day}）: {e}")
+                finish_day(entries, results, str(e))
+        # 全部日期写完后一次性追加清单日志
+        self.manifest.update_many(summaries)
+        return results
+
+    def get_notes_in_range(self, start: date = None, end: date = None) -> Dict[str, Dict[str, dict]]:
+        """按日期范围获取便签（包含首尾），返回 {日期: {便签ID: 便签}}"""
+        return dict(self.scan_notes(start, end))
+
+    def iter_notes(self, start: date = None, end: date = None, limit: int = None,
+                   offset: int = 0, cursor: str = None) -> Iterator[dict]:
+        """按日期顺序惰性产出便签副本（带 date 和 id）"""
+        if limit is None and not offset:
+            # 完整遍历：并发预读后续日期，仍按日期顺序产出
+            days = (
+                (date_str, len(notes), lambda notes=notes: notes)
+                for date_str, notes in self.scan_notes(effective_start(start, cursor), end)
+            )
+            return iter_day_notes(days, cursor=cursor)
         
-        return all_notes 
\ No newline at end of file
+        # 分页：只读取需要的日期，整天被 offset 跳过的日期不读取
+        self.sync_manifest(effective_start(start, cursor), end)
+        summaries = self.manifest.summaries(effective_start(start, cursor), end)
+        days = (
+            (date_str, summary['count'],
+             lambda date_str=date_str: self.get_daily_notes(date.fromisoformat(date_str)))
+            for date_str, summary in summaries.items()
+        )
+        return iter_day_notes(days, limit, offset, cursor)
+
+    def get_all_notes(self) -> Dict[str, dict]:
+        """获取所有便签"""
+        return {f"{note['date']}_{note['id']}": note for note in self.iter_notes()}
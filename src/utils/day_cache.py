@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+def copy_notes(notes: Dict[str, dict]) -> Dict[str, dict]:
+    """复制一天的便签，避免调用方修改缓存内容"""
+    return {note_id: dict(note) for note_id, note in notes.items()}
+
+class DayCache:
+    def __init__(self, max_days: int = 64):
+        """
+        已解析的每日便签 LRU 缓存
+
+        每个条目附带一个校验戳（通常是文件的 mtime 和大小），
+        读取时校验戳不一致即视为失效。
+
+        Args:
+            max_days: 最多缓存的天数，0 表示禁用缓存
+        """
+        self.max_days = max(0, int(max_days))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, stamp: Hashable) -> Optional[Dict[str, dict]]:
+        """获取缓存的便签副本，未命中或已失效时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy_notes(entry[1])
+
+    def put(self, key: str, stamp: Hashable, notes: Dict[str, dict]):
+        """写入缓存，超出容量时淘汰最久未使用的日期"""
+        if self.max_days == 0:
+            return
+        with self._lock:
+            self._entries[key] = (stamp, copy_notes(notes))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_days:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str = None):
+        """使指定日期的缓存失效，不指定时清空缓存"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_days": self.max_days,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
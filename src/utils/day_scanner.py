@@ -0,0 +1,72 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+from .note_codec import loads_day
+
+def read_day_file(file_path: str) -> Tuple[str, Optional[str], Optional[dict]]:
+    """
+    读取并解析一个每日文件（任意格式）
+
+    Returns:
+        (文件路径, 原始文本, 解析结果)；读取失败时后两项为 None
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        # 文件名 YYYY_MM_DD.json 的前 10 个字符即日期
+        date_str = os.path.basename(file_path)[:10].replace('_', '-')
+        return file_path, text, loads_day(text, date_str)
+    except Exception as e:
+        print(f"读取文件 {os.path.basename(file_path)} 时出错: {e}")
+        return file_path, None, None
+
+def read_day_files(file_paths: List[str]) -> List[Tuple[str, Optional[str], Optional[dict]]]:
+    """顺序读取一批每日文件（作为并发任务的最小单位）"""
+    return [read_day_file(file_path) for file_path in file_paths]
+
+def default_workers() -> int:
+    """默认并发数"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+def scan_day_files(file_paths: Iterable[str], workers: int = None, use_processes: bool = False,
+                   batch_size: int = None) -> Iterator[Tuple[str, Optional[str], Optional[dict]]]:
+    """
+    并发读取并解析每日文件，按输入顺序产出结果
+
+    读取文件时会释放 GIL，线程池即可重叠磁盘等待；文件已在页缓存中、
+    以解析为主时可改用进程池。同时在途的批次数有上限，内存占用不随
+    文件总数增长。
+
+    Args:
+        file_paths: 文件路径，结果顺序与其一致
+        workers: 并发数，1 表示在当前线程顺序读取
+        use_processes: 是否使用进程池
+        batch_size: 每个任务读取的文件数，默认线程池 8 个、进程池 64 个
+
+    Yields:
+        (文件路径, 原始文本, 解析结果)，读取失败时后两项为 None
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        for file_path in file_paths:
+            yield read_day_file(file_path)
+        return
+
+    batch_size = batch_size or (64 if use_processes else 8)
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pending = deque()
+    with executor_class(max_workers=workers) as executor:
+        batch = []
+        for file_path in file_paths:
+            batch.append(file_path)
+            if len(batch) == batch_size:
+                pending.append(executor.submit(read_day_files, batch))
+                batch = []
+                # 限制在途任务数，按提交顺序取回结果
+                while len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+        if batch:
+            pending.append(executor.submit(read_day_files, batch))
+        while pending:
+            yield from pending.popleft().result()
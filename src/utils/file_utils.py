@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+def atomic_write_bytes(file_path: str, data: bytes):
+    """先写入同目录下的临时文件再替换，避免中途失败留下半个文件"""
+    directory = os.path.dirname(file_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_text(file_path: str, text: str, encoding: str = 'utf-8'):
+    """原子地写入文本文件，见 atomic_write_bytes"""
+    atomic_write_bytes(file_path, text.encode(encoding))
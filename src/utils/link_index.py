@@ -0,0 +1,150 @@
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from .logged_snapshot import LoggedSnapshot
+from .background_index import BackgroundIndex
+
+# [[2025-03-14]] 链接到日期，[[便签标题]] 链接到同名便签
+LINK_PATTERN = re.compile(r'\[\[([^\[\]\n]+?)\]\]')
+DATE_TARGET = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def normalize_title(text: str) -> str:
+    """标题的比较形式：小写，空白合并"""
+    return " ".join(text.lower().split())
+
+def link_target(text: str) -> str:
+    """把链接文字规范化为目标：date:YYYY-MM-DD 或 title:小写标题"""
+    text = text.strip()
+    if DATE_TARGET.match(text):
+        return f"date:{text}"
+    return "title:" + normalize_title(text)
+
+def extract_links(content: str) -> Set[str]:
+    """提取正文中全部链接的目标"""
+    return {link_target(text) for text in LINK_PATTERN.findall(content) if text.strip()}
+
+def link_at(text: str, position: int) -> Optional[str]:
+    """一行文本中位置 position 处的链接文字，不在链接上时返回 None"""
+    for match in LINK_PATTERN.finditer(text):
+        if match.start() <= position <= match.end():
+            return match.group(1).strip()
+    return None
+
+class LinkIndex(BackgroundIndex):
+    index_name = "链接索引"
+    thread_name = "LinkIndexLoad"
+
+    def __init__(self, index_dir: str, documents: Callable[[], Iterable[Tuple[str, str, str]]] = None):
+        """
+        链接和反向链接索引
+
+        记录每个便签的标题和它链接到的目标，并维护 目标 -> 便签 的反向表。
+        保存便签时比较新旧链接集合，只增删有变化的目标，不重新扫描其他便签。
+        由快照 links.json 和追加日志 links.log 组成（见 LoggedSnapshot），
+        加载和重建见 BackgroundIndex。
+
+        Args:
+            index_dir: 索引文件所在目录
+            documents: 重建索引时遍历全部便签的函数，产出 (键, 标题, 正文)
+        """
+        super().__init__(documents)
+        self.store = LoggedSnapshot(os.path.join(index_dir, "links.json"), os.path.join(index_dir, "links.log"), "链接索引")
+        # 便签键 -> (规范化的标题, 链接目标列表)
+        self.entries: Dict[str, Tuple[str, List[str]]] = {}
+        # 链接目标 -> 链接到它的便签键
+        self._backlinks: Dict[str, Set[str]] = {}
+        # 规范化的标题 -> 便签键，用于解析 [[标题]]
+        self._by_title: Dict[str, Set[str]] = {}
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _load(self) -> bool:
+        """从快照和日志加载，快照缺失或损坏时返回 False"""
+        entries = self.store.load()
+        if entries is None:
+            return False
+        self._install({key: (title, links) for key, (title, links) in entries.items()})
+        return True
+
+    def _install(self, entries: Dict[str, Tuple[str, List[str]]]):
+        """替换全部条目并重建反向表（调用方需持有锁）"""
+        self.entries = entries
+        self._backlinks = {}
+        self._by_title = {}
+        for key, (title, links) in entries.items():
+            self._by_title.setdefault(title, set()).add(key)
+            for target in links:
+                self._backlinks.setdefault(target, set()).add(key)
+
+    def _build(self, documents: Iterable[Tuple[str, str, str]]) -> Dict[str, Tuple[str, List[str]]]:
+        """提取全部便签的标题和链接"""
+        return {key: (normalize_title(title), sorted(extract_links(content))) for key, title, content in documents}
+
+    def _size(self) -> int:
+        return len(self.entries)
+
+    def _save_locked(self):
+        self.store.write(self.entries)
+
+    @staticmethod
+    def _discard(table: Dict[str, Set[str]], name: str, key: str):
+        """从反向表中移除一项，集合为空时删除该名称"""
+        keys = table.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del table[name]
+
+    def _apply_locked(self, key: str, entry: Optional[Tuple[str, List[str]]]):
+        """按新旧差异更新一个便签的条目并追加日志，没有变化时不写盘（调用方需持有锁）"""
+        old = self.entries.get(key)
+        if old == entry:
+            return
+        old_title, old_links = old if old is not None else (None, [])
+        new_title, new_links = entry if entry is not None else (None, [])
+        # 只处理增删的链接目标
+        for target in set(old_links) - set(new_links):
+            self._discard(self._backlinks, target, key)
+        for target in set(new_links) - set(old_links):
+            self._backlinks.setdefault(target, set()).add(key)
+        if old_title != new_title:
+            if old_title is not None:
+                self._discard(self._by_title, old_title, key)
+            if new_title is not None:
+                self._by_title.setdefault(new_title, set()).add(key)
+        if entry is None:
+            del self.entries[key]
+        else:
+            self.entries[key] = entry
+        self.store.append([(key, entry)], self.entries)
+
+    def update(self, key: str, title: str, content: str):
+        """便签保存后更新它的标题和链接"""
+        self._submit(key, (normalize_title(title), sorted(extract_links(content))))
+
+    def remove(self, key: str):
+        """移除一个便签（指向它的链接保留，便签重新出现时仍然有效）"""
+        self._submit(key, None)
+
+    def links(self, key: str) -> List[str]:
+        """便签链接到的目标"""
+        self._ensure_loaded()
+        entry = self.entries.get(key)
+        return list(entry[1]) if entry is not None else []
+
+    def backlinks(self, key: str) -> List[str]:
+        """链接到该便签（按日期或按标题）的其他便签键，日期新的在前"""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self.entries.get(key)
+            sources = set(self._backlinks.get(f"date:{key[:10]}", ()))
+            if entry is not None and entry[0]:
+                sources |= self._backlinks.get(f"title:{entry[0]}", set())
+        sources.discard(key)
+        return sorted(sources, reverse=True)
+
+    def resolve_title(self, title: str) -> List[str]:
+        """标题为 title 的便签键，日期新的在前"""
+        self._ensure_loaded()
+        with self._lock:
+            keys = self._by_title.get(normalize_title(title), set())
+            return sorted(keys, reverse=True)
@@ -0,0 +1,92 @@
+import os
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+from .file_utils import atomic_write_text
+
+# 日志行数超过该值（且超过条目数）时合并进快照
+COMPACT_MIN_LINES = 500
+
+class LoggedSnapshot:
+    def __init__(self, snapshot_file: str, log_file: str, name: str,
+                 key_field: str = "k", value_field: str = "e"):
+        """
+        键 -> 值 字典的持久化：JSON 快照加追加日志
+
+        每次修改只向日志追加一行 {键字段: 键, 值字段: 值}（值为 None 表示删除），
+        日志行数超过 max(COMPACT_MIN_LINES, 条目数) 时整体写入快照并清空日志。
+        便签清单、标签索引、链接索引和便签注册表共用这一格式。本类不加锁，
+        调用方需在自己的锁内调用。
+
+        Args:
+            snapshot_file: 快照文件
+            log_file: 日志文件
+            name: 出错提示中使用的名称，如“标签索引”
+            key_field: 日志记录中键的字段名
+            value_field: 日志记录中值的字段名
+        """
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.name = name
+        self.key_field = key_field
+        self.value_field = value_field
+        self.log_lines = 0
+
+    def exists(self) -> bool:
+        """快照文件是否存在"""
+        return os.path.exists(self.snapshot_file)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """读取快照并重放日志，快照缺失或损坏时返回 None"""
+        if not self.exists():
+            return None
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"加载{self.name}失败: {e}")
+            return None
+
+        log_lines = 0
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 写入中断留下的不完整行
+                        continue
+                    log_lines += 1
+                    if record.get(self.value_field) is None:
+                        entries.pop(record[self.key_field], None)
+                    else:
+                        entries[record[self.key_field]] = record[self.value_field]
+        self.log_lines = log_lines
+        return entries
+
+    def write(self, entries: Dict[str, Any]):
+        """把全部条目写入快照并清空日志，失败时抛出异常"""
+        atomic_write_text(self.snapshot_file, json.dumps(entries, ensure_ascii=False, separators=(',', ':')))
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        self.log_lines = 0
+
+    def append(self, changes: Iterable[Tuple[str, Any]], entries: Dict[str, Any]):
+        """
+        追加已应用到 entries 的修改，日志过长时合并进快照
+
+        Args:
+            changes: (键, 新值或 None) 序列
+            entries: 修改后的全部条目
+        """
+        lines = [json.dumps({self.key_field: key, self.value_field: value}, ensure_ascii=False) + "\n"
+                 for key, value in changes]
+        if not lines:
+            return
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write("".join(lines))
+            self.log_lines += len(lines)
+            if self.log_lines > max(COMPACT_MIN_LINES, len(entries)):
+                self.write(entries)
+        except Exception as e:
+            print(f"更新{self.name}失败: {e}")
@@ -0,0 +1,124 @@
+from datetime import datetime, date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .note_manifest import note_meta, summarize_day
+from .note_iter import effective_start, iter_day_notes
+from .bulk_notes import add_to_day, finish_day, group_future_items
+
+def _date_key(date_obj) -> str:
+    """将日期转换为字符串键"""
+    return date_obj.strftime('%Y-%m-%d')
+
+def _copy_notes(notes: Dict[str, dict]) -> Dict[str, dict]:
+    """复制便签字典，避免调用方修改内部数据"""
+    return {note_id: dict(note) for note_id, note in notes.items()}
+
+class MemoryStorage:
+    def __init__(self):
+        """
+        内存便签存储，数据不落盘
+
+        主要用于测试、基准对比以及临时会话。
+        """
+        self.days: Dict[str, Dict[str, dict]] = {}
+
+    def save_notes(self, notes: Dict[str, dict], working_date: date = None,
+                   dirty: Optional[Iterable[str]] = None) -> bool:
+        """保存便签到指定日期，dirty 为变化的便签ID（None 表示替换整天）"""
+        if working_date is None:
+            working_date = date.today()
+        key = _date_key(working_date)
+        if dirty is None or key not in self.days:
+            self.days[key] = _copy_notes(notes)
+            return True
+        stored = self.days[key]
+        for note_id in dirty:
+            if note_id in notes:
+                stored[note_id] = dict(notes[note_id])
+            else:
+                stored.pop(note_id, None)
+        return True
+
+    def load_notes(self) -> Dict[str, dict]:
+        """加载所有便签"""
+        all_notes = {}
+        for notes in self.get_notes_in_range().values():
+            all_notes.update(notes)
+        return all_notes
+
+    def get_daily_notes(self, date: datetime = None) -> Dict[str, dict]:
+        """获取指定日期的便签"""
+        if date is None:
+            date = datetime.now()
+        return _copy_notes(self.days.get(_date_key(date), {}))
+
+    def get_daily_meta(self, date: datetime = None) -> Dict[str, dict]:
+        """获取指定日期各便签的元数据（不含正文）"""
+        if date is None:
+            date = datetime.now()
+        key = _date_key(date)
+        return {
+            note_id: dict(note_meta(note_id, note), date=key)
+            for note_id, note in self.days.get(key, {}).items()
+        }
+
+    def get_note_body(self, date: datetime, note_id: str) -> Optional[str]:
+        """获取单个便签的正文，便签不存在时返回 None"""
+        note = self.days.get(_date_key(date), {}).get(note_id)
+        return note.get('content', '') if note is not None else None
+
+    def create_future_note(self, future_date: date, note: dict) -> bool:
+        """创建未来日期的便签"""
+        if future_date < date.today():
+            return False
+
+        notes = self.days.setdefault(_date_key(future_date), {})
+        note_id = str(len(notes) + 1)
+        while note_id in notes:
+            note_id = str(int(note_id) + 1)
+        notes[note_id] = dict(note, id=note_id)
+        return True
+
+    def create_future_notes(self, items: Iterable[Tuple[date, dict]]) -> List[dict]:
+        """批量创建未来日期的便签，返回与 items 一一对应的结果"""
+        groups, results = group_future_items(items)
+        for day, entries in groups.items():
+            add_to_day(self.days.setdefault(_date_key(day), {}), entries, results)
+            finish_day(entries, results)
+        return results
+
+    def get_all_notes(self) -> Dict[str, dict]:
+        """获取所有便签"""
+        return {f"{note['date']}_{note['id']}": note for note in self.iter_notes()}
+
+    def iter_notes(self, start: date = None, end: date = None, limit: int = None,
+                   offset: int = 0, cursor: str = None) -> Iterator[dict]:
+        """按日期顺序惰性产出便签副本（带 date 和 id）"""
+        start = effective_start(start, cursor)
+        start_key = _date_key(start) if start is not None else None
+        end_key = _date_key(end) if end is not None else None
+        days = (
+            (date_str, len(self.days[date_str]), lambda date_str=date_str: self.days.get(date_str, {}))
+            for date_str in sorted(self.days)
+            if not (start_key and date_str < start_key) and not (end_key and date_str > end_key)
+        )
+        return iter_day_notes(days, limit, offset, cursor)
+
+    def get_notes_in_range(self, start: date = None, end: date = None) -> Dict[str, Dict[str, dict]]:
+        """按日期范围获取便签（包含首尾），返回 {日期: {便签ID: 便签}}"""
+        start_key = _date_key(start) if start is not None else None
+        end_key = _date_key(end) if end is not None else None
+
+        result = {}
+        for date_str in sorted(self.days):
+            if (start_key and date_str < start_key) or (end_key and date_str > end_key):
+                continue
+            if self.days[date_str]:
+                result[date_str] = _copy_notes(self.days[date_str])
+        return result
+
+    def get_day_summaries(self, start: date = None, end: date = None) -> Dict[str, dict]:
+        """获取范围内（包含首尾）每个日期的摘要"""
+        return {
+            date_str: summarize_day(notes)
+            for date_str, notes in self.get_notes_in_range(start, end).items()
+        }
@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Union
+
+# 每日文件格式：json 为带缩进的原始格式，compact 为带版本号的紧凑格式
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+FORMATS = (FORMAT_JSON, FORMAT_COMPACT)
+
+# 紧凑格式的版本号字段，旧格式中便签ID不会以 $ 开头
+VERSION_KEY = "$v"
+COMPACT_VERSION = 1
+
+# 紧凑格式中按位置存放的字段
+COMPACT_FIELDS = ('title', 'content', 'created_at', 'updated_at')
+
+# flags：便签中的 id/date 与文件名和键一致时省略，仅记录是否存在
+FLAG_HAS_ID = 1
+FLAG_HAS_DATE = 2
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+def encode_timestamp(value) -> Union[int, str, None]:
+    """把本地时间的 ISO 字符串转为微秒整数，无法无损还原时保持原样"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return value
+    return (parsed - EPOCH) // MICROSECOND
+
+def decode_timestamp(value) -> Optional[str]:
+    """还原 encode_timestamp 的结果"""
+    if isinstance(value, int):
+        return (EPOCH + value * MICROSECOND).isoformat()
+    return value
+
+def _compact_row(note_id: str, note: dict, date_str: str) -> list:
+    """把单个便签转换为紧凑格式中的一行"""
+    flags = 0
+    extra = {}
+    for key, value in note.items():
+        if key in COMPACT_FIELDS:
+            continue
+        if key == 'id' and value == note_id:
+            flags |= FLAG_HAS_ID
+        elif key == 'date' and value == date_str:
+            flags |= FLAG_HAS_DATE
+        else:
+            extra[key] = value
+    row = [
+        note_id,
+        note.get('title'),
+        note.get('content'),
+        encode_timestamp(note.get('created_at')),
+        encode_timestamp(note.get('updated_at')),
+        flags,
+    ]
+    if extra:
+        row.append(extra)
+    return row
+
+def encode_day(notes: Dict[str, dict], date_str: str, fmt: str = FORMAT_JSON) -> str:
+    """
+    按指定格式序列化一天的便签
+
+    Args:
+        notes: {便签ID: 便签}
+        date_str: 该文件对应的日期（YYYY-MM-DD），紧凑格式据此省略 date 字段
+        fmt: FORMAT_JSON 或 FORMAT_COMPACT
+    """
+    if fmt != FORMAT_COMPACT:
+        return json.dumps(notes, ensure_ascii=False, indent=2)
+
+    rows = [_compact_row(note_id, note, date_str) for note_id, note in notes.items()]
+    return json.dumps({VERSION_KEY: COMPACT_VERSION, "n": rows}, ensure_ascii=False, separators=(',', ':'))
+
+def encode_note(note_id: str, note: dict, date_str: str, fmt: str = FORMAT_JSON) -> str:
+    """
+    单独序列化一个便签，结果由 join_notes 拼接后与 encode_day 的输出相同
+
+    只有一个便签变化时，其余便签可以复用上次的结果，无需重新序列化。
+    """
+    if fmt != FORMAT_COMPACT:
+        # 便签在文件中多缩进一层；字符串中的换行已被转义，不会受影响
+        body = json.dumps(note, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+        return f"  {json.dumps(note_id, ensure_ascii=False)}: {body}"
+    return json.dumps(_compact_row(note_id, note, date_str), ensure_ascii=False, separators=(',', ':'))
+
+def join_notes(fragments: Iterable[str], fmt: str = FORMAT_JSON) -> str:
+    """把 encode_note 的结果按顺序拼接成完整的每日文件内容"""
+    if fmt != FORMAT_COMPACT:
+        body = ",\n".join(fragments)
+        return "{\n" + body + "\n}" if body else "{}"
+    return (f'{{{json.dumps(VERSION_KEY)}:{COMPACT_VERSION},"n":['
+            + ",".join(fragments) + "]}")
+
+def decode_day(data: dict, date_str: str) -> Dict[str, dict]:
+    """
+    把已解析的文件内容还原为 {便签ID: 便签}，自动识别格式
+
+    Args:
+        data: json.loads 的结果
+        date_str: 该文件对应的日期（YYYY-MM-DD）
+    """
+    if VERSION_KEY not in data:
+        return data
+    if data[VERSION_KEY] > COMPACT_VERSION:
+        raise ValueError(f"不支持的便签文件版本: {data[VERSION_KEY]}")
+
+    notes = {}
+    for row in data["n"]:
+        note_id, title, content, created_at, updated_at, flags = row[:6]
+        note = {}
+        if flags & FLAG_HAS_ID:
+            note['id'] = note_id
+        for key, value in zip(COMPACT_FIELDS, (title, content, decode_timestamp(created_at), decode_timestamp(updated_at))):
+            if value is not None:
+                note[key] = value
+        if flags & FLAG_HAS_DATE:
+            note['date'] = date_str
+        if len(row) > 6:
+            note.update(row[6])
+        notes[note_id] = note
+    return notes
+
+def loads_day(text: str, date_str: str) -> Dict[str, dict]:
+    """解析任意格式的每日文件内容"""
+    return decode_day(json.loads(text), date_str)
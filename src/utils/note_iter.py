@@ -0,0 +1,69 @@
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# (日期, 便签数或 None, 读取该日便签的函数)
+DaySource = Tuple[str, Optional[int], Callable[[], Dict[str, dict]]]
+
+def make_cursor(date_str: str, note_id: str) -> str:
+    """生成便签的游标，格式与 get_all_notes 的键相同：日期_便签ID"""
+    return f"{date_str}_{note_id}"
+
+def parse_cursor(cursor: str) -> Tuple[str, str]:
+    """解析游标为 (日期, 便签ID)"""
+    date_str, _, note_id = cursor.partition('_')
+    return date_str, note_id
+
+def note_cursor(note: dict) -> str:
+    """获取 iter_notes 产出的便签对应的游标"""
+    return make_cursor(note['date'], note['id'])
+
+def effective_start(start: Optional[date], cursor: Optional[str]) -> Optional[date]:
+    """结合游标收窄起始日期，避免读取游标之前的日期"""
+    if not cursor:
+        return start
+    cursor_date = date.fromisoformat(parse_cursor(cursor)[0])
+    return max(start, cursor_date) if start is not None else cursor_date
+
+def iter_day_notes(days: Iterable[DaySource], limit: Optional[int] = None,
+                   offset: int = 0, cursor: Optional[str] = None) -> Iterator[dict]:
+    """
+    按天展开便签，逐个产出带 date 和 id 的副本，不修改原便签
+
+    已知便签数的日期在整天都被 offset 跳过时不会被读取。
+
+    Args:
+        days: 按日期升序排列的 (日期, 便签数, 读取函数)，可以是惰性生成器
+        limit: 最多产出的便签数
+        offset: 跳过的便签数（在游标之后计算）
+        cursor: 从该游标对应的便签之后开始
+    """
+    if limit is not None and limit <= 0:
+        return
+    after_date, after_id = parse_cursor(cursor) if cursor else (None, None)
+    to_skip = offset
+    produced = 0
+
+    for date_str, count, load in days:
+        if after_date is not None and date_str < after_date:
+            continue
+        is_cursor_day = date_str == after_date
+        if not is_cursor_day and count is not None and to_skip >= count:
+            to_skip -= count
+            continue
+
+        notes = load()
+        note_ids = list(notes)
+        if is_cursor_day and after_id in notes:
+            # 同一天内从游标便签之后开始
+            note_ids = note_ids[note_ids.index(after_id) + 1:]
+        for note_id in note_ids:
+            if to_skip:
+                to_skip -= 1
+                continue
+            note = dict(notes[note_id])
+            note['date'] = date_str
+            note['id'] = note_id
+            yield note
+            produced += 1
+            if limit is not None and produced >= limit:
+                return
@@ -0,0 +1,131 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import date
+from typing import Dict, Optional
+from .logged_snapshot import LoggedSnapshot
+
+def serialize_day(notes: Dict[str, dict]) -> str:
+    """每日便签的标准序列化形式（与每日 JSON 文件内容一致）"""
+    return json.dumps(notes, ensure_ascii=False, indent=2)
+
+def content_hash(data: bytes) -> str:
+    """计算内容哈希"""
+    return hashlib.sha1(data).hexdigest()[:16]
+
+def note_meta(note_id: str, note: dict) -> dict:
+    """便签的元数据（标题、时间和正文长度），不包含正文"""
+    return {
+        "id": note_id,
+        "title": note.get('title', ''),
+        "created_at": note.get('created_at', ''),
+        "updated_at": note.get('updated_at', ''),
+        "chars": len(note.get('content', '')),
+    }
+
+def summarize_day(notes: Dict[str, dict], text: str = None) -> Optional[dict]:
+    """
+    生成一天的摘要，没有便签时返回 None
+
+    Args:
+        notes: {便签ID: 便签}
+        text: 已序列化的内容，用于计算 hash；未提供时使用不带缩进的 JSON（C 实现，远快于带缩进的输出）
+    """
+    if not notes:
+        return None
+    if text is None:
+        text = json.dumps(notes, ensure_ascii=False)
+    return {
+        "count": len(notes),
+        "titles": [note.get('title', '') for note in notes.values()],
+        "updated_at": max((note.get('updated_at', '') for note in notes.values()), default=''),
+        "chars": sum(len(note.get('content', '')) for note in notes.values()),
+        "hash": content_hash(text.encode('utf-8')),
+        "notes": [note_meta(note_id, note) for note_id, note in notes.items()],
+    }
+
+def _dates_in_range(keys, start: date = None, end: date = None) -> list:
+    """筛选并排序范围内（包含首尾）的日期字符串"""
+    start_key = start.strftime('%Y-%m-%d') if start is not None else None
+    end_key = end.strftime('%Y-%m-%d') if end is not None else None
+    return sorted(
+        key for key in keys
+        if not (start_key and key < start_key) and not (end_key and key > end_key)
+    )
+
+class NoteManifest:
+    def __init__(self, index_dir: str):
+        """
+        便签目录清单：记录每个日期的便签数、标题、更新时间、内容哈希
+        以及每个便签的元数据，列出便签时无需读取正文
+
+        由快照文件 manifest.json 和追加日志 manifest.log 组成（见 LoggedSnapshot），
+        每次保存只追加一行日志，日志过长时再合并进快照。
+
+        Args:
+            index_dir: 索引文件所在目录
+        """
+        self.index_dir = index_dir
+        self.store = LoggedSnapshot(os.path.join(index_dir, "manifest.json"), os.path.join(index_dir, "manifest.log"),
+                                    "便签清单", key_field="d")
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def exists(self) -> bool:
+        """清单文件是否存在"""
+        return self.store.exists()
+
+    def load(self) -> bool:
+        """从磁盘加载清单，清单缺失或损坏时返回 False"""
+        entries = self.store.load()
+        if entries is None:
+            return False
+        with self._lock:
+            self.entries = entries
+        return True
+
+    def is_current(self) -> bool:
+        """条目是否都包含逐便签元数据（旧版本清单没有，需要重建）"""
+        with self._lock:
+            return all("notes" in entry for entry in self.entries.values())
+
+    def replace_all(self, entries: Dict[str, dict]):
+        """用完整的条目替换清单并写入快照"""
+        with self._lock:
+            self.entries = dict(entries)
+            self.store.write(self.entries)
+
+    def update(self, date_str: str, entry: Optional[dict]):
+        """增量更新某个日期的条目，entry 为 None 表示该日期已没有便签"""
+        self.update_many({date_str: entry})
+
+    def update_many(self, entries: Dict[str, Optional[dict]]):
+        """增量更新多个日期的条目，日志只追加一次"""
+        with self._lock:
+            changes = []
+            for date_str, entry in entries.items():
+                if entry is None:
+                    if date_str not in self.entries:
+                        continue
+                    self.entries.pop(date_str)
+                else:
+                    self.entries[date_str] = entry
+                changes.append((date_str, entry))
+            self.store.append(changes, self.entries)
+
+    def get(self, date_str: str) -> Optional[dict]:
+        """获取某个日期的条目"""
+        with self._lock:
+            return self.entries.get(date_str)
+
+    def dates(self, start: date = None, end: date = None) -> list:
+        """按升序返回范围内（包含首尾）有便签的日期字符串"""
+        with self._lock:
+            return _dates_in_range(self.entries, start, end)
+
+    def summaries(self, start: date = None, end: date = None) -> Dict[str, dict]:
+        """按升序返回范围内（包含首尾）每个日期的条目"""
+        with self._lock:
+            return {key: dict(self.entries[key]) for key in _dates_in_range(self.entries, start, end)}
@@ -0,0 +1,257 @@
+import re
+import calendar
+from datetime import date
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from .search_index import SearchIndex, normalize_text, query_terms
+from .tag_index import TagIndex
+
+# 查询项：可选的 - 前缀，可选的 字段:，值为 "短语" 或不含空白的文本
+CLAUSE_PATTERN = re.compile(r'(-?)(?:([a-z]+):)?(?:"([^"]*)"|(\S+))')
+# 支持的字段
+FIELDS = ("date", "tag", "is")
+# 日期值：YYYY、YYYY-MM 或 YYYY-MM-DD
+DATE_VALUE = re.compile(r'^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$')
+
+# 各类查询项使用的索引（用于 explain）
+SOURCE_NAMES = {
+    "date": "日期清单",
+    "tag": "标签索引",
+    "todo": "待办索引",
+    "term": "正文倒排表",
+    "prefix": "正文倒排表（前缀）",
+    "phrase": "正文倒排表",
+}
+
+def parse_date_bound(value: str, is_end: bool) -> date:
+    """把 YYYY、YYYY-MM 或 YYYY-MM-DD 解析为区间的起点或终点"""
+    match = DATE_VALUE.match(value)
+    if not match:
+        raise ValueError(f"无法识别的日期: {value}")
+    year = int(match.group(1))
+    month = int(match.group(2)) if match.group(2) else (12 if is_end else 1)
+    if match.group(3):
+        day = int(match.group(3))
+    else:
+        day = calendar.monthrange(year, month)[1] if is_end else 1
+    return date(year, month, day)
+
+def parse_date_range(value: str) -> Tuple[Optional[date], Optional[date]]:
+    """解析 a..b、a..、..b 或单个日期为 (起点, 终点)，开放的一端为 None"""
+    if ".." in value:
+        start_text, _, end_text = value.partition("..")
+        start = parse_date_bound(start_text, False) if start_text else None
+        end = parse_date_bound(end_text, True) if end_text else None
+    else:
+        start = parse_date_bound(value, False)
+        end = parse_date_bound(value, True)
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"日期范围的起点晚于终点: {value}")
+    return start, end
+
+def parse_query(text: str) -> List[dict]:
+    """
+    解析结构化查询，各项之间为“与”的关系
+
+    支持 date:2025-01..2025-03（也可以是单个年、月、日或开放区间）、
+    tag:work 或 #work、is:todo（有未完成的待办）、"短语"、前缀*、普通词，
+    任一项前加 - 表示排除。
+
+    Returns:
+        [{'kind', 'value', 'negated', 'text'}]，kind 为 date、tag、todo、term、prefix 或 phrase；
+        date 的 value 为 (起点, 终点)，text 为该项的原文
+    """
+    clauses = []
+    for match in CLAUSE_PATTERN.finditer(text):
+        negated, field, phrase, word = match.groups()
+        negated = bool(negated)
+        if field is not None and field not in FIELDS:
+            # 不认识的字段（例如网址中的冒号）按普通文本处理
+            word = f"{field}:{phrase if phrase is not None else word}"
+            field = None
+            phrase = None
+
+        if field == "date":
+            value = parse_date_range(phrase if phrase is not None else word)
+            kind = "date"
+        elif field == "tag":
+            value = "#" + (phrase if phrase is not None else word).lstrip('#').lower()
+            kind = "tag"
+        elif field == "is":
+            value = (phrase if phrase is not None else word).lower()
+            if value != "todo":
+                raise ValueError(f"不支持的 is: 条件: {value}")
+            kind = "todo"
+        elif phrase is not None:
+            if not phrase.strip():
+                continue
+            kind, value = "phrase", phrase
+        elif word.startswith('#') and len(word) > 1:
+            kind, value = "tag", word.lower()
+        elif word.endswith('*') and len(word) > 1:
+            kind, value = "prefix", word[:-1]
+        else:
+            kind, value = "term", word
+        if kind in ("term", "prefix") and not query_terms(value):
+            # 只有标点等不产生检索词的项不参与查询，与 SearchIndex.iter_search 一致
+            continue
+        clauses.append({'kind': kind, 'value': value, 'negated': negated, 'text': match.group(0)})
+    return clauses
+
+def is_structured(text: str) -> bool:
+    """查询是否用到了字段或排除，需要由 NoteQueryEngine 处理"""
+    return any(clause['negated'] or clause['kind'] == "date" or ':' in clause['text']
+               for clause in _safe_parse(text))
+
+def _safe_parse(text: str) -> List[dict]:
+    """解析查询，格式有误时返回空列表"""
+    try:
+        return parse_query(text)
+    except ValueError:
+        return []
+
+def _in_range(key: str, date_range: Tuple[Optional[date], Optional[date]]) -> bool:
+    """便签键（日期_便签ID）的日期是否在范围内"""
+    start, end = date_range
+    date_str = key[:10]
+    return not ((start is not None and date_str < start.isoformat()) or
+                (end is not None and date_str > end.isoformat()))
+
+def format_explain(steps: List[dict]) -> str:
+    """把执行步骤格式化为多行文本"""
+    lines = []
+    for number, step in enumerate(steps, 1):
+        estimate = f"估计 {step['estimate']:>6}" if step.get('estimate') is not None else " " * 11
+        lines.append(f"{number}. {step['clause']:<28} {step['source']:<14} {step['action']:<4} "
+                     f"{estimate}  保留 {step['kept']:>6}")
+    return "\n".join(lines)
+
+class NoteQueryEngine:
+    def __init__(self, search_index: SearchIndex,
+                 day_summaries: Callable[[Optional[date], Optional[date]], Dict[str, dict]],
+                 load_text: Callable[[str], Optional[str]],
+                 tag_index: TagIndex = None):
+        """
+        结构化查询引擎
+
+        计划器先估计每个查询项的候选数，从最小的开始，依次与日期清单、
+        标签倒排表和正文倒排表求交集，不逐个扫描便签；候选已经很少时，
+        日期条件直接按便签键过滤。排除项和短语校验放在最后。
+
+        Args:
+            search_index: 全文索引
+            day_summaries: 按日期范围返回 {日期: 摘要} 的函数（摘要含逐便签元数据）
+            load_text: 根据便签键读取 "标题\\n正文" 的函数，用于短语校验
+            tag_index: 标签和待办索引；提供时标签条件从这里查询，并支持 is:todo
+        """
+        self.search_index = search_index
+        self.tag_index = tag_index
+        self.day_summaries = day_summaries
+        self.load_text = load_text
+
+    def _date_keys(self, date_range: Tuple[Optional[date], Optional[date]]) -> Set[str]:
+        """从日期清单获取范围内全部便签的键"""
+        keys = set()
+        for date_str, summary in self.day_summaries(*date_range).items():
+            for meta in summary.get('notes', ()):
+                keys.add(f"{date_str}_{meta['id']}")
+        return keys
+
+    def _estimate(self, clause: dict) -> int:
+        """估计查询项匹配的便签数"""
+        if clause['kind'] == "date":
+            return sum(summary.get('count', 0) for summary in self.day_summaries(*clause['value']).values())
+        if clause['kind'] in ("tag", "todo") and self.tag_index is not None:
+            return self.tag_index.estimate(clause['kind'], clause['value'])
+        return self.search_index.estimate(clause['kind'], clause['value'])
+
+    def _lookup(self, clause: dict) -> Set[str]:
+        """从对应的索引取出查询项匹配的便签键（短语尚未逐字校验）"""
+        if clause['kind'] == "date":
+            return self._date_keys(clause['value'])
+        if clause['kind'] == "todo":
+            return self.tag_index.keys_with_open_todos() if self.tag_index is not None else set()
+        if clause['kind'] == "tag" and self.tag_index is not None:
+            return self.tag_index.keys_with_tag(clause['value'])
+        keys = self.search_index.match_clause(clause['kind'], clause['value'])
+        return keys if keys is not None else set()
+
+    def _phrase_matches(self, key: str, phrase: str) -> bool:
+        """逐字校验便签是否包含短语"""
+        text = self.load_text(key)
+        return text is not None and normalize_text(phrase) in normalize_text(text)
+
+    def run(self, text: str, limit: int = None) -> dict:
+        """
+        执行查询
+
+        Returns:
+            {'results': [{'key', 'date', 'id', 'title'}]（日期新的在前）,
+             'steps': 每一步使用的索引、估计数和保留的候选数}
+        """
+        clauses = parse_query(text)
+        positives = [clause for clause in clauses if not clause['negated']]
+        negatives = [clause for clause in clauses if clause['negated']]
+        steps = []
+
+        # 从估计候选最少的查询项开始
+        planned = sorted(((self._estimate(clause), clause) for clause in positives), key=lambda item: item[0])
+        candidates: Optional[Set[str]] = None
+        if not planned:
+            candidates = self._date_keys((None, None))
+            steps.append({'clause': "(全部便签)", 'source': SOURCE_NAMES["date"], 'action': "读取",
+                          'estimate': None, 'kept': len(candidates)})
+
+        for estimate, clause in planned:
+            if candidates is not None and not candidates:
+                break
+            if candidates is not None and clause['kind'] == "date" and len(candidates) < estimate:
+                # 候选已经比日期范围内的便签少，直接按键中的日期过滤
+                candidates = {key for key in candidates if _in_range(key, clause['value'])}
+                steps.append({'clause': clause['text'], 'source': "便签键", 'action': "过滤",
+                              'estimate': estimate, 'kept': len(candidates)})
+                continue
+            matched = self._lookup(clause)
+            candidates = matched if candidates is None else candidates & matched
+            steps.append({'clause': clause['text'], 'source': SOURCE_NAMES[clause['kind']],
+                          'action': "读取" if len(steps) == 0 else "求交",
+                          'estimate': estimate, 'kept': len(candidates)})
+
+        for clause in negatives:
+            if not candidates:
+                break
+            if clause['kind'] == "date":
+                candidates = {key for key in candidates if not _in_range(key, clause['value'])}
+                source = "便签键"
+            elif clause['kind'] == "phrase":
+                candidates = {key for key in candidates if not self._phrase_matches(key, clause['value'])}
+                source = "短语校验"
+            else:
+                candidates = candidates - self._lookup(clause)
+                source = SOURCE_NAMES[clause['kind']]
+            steps.append({'clause': clause['text'], 'source': source, 'action': "排除",
+                          'estimate': None, 'kept': len(candidates)})
+
+        ordered = sorted(candidates or (), key=_key_order, reverse=True)
+        phrases = [clause for clause in positives if clause['kind'] == "phrase"]
+        results = []
+        for key in ordered:
+            if phrases:
+                if not all(self._phrase_matches(key, clause['value']) for clause in phrases):
+                    continue
+            date_str, _, note_id = key.partition('_')
+            results.append({'key': key, 'date': date_str, 'id': note_id, 'title': self.search_index.title(key)})
+            if limit is not None and len(results) >= limit:
+                break
+        if phrases:
+            steps.append({'clause': " ".join(clause['text'] for clause in phrases), 'source': "短语校验",
+                          'action': "校验", 'estimate': None, 'kept': len(results)})
+        return {'results': results, 'steps': steps}
+
+    def explain(self, text: str) -> str:
+        """执行查询并返回每一步使用的索引和保留的候选数"""
+        return format_explain(self.run(text)['steps'])
+
+def _key_order(key: str) -> Tuple[str, int, str]:
+    """便签键的排序依据：日期，再按数字ID"""
+    date_str, _, note_id = key.partition('_')
+    return (date_str, int(note_id) if note_id.isdigit() else 0, note_id)
@@ -0,0 +1,173 @@
+import os
+import time
+import secrets
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from .logged_snapshot import LoggedSnapshot
+
+# Crockford Base32，不含 I L O U，按字典序排序即按时间排序
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+UID_LENGTH = 26
+RANDOM_BITS = 80
+
+_uid_lock = threading.Lock()
+_last_uid: Tuple[int, int] = (0, 0)
+
+def _encode(value: int) -> str:
+    """把 128 位整数编码为 26 个字符"""
+    chars = []
+    for _ in range(UID_LENGTH):
+        chars.append(ENCODING[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+def new_uid(timestamp: float = None) -> str:
+    """
+    生成全局唯一、按时间排序的便签ID（与 ULID 相同的布局）
+
+    前 48 位为毫秒时间戳，后 80 位为随机数；同一毫秒内生成的ID在随机部分上递增，
+    保证单调。
+
+    Args:
+        timestamp: 秒级时间戳，默认为当前时间；迁移旧便签时使用其创建时间
+    """
+    global _last_uid
+    millis = int((time.time() if timestamp is None else timestamp) * 1000) & ((1 << 48) - 1)
+    with _uid_lock:
+        last_millis, last_random = _last_uid
+        if millis == last_millis and last_random < (1 << RANDOM_BITS) - 1:
+            random_part = last_random + 1
+        else:
+            random_part = secrets.randbits(RANDOM_BITS)
+        _last_uid = (millis, random_part)
+    return _encode((millis << RANDOM_BITS) | random_part)
+
+def uid_timestamp(uid: str) -> float:
+    """ID中的时间戳（秒）"""
+    value = 0
+    for char in uid[:10]:
+        value = (value << 5) | ENCODING.index(char)
+    return value / 1000
+
+def _created_timestamp(note: dict) -> Optional[float]:
+    """便签创建时间的时间戳，无法解析时返回 None"""
+    try:
+        return datetime.fromisoformat(note.get('created_at', '')).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class NoteRegistry:
+    def __init__(self, index_dir: str):
+        """
+        全局便签注册表：便签 uid -> 所在位置（日期_便签ID）
+
+        由快照 registry.json 和追加日志 registry.log 组成（见 LoggedSnapshot），启动时整体载入内存，
+        按 uid 定位便签为 O(1)，不需要读取日期文件。
+
+        Args:
+            index_dir: 索引文件所在目录
+        """
+        self.store = LoggedSnapshot(os.path.join(index_dir, "registry.json"), os.path.join(index_dir, "registry.log"),
+                                    "便签注册表", key_field="u", value_field="k")
+        self._lock = threading.RLock()
+        # uid -> 便签键，以及反向的便签键 -> uid
+        self._locations: Dict[str, str] = {}
+        self._uids: Dict[str, str] = {}
+        os.makedirs(index_dir, exist_ok=True)
+        self.loaded = self._load()
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _load(self) -> bool:
+        """从快照和日志加载，快照缺失或损坏时返回 False（需要迁移或重建）"""
+        locations = self.store.load()
+        if locations is None:
+            return False
+        self._locations = locations
+        self._uids = {key: uid for uid, key in locations.items()}
+        return True
+
+    def register(self, uid: str, key: str):
+        """登记或移动便签的位置"""
+        self.register_many({uid: key})
+
+    def register_many(self, locations: Dict[str, str]):
+        """批量登记便签位置，日志只追加一次"""
+        with self._lock:
+            changed = []
+            for uid, key in locations.items():
+                old_key = self._locations.get(uid)
+                if old_key == key:
+                    continue
+                if old_key is not None:
+                    self._uids.pop(old_key, None)
+                self._locations[uid] = key
+                self._uids[key] = uid
+                changed.append((uid, key))
+            self.store.append(changed, self._locations)
+
+    def unregister(self, uid: str):
+        """移除已删除的便签"""
+        with self._lock:
+            key = self._locations.pop(uid, None)
+            if key is None:
+                return
+            self._uids.pop(key, None)
+            self.store.append([(uid, None)], self._locations)
+
+    def locate(self, uid: str) -> Optional[str]:
+        """便签的位置（日期_便签ID），不存在时返回 None"""
+        return self._locations.get(uid)
+
+    def uid_for(self, key: str) -> Optional[str]:
+        """某个位置上便签的 uid"""
+        return self._uids.get(key)
+
+    def replace_all(self, locations: Dict[str, str]):
+        """用完整的映射替换注册表并写入快照"""
+        with self._lock:
+            self._locations = dict(locations)
+            self._uids = {key: uid for uid, key in self._locations.items()}
+            self.store.write(self._locations)
+            self.loaded = True
+
+    def migrate(self, storage) -> int:
+        """
+        为没有 uid 的旧便签分配 uid（时间部分取自创建时间）并写回，同时重建注册表
+
+        每个日期只读取、写入一次，且只写入新分配了 uid 的便签。
+
+        Args:
+            storage: 存储后端
+
+        Returns:
+            新分配 uid 的便签数
+        """
+        locations: Dict[str, str] = {}
+        pending: Dict[str, list] = {}
+        for note in storage.iter_notes():
+            key = f"{note['date']}_{note['id']}"
+            if note.get('uid'):
+                locations[note['uid']] = key
+            else:
+                pending.setdefault(note['date'], []).append(note['id'])
+
+        assigned = 0
+        for date_str, note_ids in pending.items():
+            day = datetime.strptime(date_str, '%Y-%m-%d').date()
+            notes = storage.get_daily_notes(day)
+            changed = {}
+            for note_id in note_ids:
+                note = notes.get(note_id)
+                if note is None or note.get('uid'):
+                    continue
+                note['uid'] = new_uid(_created_timestamp(note))
+                changed[note['uid']] = f"{date_str}_{note_id}"
+            if changed and storage.save_notes(notes, day, dirty=[key.partition('_')[2] for key in changed.values()]):
+                locations.update(changed)
+                assigned += len(changed)
+
+        self.replace_all(locations)
+        return assigned
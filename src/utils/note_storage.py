@@ -4,6 +4,11 @@ from typing import List, Dict
 from datetime import datetime
 
 class NoteStorage:
+    """
+    旧版单文件（notes.json）便签存储
+
+    不符合 StorageBackend 协议，仅为读取旧数据保留，新代码请使用 create_storage。
+    """
     def __init__(self, storage_dir: str = "data/notes"):
         self.storage_dir = storage_dir
         self.storage_file = os.path.join(storage_dir, "notes.json")
@@ -0,0 +1,61 @@
+import threading
+from datetime import date, timedelta
+from typing import Callable, List, Optional
+
+def neighbour_days(center: date, radius: int) -> List[date]:
+    """按与中心日期的距离由近到远排列前后 radius 天（不含中心日期）"""
+    days = []
+    for offset in range(1, radius + 1):
+        days.append(center + timedelta(days=offset))
+        days.append(center - timedelta(days=offset))
+    return days
+
+class DayPrefetcher:
+    def __init__(self, load_day: Callable[[date], object]):
+        """
+        在后台线程中预读工作日期附近的便签
+
+        只保留最新一次请求：连续翻页时，未完成的旧请求会在读取下一天前被放弃。
+
+        Args:
+            load_day: 读取某一天的函数，结果应由其自身写入缓存；返回空结果表示
+                该日期没有便签，不计入 loaded_days
+        """
+        self.load_day = load_day
+        self._condition = threading.Condition()
+        self._pending: Optional[tuple] = None
+        self._generation = 0
+        self._thread: Optional[threading.Thread] = None
+        # 实际读到便签的预读天数
+        self.loaded_days = 0
+
+    def request(self, center: date, radius: int):
+        """请求预读 center 前后 radius 天"""
+        if radius <= 0:
+            return
+        with self._condition:
+            self._generation += 1
+            self._pending = (center, radius)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="DayPrefetcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        """工作线程：处理最新的预读请求"""
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                center, radius = self._pending
+                self._pending = None
+                generation = self._generation
+
+            for day in neighbour_days(center, radius):
+                if generation != self._generation:
+                    break
+                try:
+                    if self.load_day(day):
+                        self.loaded_days += 1
+                except Exception as e:
+                    print(f"预读便签失败: {e}")
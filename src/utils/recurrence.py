@@ -0,0 +1,240 @@
+import os
+import json
+import calendar
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from .file_utils import atomic_write_text
+
+# 支持的重复频率；自定义间隔通过 interval（每 N 天/周/月）和 weekdays 表达
+FREQUENCIES = ("daily", "weekly", "monthly")
+# 虚拟便签ID的前缀，便签ID为 r + 规则ID
+VIRTUAL_PREFIX = "r"
+
+def occurs_on(rule: dict, day: date) -> bool:
+    """
+    判断规则在某天是否有一次发生（已转为真实便签或已跳过的日期除外）
+
+    Args:
+        rule: 重复规则，字段见 RecurrenceStore.add_rule
+        day: 日期
+    """
+    start = date.fromisoformat(rule['start'])
+    date_str = day.isoformat()
+    if day < start or (rule.get('until') and date_str > rule['until']):
+        return False
+    if date_str in rule.get('exceptions', ()):
+        return False
+
+    interval = max(1, int(rule.get('interval', 1)))
+    freq = rule['freq']
+    if freq == "daily":
+        return (day - start).days % interval == 0
+    if freq == "weekly":
+        weekdays = rule.get('weekdays') or [start.weekday()]
+        if day.weekday() not in weekdays:
+            return False
+        first_monday = start - timedelta(days=start.weekday())
+        return ((day - first_monday).days // 7) % interval == 0
+    if freq == "monthly":
+        months = (day.year - start.year) * 12 + day.month - start.month
+        if months % interval:
+            return False
+        # 31 号开始的规则在小月落在月末
+        return day.day == min(start.day, calendar.monthrange(day.year, day.month)[1])
+    return False
+
+def occurrences(rule: dict, start: date, end: date) -> List[date]:
+    """规则在范围内（包含首尾）的全部发生日期，只遍历与规则有效期重叠的部分"""
+    first = max(start, date.fromisoformat(rule['start']))
+    last = min(end, date.fromisoformat(rule['until'])) if rule.get('until') else end
+    days = []
+    day = first
+    while day <= last:
+        if occurs_on(rule, day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def virtual_note_id(rule_id: str) -> str:
+    """规则在某天展开出的虚拟便签ID"""
+    return f"{VIRTUAL_PREFIX}{rule_id}"
+
+def expand(rule: dict, day: date) -> dict:
+    """把规则展开为某天的虚拟便签（不写入存储）"""
+    return {
+        'id': virtual_note_id(rule['id']),
+        'title': rule.get('title', ''),
+        'content': rule.get('content', ''),
+        'created_at': rule.get('created_at', ''),
+        'updated_at': rule.get('updated_at', rule.get('created_at', '')),
+        'date': day.isoformat(),
+        'recurrence': rule['id']
+    }
+
+def describe(rule: dict) -> str:
+    """规则的中文描述，例如 “每 2 周的周一、周四”"""
+    interval = max(1, int(rule.get('interval', 1)))
+    every = "每" if interval == 1 else f"每 {interval} "
+    if rule['freq'] == "daily":
+        text = f"{every}天"
+    elif rule['freq'] == "weekly":
+        names = "一二三四五六日"
+        weekdays = rule.get('weekdays') or [date.fromisoformat(rule['start']).weekday()]
+        text = f"{every}周的" + "、".join(f"周{names[weekday]}" for weekday in sorted(weekdays))
+    else:
+        text = f"{every}个月的 {date.fromisoformat(rule['start']).day} 号"
+    if rule.get('until'):
+        text += f"，直到 {rule['until']}"
+    return text
+
+class RecurrenceStore:
+    def __init__(self, file_path: str):
+        """
+        重复规则存储：每条规则只保存一次，查看某天时才展开为虚拟便签
+
+        某次发生被编辑时由调用方写成真实便签，并把该日期记为例外，
+        之后不再展开；删除某次发生同样记为例外。
+
+        Args:
+            file_path: 规则文件路径（JSON）
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.rules: Dict[str, dict] = {}
+        # 规则ID单调递增，删除后不复用，避免与已转为真实便签的 r+ID 冲突
+        self.next_id = 1
+        self._load()
+
+    def _load(self):
+        """加载规则文件"""
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.rules = data.get('rules', {})
+            self.next_id = data.get('next_id', len(self.rules) + 1)
+        except Exception as e:
+            print(f"加载重复规则失败: {e}")
+
+    def _save(self) -> bool:
+        """写入规则文件（调用方需持有锁）"""
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+            atomic_write_text(self.file_path, json.dumps(
+                {'next_id': self.next_id, 'rules': self.rules}, ensure_ascii=False, indent=2
+            ))
+            return True
+        except Exception as e:
+            print(f"保存重复规则失败: {e}")
+            return False
+
+    def add_rule(self, title: str, content: str, freq: str, start: date, interval: int = 1,
+                 weekdays: List[int] = None, until: date = None) -> Optional[dict]:
+        """
+        添加重复规则
+
+        Args:
+            title: 便签标题
+            content: 便签内容
+            freq: daily、weekly 或 monthly
+            start: 第一次发生的日期
+            interval: 每隔几个周期发生一次
+            weekdays: 每周重复时在星期几（0 为周一），默认为 start 的星期
+            until: 最后日期（包含），None 表示一直重复
+
+        Returns:
+            新规则，参数有误或保存失败时返回 None
+        """
+        if freq not in FREQUENCIES or interval < 1:
+            print(f"无效的重复规则: {freq}, 间隔 {interval}")
+            return None
+        if until is not None and until < start:
+            print("重复规则的结束日期早于开始日期")
+            return None
+        now = datetime.now().isoformat()
+        with self._lock:
+            rule = {
+                'id': str(self.next_id),
+                'title': title,
+                'content': content,
+                'freq': freq,
+                'interval': interval,
+                'weekdays': sorted(set(weekdays)) if weekdays else [],
+                'start': start.isoformat(),
+                'until': until.isoformat() if until is not None else None,
+                'exceptions': [],
+                'created_at': now,
+                'updated_at': now
+            }
+            self.rules[rule['id']] = rule
+            self.next_id += 1
+            if not self._save():
+                del self.rules[rule['id']]
+                return None
+            return dict(rule)
+
+    def update_rule(self, rule_id: str, **fields) -> Optional[dict]:
+        """修改规则的标题、内容或重复方式，只影响尚未转为真实便签的发生"""
+        with self._lock:
+            rule = self.rules.get(rule_id)
+            if rule is None:
+                return None
+            for key, value in fields.items():
+                if isinstance(value, date):
+                    value = value.isoformat()
+                rule[key] = value
+            rule['updated_at'] = datetime.now().isoformat()
+            self._save()
+            return dict(rule)
+
+    def remove_rule(self, rule_id: str) -> bool:
+        """删除规则，已转为真实便签的发生保留"""
+        with self._lock:
+            if self.rules.pop(rule_id, None) is None:
+                return False
+            return self._save()
+
+    def get_rule(self, rule_id: str) -> Optional[dict]:
+        """获取规则"""
+        rule = self.rules.get(rule_id)
+        return dict(rule) if rule is not None else None
+
+    def list_rules(self) -> List[dict]:
+        """全部规则，按创建顺序"""
+        return [dict(rule) for _, rule in sorted(self.rules.items(), key=lambda item: int(item[0]))]
+
+    def add_exception(self, rule_id: str, day: date) -> bool:
+        """某天的发生已转为真实便签或被删除，不再展开"""
+        with self._lock:
+            rule = self.rules.get(rule_id)
+            if rule is None:
+                return False
+            date_str = day.isoformat()
+            if date_str not in rule['exceptions']:
+                rule['exceptions'].append(date_str)
+                rule['exceptions'].sort()
+                return self._save()
+            return True
+
+    def rule_for_note(self, note_id: str) -> Optional[dict]:
+        """虚拟便签ID对应的规则，不是虚拟便签时返回 None"""
+        if not note_id.startswith(VIRTUAL_PREFIX):
+            return None
+        return self.rules.get(note_id[len(VIRTUAL_PREFIX):])
+
+    def expand_day(self, day: date) -> Dict[str, dict]:
+        """展开某天的全部虚拟便签：{便签ID: 便签}"""
+        return {
+            virtual_note_id(rule['id']): expand(rule, day)
+            for rule in list(self.rules.values()) if occurs_on(rule, day)
+        }
+
+    def expand_range(self, start: date, end: date) -> Dict[str, Dict[str, dict]]:
+        """展开范围内（包含首尾）的虚拟便签：{日期: {便签ID: 便签}}"""
+        days: Dict[str, Dict[str, dict]] = {}
+        for rule in list(self.rules.values()):
+            for day in occurrences(rule, start, end):
+                days.setdefault(day.isoformat(), {})[virtual_note_id(rule['id'])] = expand(rule, day)
+        return dict(sorted(days.items()))
@@ -0,0 +1,314 @@
+import os
+import json
+import zlib
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 记录头：负载长度、类型、保存时间（Unix 秒）
+HEADER = struct.Struct(">IBd")
+KIND_SNAPSHOT = 0
+KIND_DELTA = 1
+
+def common_prefix_len(a: str, b: str) -> int:
+    """两个字符串公共前缀的长度（二分比较切片，避免逐字符循环）"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+def common_suffix_len(a: str, b: str, limit: int) -> int:
+    """两个字符串公共后缀的长度，不超过 limit"""
+    low, high = 0, min(len(a), len(b), limit)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+def make_delta(old: str, new: str) -> Tuple[int, int, str]:
+    """生成 (公共前缀长度, 公共后缀长度, 中间插入的文本)"""
+    prefix = common_prefix_len(old, new)
+    suffix = common_suffix_len(old, new, min(len(old), len(new)) - prefix)
+    return prefix, suffix, new[prefix:len(new) - suffix]
+
+def apply_delta(old: str, prefix: int, suffix: int, inserted: str) -> str:
+    """把 make_delta 的结果应用到旧文本"""
+    return old[:prefix] + inserted + old[len(old) - suffix:]
+
+class RevisionStore:
+    def __init__(self, revision_dir: str, snapshot_interval: int = 20, coalesce_seconds: float = 60):
+        """
+        便签修订历史：定期全文快照 + 压缩的增量
+
+        每个便签一个只追加的文件。每条记录是 zlib 压缩的快照或相对
+        上一版本的增量，每 snapshot_interval 个版本写一次快照，因此
+        还原任意版本最多读取一个快照和 snapshot_interval - 1 个增量。
+        coalesce_seconds 内的连续保存只保留最后一次（逐键保存时不会
+        每个按键都产生一个版本）。
+
+        Args:
+            revision_dir: 修订文件目录
+            snapshot_interval: 相邻快照之间最多的版本数
+            coalesce_seconds: 合并连续保存的时间窗口
+        """
+        self.revision_dir = revision_dir
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.coalesce_seconds = coalesce_seconds
+        self._lock = threading.RLock()
+        # 便签键 -> 已写入的版本头 [(偏移, 类型, 时间)]
+        self._headers: Dict[str, List[Tuple[int, int, float]]] = {}
+        # 便签键 -> 最新版本 (标题, 正文)，用于计算增量
+        self._latest: Dict[str, Tuple[str, str]] = {}
+        # 便签键 -> 尚未写入的版本 (时间, 标题, 正文)
+        self._pending: Dict[str, Tuple[float, str, str]] = {}
+        self._prune_thread: Optional[threading.Thread] = None
+        os.makedirs(revision_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """便签对应的修订文件"""
+        return os.path.join(self.revision_dir, f"{key}.rev")
+
+    def _load_headers(self, key: str) -> List[Tuple[int, int, float]]:
+        """读取（并缓存）修订文件中的全部记录头"""
+        if key in self._headers:
+            return self._headers[key]
+        headers = []
+        path = self._path(key)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                offset = 0
+                while True:
+                    raw = f.read(HEADER.size)
+                    if len(raw) < HEADER.size:
+                        break
+                    length, kind, saved_at = HEADER.unpack(raw)
+                    f.seek(length, os.SEEK_CUR)
+                    if f.tell() < offset + HEADER.size + length:
+                        # 写入中断留下的不完整记录
+                        break
+                    headers.append((offset, kind, saved_at))
+                    offset += HEADER.size + length
+        self._headers[key] = headers
+        return headers
+
+    def _read_payload(self, f, offset: int) -> dict:
+        """读取并解压一条记录"""
+        f.seek(offset)
+        length, _, _ = HEADER.unpack(f.read(HEADER.size))
+        return json.loads(zlib.decompress(f.read(length)).decode('utf-8'))
+
+    def _materialize(self, key: str, index: int) -> Tuple[str, str]:
+        """还原第 index 个版本的 (标题, 正文)"""
+        headers = self._load_headers(key)
+        start = index
+        while headers[start][1] != KIND_SNAPSHOT:
+            start -= 1
+        with open(self._path(key), 'rb') as f:
+            payload = self._read_payload(f, headers[start][0])
+            title, content = payload['title'], payload['content']
+            for offset, _, _ in headers[start + 1:index + 1]:
+                payload = self._read_payload(f, offset)
+                title = payload['title']
+                content = apply_delta(content, payload['prefix'], payload['suffix'], payload['inserted'])
+        return title, content
+
+    def _append(self, key: str, saved_at: float, title: str, content: str):
+        """写入一个新版本（调用方需持有锁）"""
+        headers = self._load_headers(key)
+        if key not in self._latest and headers:
+            self._latest[key] = self._materialize(key, len(headers) - 1)
+        previous = self._latest.get(key)
+        if previous == (title, content):
+            return
+
+        since_snapshot = 0
+        for _, kind, _ in reversed(headers):
+            if kind == KIND_SNAPSHOT:
+                break
+            since_snapshot += 1
+
+        kind = KIND_SNAPSHOT
+        payload = {'title': title, 'content': content}
+        if previous is not None and headers and since_snapshot + 1 < self.snapshot_interval:
+            prefix, suffix, inserted = make_delta(previous[1], content)
+            # 改动超过一半时直接存快照更划算
+            if len(inserted) * 2 < len(content):
+                kind = KIND_DELTA
+                payload = {'title': title, 'prefix': prefix, 'suffix': suffix, 'inserted': inserted}
+
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        path = self._path(key)
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(path, 'ab') as f:
+            f.write(HEADER.pack(len(data), kind, saved_at) + data)
+        headers.append((offset, kind, saved_at))
+        self._latest[key] = (title, content)
+
+    def record(self, key: str, title: str, content: str, force: bool = False):
+        """
+        记录便签的新版本
+
+        Args:
+            key: 便签键（便签 uid，没有 uid 的便签为 日期_便签ID）
+            force: 立即写入，不做合并（例如删除前保存最后状态）
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                headers = self._load_headers(key)
+                last_saved = headers[-1][2] if headers else None
+                if force or last_saved is None or now - last_saved >= self.coalesce_seconds:
+                    self._pending.pop(key, None)
+                    self._append(key, now, title, content)
+                else:
+                    self._pending[key] = (now, title, content)
+            except Exception as e:
+                print(f"记录便签历史失败: {e}")
+
+    def flush(self, key: str = None):
+        """写入尚未落盘的合并版本"""
+        with self._lock:
+            keys = [key] if key is not None else list(self._pending)
+            for pending_key in keys:
+                pending = self._pending.pop(pending_key, None)
+                if pending is None:
+                    continue
+                try:
+                    self._append(pending_key, *pending)
+                except Exception as e:
+                    print(f"记录便签历史失败: {e}")
+
+    def list_revisions(self, key: str) -> List[dict]:
+        """列出便签的全部版本（从旧到新），每项包含 index 和 saved_at"""
+        self.flush(key)
+        with self._lock:
+            return [
+                {'index': index, 'saved_at': saved_at, 'snapshot': kind == KIND_SNAPSHOT}
+                for index, (_, kind, saved_at) in enumerate(self._load_headers(key))
+            ]
+
+    def get_revision(self, key: str, index: int) -> Optional[dict]:
+        """获取指定版本的标题和正文，版本不存在时返回 None"""
+        self.flush(key)
+        with self._lock:
+            headers = self._load_headers(key)
+            if not -len(headers) <= index < len(headers):
+                return None
+            index %= len(headers)
+            title, content = self._materialize(key, index)
+            return {'index': index, 'saved_at': headers[index][2], 'title': title, 'content': content}
+
+    def adopt(self, old_key: str, new_key: str, since: float) -> bool:
+        """
+        把旧键下的修订文件改到新键下（修订历史改用便签 uid 为键时迁移）
+
+        旧文件的第一个版本早于 since（便签的创建时间）时，说明它属于曾经使用
+        同一个键、已被删除的便签，此时改名归档（键加 ~ 和最后保存时间），
+        不并入新便签的历史。
+
+        Returns:
+            是否迁移了旧文件
+        """
+        with self._lock:
+            if new_key in self._headers or old_key == new_key:
+                return False
+            old_path = self._path(old_key)
+            if os.path.exists(self._path(new_key)) or not os.path.exists(old_path):
+                return False
+            self.flush(old_key)
+            headers = self._load_headers(old_key)
+            self._headers.pop(old_key, None)
+            self._latest.pop(old_key, None)
+            # 允许 1 秒误差：创建时间和首次保存可能在同一秒内
+            if headers and headers[0][2] >= since - 1:
+                os.replace(old_path, self._path(new_key))
+                return True
+            last_saved = int(headers[-1][2]) if headers else 0
+            os.replace(old_path, self._path(f"{old_key}~{last_saved}"))
+            return False
+
+    def thin_out(self, key: str, now: float = None) -> int:
+        """
+        按保留策略精简一个便签的旧版本，返回删除的版本数
+
+        最近 1 天全部保留，7 天内每小时保留一个，90 天内每天保留一个，
+        更早的每周保留一个；最新版本总是保留。
+        """
+        now = now or time.time()
+        with self._lock:
+            self.flush(key)
+            headers = self._load_headers(key)
+            if len(headers) < 2:
+                return 0
+
+            keep = []
+            seen_buckets = set()
+            for index in range(len(headers) - 1, -1, -1):
+                age = now - headers[index][2]
+                if age < 86400 or index == len(headers) - 1:
+                    keep.append(index)
+                    continue
+                bucket_size = 3600 if age < 7 * 86400 else 86400 if age < 90 * 86400 else 7 * 86400
+                bucket = (bucket_size, int(headers[index][2] // bucket_size))
+                if bucket not in seen_buckets:
+                    seen_buckets.add(bucket)
+                    keep.append(index)
+            if len(keep) == len(headers):
+                return 0
+
+            # 依次还原保留的版本，重新编码成新的快照/增量序列
+            kept_versions = []
+            keep_set = set(keep)
+            title = content = None
+            with open(self._path(key), 'rb') as f:
+                for index, (offset, kind, saved_at) in enumerate(headers):
+                    payload = self._read_payload(f, offset)
+                    title = payload['title']
+                    if kind == KIND_SNAPSHOT:
+                        content = payload['content']
+                    else:
+                        content = apply_delta(content, payload['prefix'], payload['suffix'], payload['inserted'])
+                    if index in keep_set:
+                        kept_versions.append((saved_at, title, content))
+
+            path = self._path(key)
+            tmp_path = path + ".tmp"
+            os.replace(path, tmp_path)
+            self._headers[key] = []
+            self._latest.pop(key, None)
+            try:
+                for version in kept_versions:
+                    self._append(key, *version)
+            except Exception:
+                # 重写失败时恢复原文件
+                os.replace(tmp_path, path)
+                self._headers.pop(key, None)
+                raise
+            os.remove(tmp_path)
+            return len(headers) - len(kept_versions)
+
+    def thin_out_all(self) -> int:
+        """精简所有便签的旧版本，返回删除的版本总数"""
+        removed = 0
+        for filename in os.listdir(self.revision_dir):
+            if filename.endswith('.rev'):
+                try:
+                    removed += self.thin_out(filename[:-len('.rev')])
+                except Exception as e:
+                    print(f"精简便签历史 {filename} 失败: {e}")
+        return removed
+
+    def start_thin_out(self):
+        """在后台线程中精简所有便签的旧版本"""
+        if self._prune_thread is not None and self._prune_thread.is_alive():
+            return
+        self._prune_thread = threading.Thread(target=self.thin_out_all, name="RevisionThinOut", daemon=True)
+        self._prune_thread.start()
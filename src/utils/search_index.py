@@ -0,0 +1,631 @@
+import os
+import re
+import json
+import math
+import zlib
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .file_utils import atomic_write_bytes
+from .background_index import BackgroundIndex
+
+# 按单字和相邻二字切分的文字：日文假名、中日韩统一表意文字、韩文音节
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+# 一段连续的中日韩文字，或一个其他文字的单词（不含下划线）
+TOKEN_PATTERN = re.compile(f"([{CJK_RANGES}]+)|([^\\W_{CJK_RANGES}]+)")
+# #标签，前面不能紧跟文字或 #（避免匹配 ## 标题）
+TAG_PATTERN = re.compile(r"(?<![\w#])#(\w+)")
+# 查询中的 "短语" 或普通词
+QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+SNAPSHOT_VERSION = 1
+# 日志超过该行数（且超过文档数的四分之一）或该字节数时在后台合并进快照
+COMPACT_MIN_LINES = 200
+COMPACT_MAX_BYTES = 4 * 1024 * 1024
+# 词频饱和参数（BM25 的 k1）
+TF_SATURATION = 1.2
+# 查询词出现在标题中时的加分
+TITLE_BONUS = 2.0
+
+def tokenize(text: str) -> List[str]:
+    """把文本切分为检索词：其他文字按单词（小写），中日韩文字同时产出单字和相邻二字"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        cjk, word = match.groups()
+        if word:
+            tokens.append(word)
+        else:
+            tokens.extend(cjk)
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+def extract_tags(text: str) -> List[str]:
+    """提取文本中的 #标签（小写，带 #）"""
+    return [f"#{tag.lower()}" for tag in TAG_PATTERN.findall(text)]
+
+def query_terms(text: str) -> List[str]:
+    """查询文本对应的检索词：中日韩文字两个字以上时只用二字，更有区分度"""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        cjk, word = match.groups()
+        if word:
+            terms.append(word)
+        elif len(cjk) == 1:
+            terms.append(cjk)
+        else:
+            terms.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return terms
+
+def normalize_text(text: str) -> str:
+    """短语比较用的规范形式：小写并合并空白"""
+    return " ".join(text.lower().split())
+
+def parse_query(query: str) -> List[Tuple[str, str]]:
+    """
+    解析查询为 [(类型, 文本)]，各项之间为“与”的关系
+
+    类型为 phrase（"带引号的短语"，需逐字匹配）、tag（#标签）、
+    prefix（以 * 结尾的前缀）或 term（普通词）。
+    """
+    clauses = []
+    for match in QUERY_PATTERN.finditer(query):
+        phrase, word = match.groups()
+        if phrase is not None:
+            clauses.append(("phrase", phrase))
+        elif word.startswith('#') and len(word) > 1:
+            clauses.append(("tag", word))
+        elif word.endswith('*') and len(word) > 1:
+            clauses.append(("prefix", word[:-1]))
+        else:
+            clauses.append(("term", word))
+    return clauses
+
+def highlight_terms(query: str) -> List[str]:
+    """查询中需要在结果中高亮的文本（小写），长的在前"""
+    texts = []
+    for kind, text in parse_query(query):
+        texts.extend([text] if kind == "phrase" else text.split())
+    return sorted({text.lower() for text in texts if text}, key=len, reverse=True)
+
+def make_snippet(text: str, query: str, width: int = 80) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    截取正文中第一个命中查询的片段
+
+    Args:
+        text: 便签正文
+        query: 查询文本
+        width: 片段的大致长度
+
+    Returns:
+        (片段, [(高亮起点, 高亮终点)])，位置相对于片段
+    """
+    terms = highlight_terms(query)
+    lowered = text.lower()
+    first = min((index for index in (lowered.find(term) for term in terms) if index >= 0), default=0)
+    start = max(0, first - width // 4)
+    end = min(len(text), start + width)
+    snippet = " ".join(text[start:end].split())
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet += "…"
+
+    spans = []
+    lowered_snippet = snippet.lower()
+    for term in terms:
+        position = lowered_snippet.find(term)
+        while position >= 0:
+            span = (position, position + len(term))
+            # 较长的词已覆盖的位置不再重复高亮
+            if not any(s < span[1] and span[0] < e for s, e in spans):
+                spans.append(span)
+            position = lowered_snippet.find(term, position + len(term))
+    return snippet, sorted(spans)
+
+class SearchIndex(BackgroundIndex):
+    index_name = "搜索索引"
+    thread_name = "SearchIndexLoad"
+
+    def __init__(self, index_dir: str, documents: Callable[[], Iterable[Tuple[str, str, str]]] = None):
+        """
+        便签全文倒排索引
+
+        每个检索词对应按文档号排序的 (文档号, 词频) 数组，文档为单个便签，
+        以 日期_便签ID 为键。保存便签时只重新索引该便签。磁盘上由压缩快照
+        search.idx 和追加日志 search.log 组成，日志只记录词频的变化（不含正文），
+        行数或大小超限时在后台合并。加载和重建见 BackgroundIndex。
+
+        Args:
+            index_dir: 索引文件所在目录
+            documents: 重建索引时遍历全部便签的函数，产出 (键, 标题, 正文)
+        """
+        self.snapshot_file = os.path.join(index_dir, "search.idx")
+        self.log_file = os.path.join(index_dir, "search.log")
+        # 后台合并期间轮换出来的旧日志
+        self.old_log_file = self.log_file + ".old"
+        super().__init__(documents)
+        self._keys: List[Optional[str]] = []
+        self._doc_ids: Dict[str, int] = {}
+        self._titles: Dict[int, str] = {}
+        # 文档号 -> 该文档包含的检索词，用于更新时找出需要移除的词
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # 全部检索词的有序列表，用于前缀查询
+        self._terms: List[str] = []
+        self._log_lines = 0
+        self._log_bytes = 0
+        self._compact_thread: Optional[threading.Thread] = None
+        os.makedirs(index_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._doc_ids)
+
+    # ---- 加载与持久化 ----
+
+    def _reset(self):
+        """清空内存中的索引（调用方需持有锁）"""
+        self._keys = []
+        self._doc_ids = {}
+        self._titles = {}
+        self._doc_terms = {}
+        self._postings = {}
+        self._terms = []
+
+    def _load(self) -> bool:
+        """从快照和日志加载索引，快照缺失或损坏时返回 False"""
+        if not os.path.exists(self.snapshot_file):
+            return False
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+            if data.get("v") != SNAPSHOT_VERSION:
+                return False
+        except Exception as e:
+            print(f"加载搜索索引失败: {e}")
+            return False
+
+        self._reset()
+        self._keys = data["keys"]
+        self._doc_ids = {key: doc_id for doc_id, key in enumerate(self._keys) if key is not None}
+        self._titles = {doc_id: data["titles"][doc_id] for doc_id in self._doc_ids.values()}
+        self._terms = data["terms"]
+        doc_terms: Dict[int, List[str]] = {doc_id: [] for doc_id in self._doc_ids.values()}
+        for term, gaps, tfs in zip(self._terms, data["docs"], data["tfs"]):
+            ids = array('I', accumulate(gaps))
+            self._postings[term] = (ids, array('H', tfs))
+            for doc_id in ids:
+                doc_terms[doc_id].append(term)
+        self._doc_terms = {doc_id: tuple(terms) for doc_id, terms in doc_terms.items()}
+
+        # 依次重放合并中断时留下的旧日志和当前日志
+        interrupted = os.path.exists(self.old_log_file)
+        self._log_lines = 0
+        self._log_bytes = 0
+        for log_file in (self.old_log_file, self.log_file):
+            if not os.path.exists(log_file):
+                continue
+            self._log_bytes += os.path.getsize(log_file)
+            with open(log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 写入中断留下的不完整行
+                        continue
+                    self._log_lines += 1
+                    if "c" in record:
+                        # 旧版本的日志记录完整正文
+                        self._apply_update(record["k"], record["t"], record["c"])
+                    elif "t" in record:
+                        self._apply_delta(record["k"], record["t"], record.get("s", {}), record.get("r", ()))
+                    else:
+                        self._apply_remove(record["k"])
+        if interrupted:
+            self._write_snapshot(self._capture())
+        return True
+
+    def _capture(self) -> dict:
+        """在锁内复制索引数据并轮换日志，之后可在锁外序列化"""
+        if os.path.exists(self.log_file):
+            if os.path.exists(self.old_log_file):
+                # 上次合并未完成，旧日志尚未进入快照，接在其后
+                with open(self.old_log_file, 'a', encoding='utf-8') as old, \
+                        open(self.log_file, 'r', encoding='utf-8') as current:
+                    old.write(current.read())
+                os.remove(self.log_file)
+            else:
+                os.replace(self.log_file, self.old_log_file)
+        self._log_lines = 0
+        self._log_bytes = 0
+        terms = list(self._terms)
+        return {
+            "keys": list(self._keys),
+            "titles": [self._titles.get(doc_id, "") for doc_id in range(len(self._keys))],
+            "terms": terms,
+            "postings": [(array('I', self._postings[term][0]), array('H', self._postings[term][1])) for term in terms],
+        }
+
+    def _write_snapshot(self, captured: dict):
+        """序列化 _capture 的结果并写入快照，文档号按差值存储以便压缩"""
+        docs = []
+        tfs = []
+        for ids, term_tfs in captured["postings"]:
+            docs.append([ids[0]] + [b - a for a, b in zip(ids, ids[1:])])
+            tfs.append(term_tfs.tolist())
+        data = {
+            "v": SNAPSHOT_VERSION,
+            "keys": captured["keys"],
+            "titles": captured["titles"],
+            "terms": captured["terms"],
+            "docs": docs,
+            "tfs": tfs,
+        }
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        atomic_write_bytes(self.snapshot_file, zlib.compress(text.encode('utf-8'), 6))
+        if os.path.exists(self.old_log_file):
+            os.remove(self.old_log_file)
+
+    def compact(self):
+        """把日志合并进快照"""
+        with self._lock:
+            captured = self._capture()
+        try:
+            self._write_snapshot(captured)
+        except Exception as e:
+            print(f"保存搜索索引失败: {e}")
+
+    def _maybe_compact(self):
+        """日志过长时在后台合并（调用方需持有锁）"""
+        if self._log_lines <= max(COMPACT_MIN_LINES, len(self._doc_ids) // 4) and \
+                self._log_bytes <= COMPACT_MAX_BYTES:
+            return
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self.compact, name="SearchIndexCompact", daemon=True)
+        self._compact_thread.start()
+
+    def flush(self):
+        """等待后台合并结束，并把剩余日志合并进快照（退出前调用）"""
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+        if self._loaded and self._log_lines:
+            self.compact()
+
+    def _build(self, documents: Iterable[Tuple[str, str, str]]) -> "SearchIndex":
+        """在单独的实例中建出新索引，不写盘"""
+        builder = SearchIndex(os.path.dirname(self.snapshot_file))
+        for key, title, content in documents:
+            builder._apply_update(key, title, content)
+        return builder
+
+    def _install(self, builder: "SearchIndex"):
+        """换上新建的索引并丢弃旧日志（调用方需持有锁）"""
+        self._keys = builder._keys
+        self._doc_ids = builder._doc_ids
+        self._titles = builder._titles
+        self._doc_terms = builder._doc_terms
+        self._postings = builder._postings
+        self._terms = builder._terms
+        for log_file in (self.log_file, self.old_log_file):
+            if os.path.exists(log_file):
+                os.remove(log_file)
+
+    def _size(self) -> int:
+        return len(self._doc_ids)
+
+    def _save_locked(self) -> dict:
+        return self._capture()
+
+    def _save_unlocked(self, captured: dict):
+        self._write_snapshot(captured)
+
+    # ---- 增量更新 ----
+
+    def _apply_update(self, key: str, title: str, content: str) -> Tuple[Dict[str, int], List[str]]:
+        """
+        在内存中重新索引一个文档，只改动词或词频发生变化的部分
+
+        Returns:
+            (新增或词频变化的词 -> 词频, 移除的词)，即写入日志的增量
+        """
+        counts = Counter(tokenize(title))
+        counts.update(tokenize(content))
+        counts.update(extract_tags(title))
+        counts.update(extract_tags(content))
+
+        doc_id = self._doc_ids.get(key)
+        if doc_id is None:
+            changed = {term: min(tf, 0xFFFF) for term, tf in counts.items()}
+            removed = []
+        else:
+            changed = {}
+            for term, tf in counts.items():
+                tf = min(tf, 0xFFFF)
+                if self._term_frequency(term, doc_id) != tf:
+                    changed[term] = tf
+            removed = [term for term in self._doc_terms[doc_id] if term not in counts]
+        self._apply_delta(key, title, changed, removed)
+        return changed, removed
+
+    def _apply_delta(self, key: str, title: str, changed: Dict[str, int], removed: Iterable[str]):
+        """在内存中应用一个文档的词频增量"""
+        doc_id = self._doc_ids.get(key)
+        if doc_id is None:
+            doc_id = len(self._keys)
+            self._keys.append(key)
+            self._doc_ids[key] = doc_id
+            terms = set()
+        else:
+            terms = set(self._doc_terms[doc_id])
+
+        for term in removed:
+            if term in terms:
+                self._remove_posting(term, doc_id)
+                terms.discard(term)
+        for term, tf in changed.items():
+            self._set_posting(term, doc_id, tf)
+            terms.add(term)
+        self._doc_terms[doc_id] = tuple(terms)
+        self._titles[doc_id] = title
+
+    def _term_frequency(self, term: str, doc_id: int) -> int:
+        """检索词在文档中的词频，不包含时返回 0"""
+        posting = self._postings.get(term)
+        if posting is None:
+            return 0
+        ids, tfs = posting
+        index = bisect_left(ids, doc_id)
+        return tfs[index] if index < len(ids) and ids[index] == doc_id else 0
+
+    def _apply_remove(self, key: str):
+        """在内存中移除一个文档"""
+        doc_id = self._doc_ids.pop(key, None)
+        if doc_id is None:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            self._remove_posting(term, doc_id)
+        self._titles.pop(doc_id, None)
+        self._keys[doc_id] = None
+
+    def _set_posting(self, term: str, doc_id: int, tf: int):
+        """设置检索词在文档中的词频，必要时插入"""
+        posting = self._postings.get(term)
+        if posting is None:
+            self._postings[term] = (array('I', [doc_id]), array('H', [tf]))
+            insort(self._terms, term)
+            return
+        ids, tfs = posting
+        index = bisect_left(ids, doc_id)
+        if index < len(ids) and ids[index] == doc_id:
+            tfs[index] = tf
+        else:
+            ids.insert(index, doc_id)
+            tfs.insert(index, tf)
+
+    def _remove_posting(self, term: str, doc_id: int):
+        """从检索词的倒排表中移除文档，表为空时移除该词"""
+        ids, tfs = self._postings[term]
+        index = bisect_left(ids, doc_id)
+        if index < len(ids) and ids[index] == doc_id:
+            del ids[index]
+            del tfs[index]
+        if not ids:
+            del self._postings[term]
+            del self._terms[bisect_left(self._terms, term)]
+
+    def _append_log(self, record: dict):
+        """追加一条日志（调用方需持有锁）"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._log_lines += 1
+            self._log_bytes += len(line.encode('utf-8'))
+            self._maybe_compact()
+        except Exception as e:
+            print(f"更新搜索索引失败: {e}")
+
+    def _update_locked(self, key: str, title: str, content: str):
+        """应用更新并写日志（调用方需持有锁）"""
+        doc_id = self._doc_ids.get(key)
+        old_title = self._titles.get(doc_id) if doc_id is not None else None
+        changed, removed = self._apply_update(key, title, content)
+        if not changed and not removed and old_title == title:
+            # 内容变化未影响索引，不写日志
+            return
+        record = {"k": key, "t": title}
+        if changed:
+            record["s"] = changed
+        if removed:
+            record["r"] = removed
+        self._append_log(record)
+
+    def _remove_locked(self, key: str):
+        """移除便签并写日志（调用方需持有锁）"""
+        if key not in self._doc_ids:
+            return
+        self._apply_remove(key)
+        self._append_log({"k": key})
+
+    def _apply_locked(self, key: str, document: Optional[Tuple[str, str]]):
+        """应用 (标题, 正文) 或删除（None）并写日志（调用方需持有锁）"""
+        if document is None:
+            self._remove_locked(key)
+        else:
+            self._update_locked(key, *document)
+
+    def update(self, key: str, title: str, content: str):
+        """索引新增或修改的便签（正在重建时排队，不等待）"""
+        self._submit(key, (title, content))
+
+    def remove(self, key: str):
+        """从索引中移除便签（正在重建时排队，不等待）"""
+        self._submit(key, None)
+
+    # ---- 查询 ----
+
+    def _docs_for_terms(self, terms: List[str], prefix: bool = False) -> Optional[Set[int]]:
+        """
+        同时包含全部检索词的文档号（调用方需持有锁）
+
+        prefix 为 True 时最后一个词按前缀匹配。没有检索词时返回 None。
+        """
+        if not terms:
+            return None
+        groups = []
+        for index, term in enumerate(terms):
+            if prefix and index == len(terms) - 1:
+                start = bisect_left(self._terms, term)
+                end = bisect_left(self._terms, term + "\uffff")
+                docs = set()
+                for matched in self._terms[start:end]:
+                    docs.update(self._postings[matched][0])
+                groups.append(docs)
+            else:
+                posting = self._postings.get(term)
+                groups.append(posting[0] if posting is not None else ())
+        # 从最短的倒排表开始求交集
+        groups.sort(key=len)
+        result = set(groups[0])
+        for group in groups[1:]:
+            if not result:
+                break
+            if len(result) * 20 < len(group):
+                # 候选已经很少时逐个二分查找，避免遍历长倒排表
+                result = {doc_id for doc_id in result if _contains(group, doc_id)}
+            else:
+                result.intersection_update(group)
+        return result
+
+    def _clause_terms(self, kind: str, text: str) -> List[str]:
+        """查询项对应的检索词"""
+        if kind == "tag":
+            return [text.lower()]
+        return query_terms(text)
+
+    def _rank(self, candidates: Set[int], terms: List[str], titles: List[str]) -> List[Tuple[float, str, str]]:
+        """
+        按词频和逆文档频率为候选打分并排序，标题命中查询项时加分（调用方需持有锁）
+
+        Returns:
+            [(分数, 键, 标题)]，分数相同时日期较新的在前
+        """
+        total = len(self._doc_ids) or 1
+        scores = dict.fromkeys(candidates, 0.0)
+        for term in set(terms):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            weight = math.log(1 + total / len(ids))
+            if len(ids) > len(scores) * 20:
+                for doc_id in scores:
+                    index = bisect_left(ids, doc_id)
+                    tf = tfs[index]
+                    scores[doc_id] += weight * tf / (tf + TF_SATURATION)
+            else:
+                for doc_id, tf in zip(ids, tfs):
+                    if doc_id in scores:
+                        scores[doc_id] += weight * tf / (tf + TF_SATURATION)
+
+        titles = [text for text in titles if text]
+        keys = self._keys
+        doc_titles = self._titles
+        ranked = []
+        for doc_id, score in scores.items():
+            title = doc_titles.get(doc_id, "")
+            lowered = title.lower()
+            for text in titles:
+                if text in lowered:
+                    score += TITLE_BONUS
+            ranked.append((score, keys[doc_id], title))
+        ranked.sort(reverse=True)
+        return ranked
+
+    def match_clause(self, kind: str, text: str) -> Optional[Set[str]]:
+        """单个查询项匹配的便签键（短语未逐字校验），查询项没有检索词时返回 None"""
+        self._ensure_loaded()
+        with self._lock:
+            docs = self._docs_for_terms(self._clause_terms(kind, text), prefix=(kind == "prefix"))
+            if docs is None:
+                return None
+            return {self._keys[doc_id] for doc_id in docs}
+
+    def title(self, key: str) -> str:
+        """已索引便签的标题，不在索引中时返回空字符串"""
+        self._ensure_loaded()
+        with self._lock:
+            doc_id = self._doc_ids.get(key)
+            return self._titles.get(doc_id, "") if doc_id is not None else ""
+
+    def estimate(self, kind: str, text: str) -> int:
+        """单个查询项匹配文档数的上限（最短倒排表的长度），用于安排求交集的顺序"""
+        self._ensure_loaded()
+        with self._lock:
+            terms = self._clause_terms(kind, text)
+            if kind == "prefix":
+                terms = terms[:-1]
+            lengths = [len(self._postings[term][0]) if term in self._postings else 0 for term in terms]
+            return min(lengths) if lengths else len(self._doc_ids)
+
+    def iter_search(self, query: str, load_text: Callable[[str], Optional[str]] = None) -> Iterator[dict]:
+        """
+        按相关度从高到低逐个产出匹配的便签
+
+        短语需要逐字校验，只有在提供 load_text 时进行，且只校验实际产出的
+        候选，调用方取够结果后停止迭代即可。
+
+        Args:
+            query: 查询文本，见 parse_query
+            load_text: 根据键读取便签 "标题\\n正文" 的函数
+
+        Yields:
+            {'key', 'date', 'id', 'title', 'score'}
+        """
+        self._ensure_loaded()
+        clauses = parse_query(query)
+        with self._lock:
+            candidates = None
+            all_terms = []
+            for kind, text in clauses:
+                terms = self._clause_terms(kind, text)
+                docs = self._docs_for_terms(terms, prefix=(kind == "prefix"))
+                if docs is None:
+                    continue
+                if kind != "prefix":
+                    all_terms.extend(terms)
+                candidates = docs if candidates is None else candidates & docs
+            if not candidates:
+                return
+            ranked = self._rank(candidates, all_terms, [text.lower() for kind, text in clauses])
+
+        phrases = [normalize_text(text) for kind, text in clauses if kind == "phrase"]
+        for score, key, title in ranked:
+            if phrases and load_text is not None:
+                text = load_text(key)
+                if text is None:
+                    continue
+                text = normalize_text(text)
+                if not all(phrase in text for phrase in phrases):
+                    continue
+            date_str, _, note_id = key.partition('_')
+            yield {'key': key, 'date': date_str, 'id': note_id, 'title': title, 'score': score}
+
+    def search(self, query: str, limit: int = 50, load_text: Callable[[str], Optional[str]] = None) -> List[dict]:
+        """返回相关度最高的 limit 个结果，见 iter_search"""
+        results = []
+        for result in self.iter_search(query, load_text):
+            results.append(result)
+            if len(results) >= limit:
+                break
+        return results
+
+def _contains(ids: array, doc_id: int) -> bool:
+    """在有序数组中查找文档号"""
+    index = bisect_left(ids, doc_id)
+    return index < len(ids) and ids[index] == doc_id
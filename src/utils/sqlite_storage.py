@@ -0,0 +1,470 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .daily_storage import list_day_files
+from .note_codec import loads_day
+from .note_manifest import summarize_day
+from .note_iter import parse_cursor
+from .bulk_notes import add_to_day, finish_day, group_future_items
+
+# 单独建列的便签字段，其余字段以 JSON 形式存入 extra 列
+NOTE_COLUMNS = ('title', 'content', 'created_at', 'updated_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    date TEXT NOT NULL,
+    note_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    content TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    extra TEXT,
+    PRIMARY KEY (date, note_id)
+);
+CREATE INDEX IF NOT EXISTS idx_notes_date ON notes (date, position);
+CREATE INDEX IF NOT EXISTS idx_notes_updated_at ON notes (updated_at);
+CREATE TABLE IF NOT EXISTS day_summary (
+    date TEXT PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _date_key(date_obj) -> str:
+    """将日期转换为数据库中使用的字符串键"""
+    return date_obj.strftime('%Y-%m-%d')
+
+class SqliteStorage:
+    def __init__(self, db_path: str = "data/notes.db"):
+        """
+        SQLite 便签存储，接口与 DailyStorage 保持一致
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # 连接可能被多个线程使用，由锁保证串行访问
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._ensure_summaries()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
+
+    def _note_to_row(self, day: str, note_id: str, position: int, note: dict) -> tuple:
+        """将便签字典转换为数据库行"""
+        extra = {k: v for k, v in note.items() if k not in NOTE_COLUMNS}
+        return (
+            day, note_id, position,
+            note.get('title'), note.get('content'),
+            note.get('created_at'), note.get('updated_at'),
+            json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+
+    def _row_to_note(self, row) -> dict:
+        """将数据库行还原为便签字典"""
+        title, content, created_at, updated_at, extra = row
+        note = json.loads(extra) if extra else {}
+        for key, value in zip(NOTE_COLUMNS, (title, content, created_at, updated_at)):
+            if value is not None:
+                note[key] = value
+        return note
+
+    def _write_day(self, day: str, notes: Dict[str, dict]):
+        """在当前事务中替换某一天的全部便签及其摘要"""
+        self.conn.execute("DELETE FROM notes WHERE date = ?", (day,))
+        self.conn.executemany(
+            "INSERT INTO notes (date, note_id, position, title, content, created_at, updated_at, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [self._note_to_row(day, note_id, position, note)
+             for position, (note_id, note) in enumerate(notes.items())]
+        )
+        self._write_summary(day, notes)
+
+    def _patch_day(self, day: str, notes: Dict[str, dict], dirty: Iterable[str]):
+        """在当前事务中只写入变化的便签：更新或插入仍存在的，删除已移除的"""
+        dirty = list(dirty)
+        removed = [(day, note_id) for note_id in dirty if note_id not in notes]
+        changed = [note_id for note_id in dirty if note_id in notes]
+        if removed:
+            self.conn.executemany("DELETE FROM notes WHERE date = ? AND note_id = ?", removed)
+        if changed:
+            # 已有便签保持原位置，新便签排在当天最后
+            next_position = self.conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM notes WHERE date = ?", (day,)
+            ).fetchone()[0]
+            self.conn.executemany(
+                "INSERT INTO notes (date, note_id, position, title, content, created_at, updated_at, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (date, note_id) DO UPDATE SET title = excluded.title, content = excluded.content, "
+                "created_at = excluded.created_at, updated_at = excluded.updated_at, extra = excluded.extra",
+                [self._note_to_row(day, note_id, next_position + index, notes[note_id])
+                 for index, note_id in enumerate(changed)]
+            )
+        self._write_summary(day, notes)
+
+    def _write_summary(self, day: str, notes: Dict[str, dict]):
+        """在当前事务中更新某一天的摘要"""
+        summary = summarize_day(notes)
+        if summary is None:
+            self.conn.execute("DELETE FROM day_summary WHERE date = ?", (day,))
+        else:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO day_summary (date, summary) VALUES (?, ?)",
+                (day, json.dumps(summary, ensure_ascii=False))
+            )
+
+    def _ensure_summaries(self):
+        """旧数据库没有摘要表内容或摘要格式过旧时补建"""
+        with self._lock:
+            days = self.conn.execute("SELECT COUNT(DISTINCT date) FROM notes").fetchone()[0]
+            summaries = self.conn.execute("SELECT COUNT(*) FROM day_summary").fetchone()[0]
+            # 旧版本的摘要没有逐便签元数据
+            outdated = self.conn.execute(
+                "SELECT COUNT(*) FROM day_summary WHERE summary NOT LIKE '%\"notes\":%'"
+            ).fetchone()[0]
+        if days != summaries or outdated:
+            self.rebuild_summaries()
+
+    def rebuild_summaries(self):
+        """根据便签表重新生成全部日期摘要"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM day_summary")
+            for day, notes in self.get_notes_in_range().items():
+                self._write_summary(day, notes)
+
+    def get_day_summaries(self, start: date = None, end: date = None) -> Dict[str, dict]:
+        """获取范围内（包含首尾）每个日期的摘要，不读取便签正文"""
+        query = "SELECT date, summary FROM day_summary"
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(_date_key(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(_date_key(end))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date"
+
+        try:
+            with self._lock:
+                rows = self.conn.execute(query, params).fetchall()
+            return {day: json.loads(summary) for day, summary in rows}
+        except Exception as e:
+            print(f"加载便签摘要失败: {e}")
+            return {}
+
+    def save_notes(self, notes: Dict[str, dict], working_date: date = None,
+                   dirty: Optional[Iterable[str]] = None) -> bool:
+        """
+        保存便签到指定日期
+
+        Args:
+            notes: 该日全部便签
+            working_date: 日期，默认为今天
+            dirty: 新增、修改或删除的便签ID，只写入这些行；None 表示替换整天
+        """
+        try:
+            if working_date is None:
+                working_date = date.today()
+
+            with self._lock, self.conn:
+                if dirty is None:
+                    self._write_day(_date_key(working_date), notes)
+                else:
+                    self._patch_day(_date_key(working_date), notes, dirty)
+            return True
+        except Exception as e:
+            print(f"保存便签失败: {e}")
+            return False
+
+    def load_notes(self) -> Dict[str, dict]:
+        """加载所有便签"""
+        all_notes = {}
+        for notes in self.get_notes_in_range().values():
+            all_notes.update(notes)
+        return all_notes
+
+    def get_daily_notes(self, date: datetime = None) -> Dict[str, dict]:
+        """获取指定日期的便签"""
+        if date is None:
+            date = datetime.now()
+
+        try:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT note_id, title, content, created_at, updated_at, extra "
+                    "FROM notes WHERE date = ? ORDER BY position",
+                    (_date_key(date),)
+                ).fetchall()
+            return {row[0]: self._row_to_note(row[1:]) for row in rows}
+        except Exception as e:
+            print(f"加载便签失败: {e}")
+            return {}
+
+    def get_daily_meta(self, date: datetime = None) -> Dict[str, dict]:
+        """获取指定日期各便签的元数据，不读取 content 列"""
+        if date is None:
+            date = datetime.now()
+
+        day = _date_key(date)
+        try:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT note_id, title, created_at, updated_at, length(content) "
+                    "FROM notes WHERE date = ? ORDER BY position",
+                    (day,)
+                ).fetchall()
+            return {
+                note_id: {
+                    'id': note_id, 'title': title or '', 'created_at': created_at or '',
+                    'updated_at': updated_at or '', 'chars': chars or 0, 'date': day,
+                }
+                for note_id, title, created_at, updated_at, chars in rows
+            }
+        except Exception as e:
+            print(f"加载便签列表失败: {e}")
+            return {}
+
+    def get_note_body(self, date: datetime, note_id: str) -> Optional[str]:
+        """读取单个便签的正文，便签不存在时返回 None"""
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT content FROM notes WHERE date = ? AND note_id = ?",
+                    (_date_key(date), note_id)
+                ).fetchone()
+            if row is None:
+                return None
+            return row[0] or ''
+        except Exception as e:
+            print(f"加载便签正文失败: {e}")
+            return None
+
+    def create_future_note(self, future_date: date, note: dict) -> bool:
+        """创建未来日期的便签"""
+        if future_date < date.today():
+            return False
+
+        try:
+            with self._lock, self.conn:
+                notes = self.get_daily_notes(future_date)
+
+                note_id = str(len(notes) + 1)
+                while note_id in notes:
+                    note_id = str(int(note_id) + 1)
+                notes[note_id] = dict(note, id=note_id)
+
+                self._patch_day(_date_key(future_date), notes, [note_id])
+            return True
+        except Exception as e:
+            print(f"创建未来便签失败: {e}")
+            return False
+
+    def create_future_notes(self, items: Iterable[Tuple[date, dict]]) -> List[dict]:
+        """
+        批量创建未来日期的便签：所有日期在同一个事务中写入，每个日期只读取一次
+
+        Returns:
+            与 items 一一对应的结果 [{'date', 'id', 'ok', 'error'}]
+        """
+        groups, results = group_future_items(items)
+        try:
+            with self._lock, self.conn:
+                for day, entries in groups.items():
+                    notes = self.get_daily_notes(day)
+                    new_ids = add_to_day(notes, entries, results)
+                    self._patch_day(_date_key(day), notes, new_ids)
+        except Exception as e:
+            print(f"批量创建便签失败: {e}")
+            for entries in groups.values():
+                finish_day(entries, results, str(e))
+            return results
+        for entries in groups.values():
+            finish_day(entries, results)
+        return results
+
+    def get_all_notes(self) -> Dict[str, dict]:
+        """获取所有便签"""
+        return {f"{note['date']}_{note['id']}": note for note in self.iter_notes()}
+
+    def iter_notes(self, start: date = None, end: date = None, limit: int = None,
+                   offset: int = 0, cursor: str = None, page_size: int = 500) -> Iterator[dict]:
+        """按日期顺序惰性产出便签（带 date 和 id），按页从数据库读取"""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(_date_key(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(_date_key(end))
+        if cursor:
+            after_date, after_id = parse_cursor(cursor)
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT position FROM notes WHERE date = ? AND note_id = ?", (after_date, after_id)
+                ).fetchone()
+            if row is None:
+                conditions.append("date >= ?")
+                params.append(after_date)
+            else:
+                conditions.append("(date > ? OR (date = ? AND position > ?))")
+                params.extend([after_date, after_date, row[0]])
+        return self._iter_pages(conditions, params, limit, offset, page_size)
+
+    def _iter_pages(self, conditions: list, params: list, limit: Optional[int],
+                    offset: int, page_size: int) -> Iterator[dict]:
+        """以 (date, position) 为键分页查询，避免长时间占用连接"""
+        remaining = limit
+        last_key = None
+        while remaining is None or remaining > 0:
+            page_conditions, page_params = list(conditions), list(params)
+            if last_key is not None:
+                page_conditions.append("(date > ? OR (date = ? AND position > ?))")
+                page_params.extend([last_key[0], last_key[0], last_key[1]])
+
+            batch = page_size if remaining is None else min(page_size, remaining)
+            query = "SELECT date, note_id, position, title, content, created_at, updated_at, extra FROM notes"
+            if page_conditions:
+                query += " WHERE " + " AND ".join(page_conditions)
+            query += " ORDER BY date, position LIMIT ? OFFSET ?"
+            page_params.extend([batch, offset if last_key is None else 0])
+
+            with self._lock:
+                rows = self.conn.execute(query, page_params).fetchall()
+            for row in rows:
+                note = self._row_to_note(row[3:])
+                note['date'] = row[0]
+                note['id'] = row[1]
+                yield note
+            if len(rows) < batch:
+                return
+            last_key = (rows[-1][0], rows[-1][2])
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def get_notes_in_range(self, start: date = None, end: date = None) -> Dict[str, Dict[str, dict]]:
+        """按日期范围获取便签（包含首尾），返回 {日期: {便签ID: 便签}}"""
+        query = "SELECT date, note_id, title, content, created_at, updated_at, extra FROM notes"
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(_date_key(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(_date_key(end))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date, position"
+
+        result: Dict[str, Dict[str, dict]] = {}
+        try:
+            with self._lock:
+                rows = self.conn.execute(query, params).fetchall()
+            for row in rows:
+                result.setdefault(row[0], {})[row[1]] = self._row_to_note(row[2:])
+        except Exception as e:
+            print(f"加载便签失败: {e}")
+        return result
+
+    def get_notes_updated_since(self, since: str) -> List[dict]:
+        """获取在指定时间（ISO 格式）之后更新过的便签，按更新时间排序"""
+        try:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT date, note_id, title, content, created_at, updated_at, extra "
+                    "FROM notes WHERE updated_at > ? ORDER BY updated_at",
+                    (since,)
+                ).fetchall()
+        except Exception as e:
+            print(f"加载便签失败: {e}")
+            return []
+
+        notes = []
+        for row in rows:
+            note = self._row_to_note(row[2:])
+            note['date'] = row[0]
+            note['id'] = row[1]
+            notes.append(note)
+        return notes
+
+    def is_migrated(self, json_dir: str) -> bool:
+        """检查是否已从指定 JSON 目录迁移过"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = ?",
+                ("json_migrated:" + os.path.abspath(json_dir),)
+            ).fetchone()
+        return row is not None
+
+    def migrate_from_json(self, json_dir: str = "data/notes", batch_days: int = 100) -> int:
+        """
+        从 data/notes 下的每日文件一次性迁移便签
+
+        平铺和按年月分片两种布局、JSON 和紧凑两种格式都支持。逐个文件读取并
+        分批提交，内存占用与单个文件大小相关，而与历史数据总量无关。
+        数据库中已有便签的日期不会被覆盖。读取失败的文件记入日志后跳过，
+        目录仍记为已迁移，之后启动不再重复导入。
+
+        Args:
+            json_dir: 每日 JSON 文件所在目录
+            batch_days: 每次提交包含的天数
+
+        Returns:
+            迁移的天数
+        """
+        if not os.path.isdir(json_dir) or self.is_migrated(json_dir):
+            return 0
+
+        migrated = 0
+        failed = []
+        with self._lock:
+            try:
+                existing = {row[0] for row in self.conn.execute("SELECT DISTINCT date FROM notes")}
+                for file_path, day in sorted(list_day_files(json_dir).items(), key=lambda item: item[1]):
+                    key = _date_key(day)
+                    if key in existing:
+                        # 数据库中的便签可能已经修改过，不用文件中的旧内容覆盖
+                        continue
+                    try:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            notes = loads_day(f.read(), key)
+                    except Exception as e:
+                        print(f"读取文件 {file_path} 时出错: {e}")
+                        failed.append(file_path)
+                        continue
+
+                    self._write_day(key, notes)
+                    migrated += 1
+                    if migrated % batch_days == 0:
+                        self.conn.commit()
+
+                if failed:
+                    print(f"迁移便签时跳过了 {len(failed)} 个无法读取的文件: {', '.join(failed)}")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    ("json_migrated:" + os.path.abspath(json_dir), datetime.now().isoformat())
+                )
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                print(f"迁移便签失败: {e}")
+        return migrated
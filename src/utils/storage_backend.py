@@ -0,0 +1,109 @@
+from datetime import datetime, date
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+from .config_manager import ConfigManager
+from .daily_storage import DailyStorage
+from .sqlite_storage import SqliteStorage
+from .memory_storage import MemoryStorage
+
+# 可通过 storage.backend 选择的存储后端
+BACKENDS = ("json", "sqlite", "memory")
+
+class StorageBackend(Protocol):
+    """
+    便签存储后端协议
+
+    便签按日期分组，每天是一个 {便签ID: 便签} 字典。
+    get_* 方法返回的字典归调用方所有，修改后需通过 save_notes 写回。
+    读取较慢的后端还可以提供 prefetch(center, radius) 和 cache_stats()，
+    调用方需先用 hasattr 检查。
+    """
+
+    def save_notes(self, notes: Dict[str, dict], working_date: date = None,
+                   dirty: Optional[Iterable[str]] = None) -> bool:
+        """
+        用 notes 替换指定日期的便签
+
+        dirty 为自上次保存以来新增、修改或删除的便签ID，后端可以只写入这些便签；
+        None 表示整天重写。
+        """
+        ...
+
+    def load_notes(self) -> Dict[str, dict]:
+        """加载所有便签（不同日期的相同ID会相互覆盖，仅为兼容保留）"""
+        ...
+
+    def get_daily_notes(self, date: datetime = None) -> Dict[str, dict]:
+        """获取指定日期的便签，没有时返回空字典"""
+        ...
+
+    def get_daily_meta(self, date: datetime = None) -> Dict[str, dict]:
+        """
+        获取指定日期各便签的元数据，不解析正文
+
+        每项包含 id、title、created_at、updated_at、chars（正文长度）和 date，
+        顺序与 get_daily_notes 一致。
+        """
+        ...
+
+    def get_note_body(self, date: datetime, note_id: str) -> Optional[str]:
+        """按需读取单个便签的正文，便签不存在时返回 None"""
+        ...
+
+    def create_future_note(self, future_date: date, note: dict) -> bool:
+        """在未来日期追加一个便签，过去的日期返回 False"""
+        ...
+
+    def create_future_notes(self, items: Iterable[Tuple[date, dict]]) -> List[dict]:
+        """批量追加未来日期的便签，每个日期只写入一次，返回每项的结果 {'date', 'id', 'ok', 'error'}"""
+        ...
+
+    def get_all_notes(self) -> Dict[str, dict]:
+        """获取所有便签，键为 "日期_便签ID"，并为每个便签补充 date 和 id"""
+        ...
+
+    def get_notes_in_range(self, start: date = None, end: date = None) -> Dict[str, Dict[str, dict]]:
+        """按日期范围获取便签（包含首尾），按日期升序返回 {日期: {便签ID: 便签}}"""
+        ...
+
+    def iter_notes(self, start: date = None, end: date = None, limit: int = None,
+                   offset: int = 0, cursor: str = None) -> Iterator[dict]:
+        """
+        按日期（同一天内按存储顺序）惰性产出便签副本，每个副本带 date 和 id
+
+        offset 在 cursor 之后计算；cursor 为上一页最后一个便签的 "日期_便签ID"，
+        可用 note_iter.note_cursor 获得。
+        """
+        ...
+
+    def get_day_summaries(self, start: date = None, end: date = None) -> Dict[str, dict]:
+        """
+        按日期升序返回范围内每个日期的摘要，不读取便签正文
+
+        摘要包含 count、titles、updated_at、chars 和 hash，见 note_manifest.summarize_day。
+        """
+        ...
+
+def create_storage(config_manager: ConfigManager) -> StorageBackend:
+    """根据 storage.backend 配置创建存储后端"""
+    backend = config_manager.get("storage.backend", "json")
+    notes_dir = config_manager.get("storage.notes_dir", "data/notes")
+
+    if backend == "sqlite":
+        storage = SqliteStorage(config_manager.get("storage.sqlite_path", "data/notes.db"))
+        # 首次切换到 SQLite 时迁移已有的每日 JSON 文件
+        storage.migrate_from_json(notes_dir)
+        return storage
+    if backend == "memory":
+        return MemoryStorage()
+    if backend != "json":
+        print(f"未知的存储后端 {backend}，使用 json")
+    storage = DailyStorage(
+        notes_dir,
+        cache_days=config_manager.get("storage.cache_days", 64),
+        scan_workers=config_manager.get("storage.scan_workers", 0),
+        file_format=config_manager.get("storage.format", "json"),
+        layout=config_manager.get("storage.layout", "flat")
+    )
+    # 把另一种布局下遗留的文件在后台移动到当前布局
+    storage.start_layout_migration()
+    return storage
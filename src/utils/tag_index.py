@@ -0,0 +1,188 @@
+import os
+import re
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from .logged_snapshot import LoggedSnapshot
+from .background_index import BackgroundIndex
+from .search_index import extract_tags
+
+# Markdown 任务列表项：- [ ] 待办、- [x] 已完成（也支持 * + 和 1.）
+TODO_PATTERN = re.compile(r'^[ \t]*(?:[-*+]|\d+[.)])[ \t]+\[([ xX])\][ \t]*(.*)$', re.MULTILINE)
+
+def extract_todos(text: str) -> Tuple[List[str], int]:
+    """提取未完成的待办事项文本，以及已完成的数量"""
+    open_todos = []
+    done = 0
+    for mark, todo in TODO_PATTERN.findall(text):
+        if mark == ' ':
+            open_todos.append(todo.strip())
+        else:
+            done += 1
+    return open_todos, done
+
+def extract_entry(title: str, content: str) -> Optional[dict]:
+    """
+    提取便签的标签和待办，没有任何标签和待办时返回 None
+
+    Returns:
+        {'title', 'tags', 'todos'（未完成的待办）, 'done'（已完成数）}
+    """
+    tags = sorted(set(extract_tags(title)) | set(extract_tags(content)))
+    todos, done = extract_todos(content)
+    if not tags and not todos and not done:
+        return None
+    return {'title': title, 'tags': tags, 'todos': todos, 'done': done}
+
+class TagIndex(BackgroundIndex):
+    index_name = "标签索引"
+    thread_name = "TagIndexLoad"
+
+    def __init__(self, index_dir: str, documents: Callable[[], Iterable[Tuple[str, str, str]]] = None):
+        """
+        标签和待办索引：记录每个便签的 #标签 和 - [ ] 待办
+
+        保存便签时只重新解析该便签，内容没有变化时不写盘。由快照 tags.json
+        和追加日志 tags.log 组成（见 LoggedSnapshot），加载和重建见 BackgroundIndex。
+
+        Args:
+            index_dir: 索引文件所在目录
+            documents: 重建索引时遍历全部便签的函数，产出 (键, 标题, 正文)
+        """
+        super().__init__(documents)
+        self.store = LoggedSnapshot(os.path.join(index_dir, "tags.json"), os.path.join(index_dir, "tags.log"), "标签索引")
+        # 便签键（日期_便签ID）-> extract_entry 的结果
+        self.entries: Dict[str, dict] = {}
+        # 标签 -> 便签键，以及有未完成待办的便签键
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._todo_keys: Set[str] = set()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _load(self) -> bool:
+        """从快照和日志加载，快照缺失或损坏时返回 False"""
+        entries = self.store.load()
+        if entries is None:
+            return False
+        self._install(entries)
+        return True
+
+    def _install(self, entries: Dict[str, dict]):
+        """替换全部条目并重建标签和待办反查表（调用方需持有锁）"""
+        self.entries = entries
+        self._tag_keys = {}
+        self._todo_keys = {key for key, entry in entries.items() if entry['todos']}
+        for key, entry in entries.items():
+            for tag in entry['tags']:
+                self._tag_keys.setdefault(tag, set()).add(key)
+
+    def _build(self, documents: Iterable[Tuple[str, str, str]]) -> Dict[str, dict]:
+        """解析全部便签（由 documents 并发扫描读取）"""
+        entries = {}
+        for key, title, content in documents:
+            entry = extract_entry(title, content)
+            if entry is not None:
+                entries[key] = entry
+        return entries
+
+    def _size(self) -> int:
+        return len(self.entries)
+
+    def _save_locked(self):
+        self.store.write(self.entries)
+
+    def _apply_locked(self, key: str, entry: Optional[dict]):
+        """更新一个便签的条目并追加日志，内容未变化时不写盘（调用方需持有锁）"""
+        old = self.entries.get(key)
+        if old == entry:
+            return
+        for tag in (old or {}).get('tags', ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+        if entry is None:
+            del self.entries[key]
+        else:
+            self.entries[key] = entry
+            for tag in entry['tags']:
+                self._tag_keys.setdefault(tag, set()).add(key)
+        if entry is not None and entry['todos']:
+            self._todo_keys.add(key)
+        else:
+            self._todo_keys.discard(key)
+        self.store.append([(key, entry)], self.entries)
+
+    def update(self, key: str, title: str, content: str):
+        """重新解析一个便签的标签和待办"""
+        self._submit(key, extract_entry(title, content))
+
+    def remove(self, key: str):
+        """移除一个便签"""
+        self._submit(key, None)
+
+    def tags(self) -> Dict[str, int]:
+        """全部标签及其便签数，按便签数从多到少"""
+        self._ensure_loaded()
+        with self._lock:
+            counts = {tag: len(keys) for tag, keys in self._tag_keys.items()}
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def keys_with_tag(self, tag: str) -> Set[str]:
+        """带有指定标签（可省略 #）的便签键"""
+        self._ensure_loaded()
+        tag = "#" + tag.lstrip('#').lower()
+        with self._lock:
+            return set(self._tag_keys.get(tag, ()))
+
+    def keys_with_open_todos(self) -> Set[str]:
+        """有未完成待办的便签键"""
+        self._ensure_loaded()
+        with self._lock:
+            return set(self._todo_keys)
+
+    def estimate(self, kind: str, value: str = None) -> int:
+        """查询项匹配的便签数（tag 或 todo），只读取反查表的大小，不复制键集合"""
+        self._ensure_loaded()
+        with self._lock:
+            if kind == "todo":
+                return len(self._todo_keys)
+            return len(self._tag_keys.get("#" + (value or "").lstrip('#').lower(), ()))
+
+    def notes_with_tag(self, tag: str) -> List[dict]:
+        """带有指定标签的便签，日期新的在前：[{'key', 'date', 'id', 'title', 'tags'}]"""
+        keys = self.keys_with_tag(tag)
+        with self._lock:
+            results = []
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                date_str, _, note_id = key.partition('_')
+                results.append({'key': key, 'date': date_str, 'id': note_id,
+                                'title': entry['title'], 'tags': list(entry['tags'])})
+        results.sort(key=lambda result: result['key'], reverse=True)
+        return results
+
+    def open_todos(self, start: date = None, end: date = None) -> List[dict]:
+        """
+        范围内（包含首尾）所有未完成的待办，按日期升序
+
+        Returns:
+            [{'key', 'date', 'id', 'title', 'text'}]
+        """
+        self._ensure_loaded()
+        start_key = start.isoformat() if start is not None else None
+        end_key = end.isoformat() if end is not None else None
+        results = []
+        with self._lock:
+            for key, entry in self.entries.items():
+                if not entry['todos']:
+                    continue
+                date_str, _, note_id = key.partition('_')
+                if (start_key and date_str < start_key) or (end_key and date_str > end_key):
+                    continue
+                for text in entry['todos']:
+                    results.append({'key': key, 'date': date_str, 'id': note_id,
+                                    'title': entry['title'], 'text': text})
+        results.sort(key=lambda result: result['date'])
+        return results
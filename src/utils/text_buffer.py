@@ -0,0 +1,114 @@
+from typing import List
+
+# 每块的目标大小（字符），插入使块超过两倍时拆分
+CHUNK_SIZE = 16 * 1024
+
+def utf16_length(text: str) -> int:
+    """文本的 UTF-16 长度（与 QTextDocument 的位置单位一致，BMP 以外的字符占 2）"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+def utf16_to_index(text: str, offset: int) -> int:
+    """把文本中的 UTF-16 偏移转换为 Python 下标"""
+    if offset <= 0:
+        return 0
+    if text.isascii():
+        return offset
+    return len(text.encode('utf-16-le')[:offset * 2].decode('utf-16-le', errors='ignore'))
+
+class TextBuffer:
+    def __init__(self, text: str = "", chunk_size: int = CHUNK_SIZE):
+        """
+        分块文本缓冲区，按 QTextDocument 的增量（位置、删除数、新增文本）更新
+
+        位置和长度均以 UTF-16 单位计，与 contentsChange 信号一致。每次修改只
+        改动涉及的块，不复制整个文本；需要完整文本时才拼接（并缓存到下次修改）。
+
+        Args:
+            text: 初始文本
+            chunk_size: 每块的目标大小
+        """
+        self.chunk_size = chunk_size
+        # 块文本及其 UTF-16 长度
+        self._chunks: List[str] = []
+        self._lengths: List[int] = []
+        self._length = 0
+        self._text_cache = None
+        # 每次修改递增，调用方可据此判断内容是否变化
+        self.version = 0
+        self.reset(text)
+
+    def __len__(self) -> int:
+        """UTF-16 长度"""
+        return self._length
+
+    def reset(self, text: str):
+        """用新的完整文本替换缓冲区"""
+        self._chunks = [text[start:start + self.chunk_size] for start in range(0, len(text), self.chunk_size)]
+        self._lengths = [utf16_length(chunk) for chunk in self._chunks]
+        self._length = sum(self._lengths)
+        self._text_cache = text
+        self.version += 1
+
+    def text(self) -> str:
+        """拼接出完整文本"""
+        if self._text_cache is None:
+            self._text_cache = "".join(self._chunks)
+        return self._text_cache
+
+    def _locate(self, position: int):
+        """找到 UTF-16 位置所在的块，返回 (块下标, 块内 UTF-16 偏移)"""
+        for index, length in enumerate(self._lengths):
+            if position <= length:
+                return index, position
+            position -= length
+        return len(self._chunks), 0
+
+    def apply(self, position: int, removed: int, added: str):
+        """
+        应用一次修改：从 position 起删除 removed 个 UTF-16 单位，再插入 added
+
+        Raises:
+            ValueError: 位置或删除范围超出缓冲区
+        """
+        if position < 0 or removed < 0 or position + removed > self._length:
+            raise ValueError(f"修改超出范围: 位置 {position}, 删除 {removed}, 长度 {self._length}")
+        if not removed and not added:
+            return
+
+        index, offset = self._locate(position)
+        if index == len(self._chunks):
+            self._chunks.append("")
+            self._lengths.append(0)
+
+        # 删除可能跨越多个块：先从当前块删，再依次删后面的块
+        chunk = self._chunks[index]
+        start = utf16_to_index(chunk, offset)
+        remaining = removed
+        tail_index = index
+        tail = chunk
+        tail_offset = offset
+        while True:
+            available = self._lengths[tail_index] - tail_offset
+            if remaining <= available:
+                end = utf16_to_index(tail, tail_offset + remaining)
+                break
+            remaining -= available
+            tail_index += 1
+            tail = self._chunks[tail_index]
+            tail_offset = 0
+        merged = chunk[:start] + added + tail[end:]
+
+        del self._chunks[index + 1:tail_index + 1]
+        del self._lengths[index + 1:tail_index + 1]
+        if len(merged) > 2 * self.chunk_size:
+            pieces = [merged[i:i + self.chunk_size] for i in range(0, len(merged), self.chunk_size)]
+        else:
+            pieces = [merged] if merged else []
+        self._chunks[index:index + 1] = pieces
+        self._lengths[index:index + 1] = [utf16_length(piece) for piece in pieces]
+
+        self._length += utf16_length(added) - removed
+        self._text_cache = None
+        self.version += 1
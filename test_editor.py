@@ -0,0 +1,171 @@
+import os
+import sys
+import random
+from pathlib import Path
+
+# 将项目根目录添加到 Python 路径
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+import check_runner
+
+# 无需显示窗口
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QTextCursor, QTextDocument
+from PyQt6.QtCore import QMimeData, QTimer
+
+from src.utils.config_manager import ConfigManager
+from src.main.note_manager import NoteManager
+from src.ui.main_window import MainWindow
+from src.ui.document_cache import DocumentCache
+from src.utils.text_buffer import TextBuffer, utf16_length
+
+def make_window(work_dir: str) -> MainWindow:
+    """在临时目录中创建主窗口（小块粘贴、不提示便签大小）"""
+    config_manager = ConfigManager(os.path.join(work_dir, "config"))
+    config_manager.set("storage.notes_dir", os.path.join(work_dir, "notes"))
+    config_manager.set("editor.paste_chunk_chars", 1000)
+    config_manager.set("editor.soft_limit_chars", 0)
+    return MainWindow(NoteManager(config_manager))
+
+def check_text_buffer_apply(work_dir: str):
+    # 随机增量（含 BMP 以外的字符、跨块删除）应用后与直接修改字符串的结果一致
+    rng = random.Random(3)
+    alphabet = "ab词\n😀"
+    text = "".join(rng.choice(alphabet) for _ in range(500))
+    buffer = TextBuffer(text, chunk_size=16)
+    for _ in range(2000):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.choice((0, 0, 1, 3, 40)))
+        added = "".join(rng.choice(alphabet) for _ in range(rng.choice((0, 1, 2, 50))))
+        buffer.apply(utf16_length(text[:start]), utf16_length(text[start:end]), added)
+        text = text[:start] + added + text[end:]
+        assert len(buffer) == utf16_length(text)
+    assert buffer.text() == text
+    try:
+        buffer.apply(len(buffer), 1, "")
+        assert False, "超出范围的删除应抛出 ValueError"
+    except ValueError:
+        pass
+
+def check_document_cache_bound(work_dir: str):
+    # 超出字符上限时淘汰最久未用的文档，最近使用的文档即使超限也保留
+    def document(size: int) -> QTextDocument:
+        return QTextDocument("x" * size)
+
+    cache = DocumentCache(max_chars=250)
+    for key in ("a", "b", "c"):
+        cache.put(key, document(99), TextBuffer())
+    assert len(cache) == 2 and "a" not in cache
+    cache.get("b")
+    cache.put("d", document(99), TextBuffer())
+    assert "b" in cache and "c" not in cache and cache.total_chars() <= 250
+    cache.put("huge", document(1000), TextBuffer())
+    assert list(cache._entries) == ["huge"]
+    cache.remove("huge")
+    assert len(cache) == 0
+
+def check_switch_reuses_cached_document(work_dir: str):
+    # 切换回便签时换上缓存的文档：撤销历史和光标位置保留，不重新排版
+    window = make_window(work_dir)
+    manager = window.note_manager
+    first = manager.create_note("A", "hello")
+    second = manager.create_note("B", "b")
+    window.switch_to_note(first)
+    document = window.note_edit.document()
+    window.note_edit.moveCursor(QTextCursor.MoveOperation.End)
+    window.note_edit.insertPlainText(" world")
+    window.switch_to_note(manager.notes[second['id']])
+    assert window.note_edit.document() is not document
+
+    window.switch_to_note(manager.notes[first['id']])
+    assert window.note_edit.document() is document
+    assert window.note_edit.textCursor().position() == len("hello world")
+    assert document.isUndoAvailable()
+    # 内容在别处改变（如恢复修订）时不再使用过期的文档
+    manager.update_note(second['id'], content="restored")
+    window.switch_to_note(manager.notes[second['id']])
+    assert window.note_edit.plain_text() == "restored"
+    window.close()
+
+def check_switch_during_paste_saves_pasted_text(work_dir: str):
+    # 分块粘贴中途切换便签：已插入的部分保存到原便签，另一个便签不受影响
+    window = make_window(work_dir)
+    manager = window.note_manager
+    first = manager.create_note("A", "a")
+    second = manager.create_note("B", "b")
+    window.switch_to_note(first)
+    window.note_edit.moveCursor(QTextCursor.MoveOperation.End)
+
+    # 插入几块之后（此时正在处理事件）切换到另一个便签
+    apply = window.note_edit.buffer.apply
+    applied = []
+    def apply_and_switch(*args):
+        applied.append(1)
+        if len(applied) == 5:
+            QTimer.singleShot(0, lambda: window.switch_to_note(manager.notes[second['id']]))
+        return apply(*args)
+    window.note_edit.buffer.apply = apply_and_switch
+
+    mime = QMimeData()
+    mime.setText("x" * 50000)
+    window.note_edit.insertFromMimeData(mime)
+    QApplication.processEvents()
+    window.flush_pending_edit()
+
+    saved = manager.notes[first['id']]['content']
+    assert window.current_note['id'] == second['id']
+    assert saved.startswith("a" + "x" * 1000) and len(saved) < 50001, f"已粘贴的内容未保存（{len(saved)} 个字符）"
+    assert manager.notes[second['id']]['content'] == "b"
+    assert window.note_edit.plain_text() == "b"
+    window.close()
+
+def check_title_edits_are_debounced(work_dir: str):
+    # 逐字输入标题不逐次保存，停止输入后与内容一起保存一次
+    window = make_window(work_dir)
+    manager = window.note_manager
+    note = manager.create_note("A", "a")
+    window.switch_to_note(note)
+    window.flush_pending_edit()
+
+    update_note = manager.update_note
+    calls = []
+    def counting_update(note_id, title=None, content=None):
+        calls.append((title, content))
+        return update_note(note_id, title=title, content=content)
+    manager.update_note = counting_update
+
+    for length in range(1, 6):
+        window.title_edit.setText("Title"[:length])
+    assert calls == [], f"输入标题时保存了 {len(calls)} 次"
+    window.flush_pending_edit()
+    assert calls == [("Title", None)]
+    assert manager.notes[note['id']]['title'] == "Title"
+    assert manager.notes[note['id']]['content'] == "a"
+
+    # 标题和内容都改动时只保存一次
+    window.title_edit.setText("Title 2")
+    window.note_edit.moveCursor(QTextCursor.MoveOperation.End)
+    window.note_edit.insertPlainText("b")
+    window.flush_pending_edit()
+    assert calls[1:] == [("Title 2", "ab")]
+    window.close()
+
+CHECKS = [
+    check_text_buffer_apply,
+    check_document_cache_bound,
+    check_switch_reuses_cached_document,
+    check_switch_during_paste_saves_pasted_text,
+    check_title_edits_are_debounced,
+]
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    failures = check_runner.run_checks(CHECKS, "dictionote_editor_")
+    app.quit()
+    check_runner.report(failures)
+
+if __name__ == "__main__":
+    main()
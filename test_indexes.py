@@ -0,0 +1,245 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 将项目根目录添加到 Python 路径
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+import check_runner
+
+from src.utils import search_index
+from src.utils.search_index import SearchIndex
+from src.utils import logged_snapshot
+from src.utils.tag_index import TagIndex
+from src.utils.link_index import LinkIndex
+from src.utils.note_registry import NoteRegistry, new_uid
+from src.utils.note_query import NoteQueryEngine, SOURCE_NAMES
+
+WORDS = ["abandon", "ability", "absorb", "abstract", "academic", "accelerate",
+         "复习", "计划", "单词", "阅读", "写作", "考试", "听力", "总结"]
+
+def search_keys(index: SearchIndex, query: str) -> list:
+    """查询结果的便签键（按相关度）"""
+    return [result['key'] for result in index.search(query, 100)]
+
+def check_search_log_replay(work_dir: str):
+    # 快照加日志重新加载后，与内存中的索引结果一致
+    documents = [("2024-01-01_1", "英语 #plan", "abandon ability 复习计划"),
+                 ("2024-01-02_1", "Reading", "absorb abstract 阅读")]
+    index = SearchIndex(work_dir, lambda: iter(documents))
+    assert len(index) == 2
+    index.update("2024-01-02_1", "Reading", "absorb 复习 总结")
+    index.update("2024-01-03_1", "新便签", "academic #plan")
+    index.remove("2024-01-01_1")
+    reloaded = SearchIndex(work_dir)
+    for query in ("复习", "#plan", "absorb", "abstract", "abandon", "acad*", "新便签"):
+        assert search_keys(reloaded, query) == search_keys(index, query), query
+    assert search_keys(reloaded, "复习") == ["2024-01-02_1"]
+    assert search_keys(reloaded, "#plan") == ["2024-01-03_1"]
+
+def check_search_log_records_delta(work_dir: str):
+    # 日志只记录词频的变化：反复保存同一个大便签不会让日志随正文大小增长
+    index = SearchIndex(work_dir, lambda: iter(()))
+    len(index)
+    body = " ".join(WORDS[i % len(WORDS)] + str(i % 500) for i in range(60000))
+    assert len(body.encode('utf-8')) > 400 * 1024
+    index.update("2024-01-01_1", "big", body)
+    first_size = os.path.getsize(index.log_file)
+    for i in range(20):
+        body += f" autosave{i}"
+        index.update("2024-01-01_1", "big", body)
+    growth = os.path.getsize(index.log_file) - first_size
+    assert growth < 2000, f"20 次保存使日志增长了 {growth} 字节"
+    assert first_size < len(body.encode('utf-8')) // 4, "日志不应包含正文"
+    assert search_keys(SearchIndex(work_dir), "autosave19") == ["2024-01-01_1"]
+
+def check_search_compacts_on_log_size(work_dir: str):
+    # 日志行数不多但体积超限时也会合并进快照
+    original = search_index.COMPACT_MAX_BYTES
+    search_index.COMPACT_MAX_BYTES = 4096
+    try:
+        index = SearchIndex(work_dir, lambda: iter(()))
+        len(index)
+        for i in range(20):
+            index.update(f"2024-01-01_{i}", "note", " ".join(f"w{i}x{j}" for j in range(100)))
+        index.flush()
+        assert index._log_bytes <= 4096
+        assert search_keys(SearchIndex(work_dir), "w3x7") == ["2024-01-01_3"]
+    finally:
+        search_index.COMPACT_MAX_BYTES = original
+
+def check_search_replays_legacy_log(work_dir: str):
+    # 旧版本日志（记录完整正文）仍能重放
+    index = SearchIndex(work_dir, lambda: iter([("2024-01-01_1", "a", "abandon")]))
+    len(index)
+    with open(index.log_file, 'a', encoding='utf-8') as f:
+        f.write('{"k": "2024-01-02_1", "t": "b", "c": "ability 阅读"}\n')
+    assert search_keys(SearchIndex(work_dir), "阅读") == ["2024-01-02_1"]
+
+def check_logged_indexes_reload(work_dir: str):
+    # 标签索引、链接索引和注册表重新加载（快照加日志）后内容一致，日志过长时合并进快照
+    original = logged_snapshot.COMPACT_MIN_LINES
+    logged_snapshot.COMPACT_MIN_LINES = 5
+    try:
+        tags = TagIndex(work_dir, lambda: iter([("2024-01-01_1", "a", "#plan - [ ] 背单词")]))
+        links = LinkIndex(work_dir, lambda: iter([("2024-01-01_1", "a", "见 [[B]]")]))
+        registry = NoteRegistry(work_dir)
+        registry.replace_all({})
+        uids = [new_uid() for _ in range(8)]
+        for i, uid in enumerate(uids):
+            tags.update(f"2024-01-0{i + 2}_1", "t", f"#tag{i} - [ ] todo{i}")
+            links.update(f"2024-01-0{i + 2}_1", f"N{i}", f"[[N{i + 1}]]")
+            registry.register(uid, f"2024-01-0{i + 2}_1")
+        for i in range(12):
+            # 反复修改同一个便签，日志行数超过条目数后合并
+            tags.update("2024-01-02_1", "t", f"#tag0 - [ ] edit{i}")
+            links.update("2024-01-02_1", "N0", f"[[N1]] [[E{i}]]")
+        tags.remove("2024-01-01_1")
+        registry.unregister(uids[0])
+        for index in (tags, links):
+            assert index.store.log_lines < 12, "日志应已合并进快照"
+        reloaded_tags = TagIndex(work_dir)
+        reloaded_links = LinkIndex(work_dir)
+        reloaded_registry = NoteRegistry(work_dir)
+        reloaded_tags._ensure_loaded()
+        reloaded_links._ensure_loaded()
+        assert reloaded_tags.entries == tags.entries and "2024-01-01_1" not in reloaded_tags.entries
+        assert reloaded_links.entries == links.entries
+        assert reloaded_links.resolve_title("n3") == ["2024-01-05_1"]
+        assert reloaded_links.backlinks("2024-01-05_1") == ["2024-01-04_1"]
+        assert reloaded_registry.locate(uids[0]) is None
+        assert reloaded_registry.locate(uids[7]) == "2024-01-09_1"
+        assert reloaded_registry.uid_for("2024-01-09_1") == uids[7]
+    finally:
+        logged_snapshot.COMPACT_MIN_LINES = original
+
+def check_rebuild_does_not_block_updates(work_dir: str):
+    # 重建扫描便签时不持有锁：期间的保存立即返回，换上新索引后仍然生效
+    started = threading.Event()
+    release = threading.Event()
+
+    def documents():
+        yield ("2024-01-01_1", "old #old", "abandon - [ ] 旧待办 [[Old]]")
+        started.set()
+        release.wait(5)
+        yield ("2024-01-02_1", "other", "ability")
+
+    indexes = [SearchIndex(work_dir, documents), TagIndex(work_dir, documents), LinkIndex(work_dir, documents)]
+    for index in indexes:
+        started.clear()
+        release.clear()
+        index.start_loading()
+        assert started.wait(5)
+        begin = time.perf_counter()
+        index.update("2024-01-01_1", "new #new", "absorb - [ ] 新待办 [[New]]")
+        index.update("2024-01-03_1", "third", "academic")
+        index.remove("2024-01-02_1")
+        assert time.perf_counter() - begin < 1, f"{type(index).__name__} 的更新等待了重建"
+        release.set()
+        index._load_thread.join(5)
+    search, tags, links = indexes
+    assert search_keys(search, "absorb") == ["2024-01-01_1"] and search_keys(search, "abandon") == []
+    assert search_keys(search, "academic") == ["2024-01-03_1"] and search_keys(search, "ability") == []
+    assert search_keys(SearchIndex(work_dir), "absorb") == ["2024-01-01_1"]
+    assert tags.keys_with_tag("new") == {"2024-01-01_1"} and tags.keys_with_tag("old") == set()
+    assert links.links("2024-01-01_1") == ["title:new"] and "2024-01-02_1" not in links.entries
+    reloaded = LinkIndex(work_dir)
+    reloaded._ensure_loaded()
+    assert reloaded.entries == links.entries
+
+QUERY_NOTES = [
+    ("2024-01-05_1", "周计划 #work", "- [ ] abandon 旧习惯\n复习 absorb"),
+    ("2024-01-20_1", "会议 #work", "- [x] ability\nabandon 讨论"),
+    ("2024-02-03_1", "读书 #work", "- [ ] abandon 第三章"),
+    ("2024-02-10_2", "随笔", "abandon abstract academic"),
+    ("2024-03-01_1", "旅行 #life", "- [ ] 订票 abandon"),
+]
+
+def make_query_engine(work_dir: str, notes: list) -> NoteQueryEngine:
+    """用给定的便签建立全文和标签索引，日期清单由便签键生成"""
+    search = SearchIndex(work_dir, lambda: iter(notes))
+    tags = TagIndex(work_dir, lambda: iter(notes))
+
+    def day_summaries(start, end):
+        days = {}
+        for key, title, _ in notes:
+            date_str, _, note_id = key.partition('_')
+            if (start and date_str < start.isoformat()) or (end and date_str > end.isoformat()):
+                continue
+            day = days.setdefault(date_str, {'count': 0, 'notes': []})
+            day['count'] += 1
+            day['notes'].append({'id': note_id, 'title': title})
+        return days
+
+    texts = {key: f"{title}\n{content}" for key, title, content in notes}
+    return NoteQueryEngine(search, day_summaries, texts.get, tags)
+
+def check_query_plan_and_explain(work_dir: str):
+    # 计划器从估计最少的查询项开始，排除项放在最后，标签查询不因估计而重复读取
+    engine = make_query_engine(work_dir, QUERY_NOTES)
+    lookups = []
+    keys_with_tag = engine.tag_index.keys_with_tag
+    engine.tag_index.keys_with_tag = lambda tag: lookups.append(tag) or keys_with_tag(tag)
+
+    outcome = engine.run("abandon tag:work is:todo -absorb")
+    assert [result['key'] for result in outcome['results']] == ["2024-02-03_1"]
+    assert lookups == ["#work"], f"标签索引读取了 {len(lookups)} 次"
+    assert [(step['clause'], step['action'], step['estimate'], step['kept']) for step in outcome['steps']] == [
+        ("tag:work", "读取", 3, 3), ("is:todo", "求交", 3, 2), ("abandon", "求交", 5, 2), ("-absorb", "排除", None, 1)]
+
+    # 候选已经很少时，日期条件直接按便签键过滤；短语最后逐字校验
+    outcome = engine.run('#work date:2024-01 "旧习惯"')
+    assert [result['key'] for result in outcome['results']] == ["2024-01-05_1"]
+    assert [(step['source'], step['action']) for step in outcome['steps']] == [
+        (SOURCE_NAMES["phrase"], "读取"), ("便签键", "过滤"), (SOURCE_NAMES["tag"], "求交"), ("短语校验", "校验")]
+    explain = engine.explain("#life date:2024")
+    assert SOURCE_NAMES["tag"] in explain and "便签键" in explain
+
+    # 不产生检索词的项（只有标点）被忽略，不会清空结果
+    assert [result['key'] for result in engine.run("abandon !!! -?? *")['results']] == \
+        [result['key'] for result in engine.run("abandon")['results']] != []
+
+def check_tag_todo_link_diffs(work_dir: str):
+    # 保存便签时只增删变化的标签、待办和链接，内容未变化时不写日志
+    tags = TagIndex(work_dir, lambda: iter([("2024-01-01_1", "a", "#x #y - [ ] one")]))
+    links = LinkIndex(work_dir, lambda: iter([("2024-01-01_1", "A", "[[B]] [[2024-01-02]]")]))
+    tags.update("2024-01-01_1", "a", "#y #z - [x] one")
+    assert tags.keys_with_tag("x") == set() and tags.keys_with_tag("z") == {"2024-01-01_1"}
+    assert tags.estimate("tag", "#y") == 1 and tags.estimate("todo") == 0
+    assert tags.keys_with_open_todos() == set()
+    tags.update("2024-01-02_1", "b", "- [ ] two\n- [ ] three")
+    assert tags.estimate("todo") == 1 and [todo['text'] for todo in tags.open_todos()] == ["two", "three"]
+    lines = tags.store.log_lines
+    tags.update("2024-01-02_1", "b", "- [ ] two\n- [ ] three")
+    assert tags.store.log_lines == lines
+
+    links.update("2024-01-01_1", "A", "[[C]] [[2024-01-02]]")
+    links.update("2024-01-03_1", "C", "")
+    assert links.backlinks("2024-01-03_1") == ["2024-01-01_1"]
+    assert links.backlinks("2024-01-02_1") == ["2024-01-01_1"]
+    assert links.resolve_title("b") == []
+    links.update("2024-01-01_1", "A", "[[2024-01-02]]")
+    assert links.backlinks("2024-01-03_1") == []
+    lines = links.store.log_lines
+    links.update("2024-01-01_1", "A", "[[2024-01-02]]")
+    assert links.store.log_lines == lines
+
+CHECKS = [
+    check_search_log_replay,
+    check_search_log_records_delta,
+    check_search_compacts_on_log_size,
+    check_search_replays_legacy_log,
+    check_logged_indexes_reload,
+    check_rebuild_does_not_block_updates,
+    check_query_plan_and_explain,
+    check_tag_todo_link_diffs,
+]
+
+def main():
+    check_runner.main(CHECKS, "dictionote_indexes_")
+
+if __name__ == "__main__":
+    main()
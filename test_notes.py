@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import struct
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# 将项目根目录添加到 Python 路径
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+import check_runner
+
+from src.utils.config_manager import ConfigManager
+from src.main.note_manager import NoteManager
+from src.utils.revision_store import RevisionStore
+from src.utils.recurrence import occurrences
+from src.utils.daily_storage import DailyStorage
+from src.utils.note_registry import NoteRegistry, new_uid, uid_timestamp
+
+def make_manager(work_dir: str) -> NoteManager:
+    """在临时目录中创建便签管理器（不合并连续保存的历史版本）"""
+    config_manager = ConfigManager(os.path.join(work_dir, "config"))
+    config_manager.set("storage.notes_dir", os.path.join(work_dir, "notes"))
+    config_manager.set("history.coalesce_seconds", 0)
+    return NoteManager(config_manager)
+
+def check_revision_snapshot_and_delta(work_dir: str):
+    # 快照加增量能还原每个版本，精简后最新版本保留
+    store = RevisionStore(work_dir, snapshot_interval=3, coalesce_seconds=0)
+    versions = [("t", "abc" * 100 + str(i)) for i in range(7)]
+    for title, content in versions:
+        store.record("k", title, content)
+    assert [r['snapshot'] for r in store.list_revisions("k")] == [True, False, False, True, False, False, True]
+    reopened = RevisionStore(work_dir, snapshot_interval=3, coalesce_seconds=0)
+    for index, (title, content) in enumerate(versions):
+        assert reopened.get_revision("k", index)['content'] == content
+    # 30 天后同一天的版本只保留一个（另加总是保留的最新版本）
+    assert reopened.thin_out("k", now=time.time() + 30 * 86400) == 5
+    assert [reopened.get_revision("k", index)['content'] for index in range(2)] == [versions[5][1], versions[6][1]]
+
+def check_revision_coalesce(work_dir: str):
+    # 合并窗口内的连续保存只保留最后一次
+    store = RevisionStore(work_dir, coalesce_seconds=60)
+    store.record("k", "t", "v1")
+    store.record("k", "t", "v2")
+    store.record("k", "t", "v3")
+    revisions = store.list_revisions("k")
+    assert len(revisions) == 2
+    assert store.get_revision("k", -1)['content'] == "v3"
+
+def check_revisions_not_shared_by_reused_id(work_dir: str):
+    # 删除的便签ID被新便签复用时，新便签看不到旧便签的历史
+    manager = make_manager(work_dir)
+    for note_id in list(manager.notes):
+        manager.delete_note(note_id)
+    old = manager.create_note("old")
+    manager.update_note(old['id'], content="secret v1")
+    manager.update_note(old['id'], content="secret v2")
+    old_uid = old['uid']
+    manager.delete_note(old['id'])
+
+    new = manager.create_note("new")
+    assert new['id'] == old['id'], "测试前提：ID被复用"
+    assert manager.list_revisions(new['id']) == []
+    manager.update_note(new['id'], content="fresh")
+    assert [manager.get_revision(new['id'], r['index'])['content']
+            for r in manager.list_revisions(new['id'])] == ["fresh"]
+
+    # 已删除的便签仍可按 uid 恢复，ID 被占用时换用新的ID
+    assert manager.get_revision(old['id'], -1, uid=old_uid)['content'] == "secret v2"
+    restored = manager.restore_revision(old['id'], -1, uid=old_uid)
+    assert restored['uid'] == old_uid and restored['id'] != new['id']
+    assert restored['content'] == "secret v2"
+    assert manager.notes[new['id']]['content'] == "fresh"
+    manager.close()
+
+def check_legacy_revisions_adopted(work_dir: str):
+    # 以 日期_便签ID 为键的旧历史迁移到 uid 下；早于便签创建的旧历史归档
+    manager = make_manager(work_dir)
+    note = manager.create_note("n")
+    legacy_key = manager._revision_key(note['id'])
+    manager.revisions.record(legacy_key, "n", "legacy")
+    manager.revisions.flush()
+    manager.revisions._headers.clear()
+    assert manager.get_revision(note['id'], -1)['content'] == "legacy"
+
+    other = manager.create_note("other")
+    stale_key = manager._revision_key(other['id'])
+    stale = RevisionStore(manager.revisions.revision_dir, coalesce_seconds=0)
+    stale.record(stale_key, "deleted", "old note")
+    with open(stale._path(stale_key), 'r+b') as f:
+        # 把保存时间改到一天前，模拟已删除便签留下的历史
+        f.seek(5)
+        f.write(struct.pack(">d", time.time() - 86400))
+    manager.revisions._headers.clear()
+    assert manager.list_revisions(other['id']) == []
+    archived = [name for name in os.listdir(manager.revisions.revision_dir) if name.startswith(stale_key + "~")]
+    assert len(archived) == 1
+    manager.close()
+
+def check_recurrence_expansion(work_dir: str):
+    # 每 2 周的周一、周四；31 号开始的每月规则落在小月月末
+    weekly = {'start': "2024-01-01", 'freq': "weekly", 'interval': 2, 'weekdays': [0, 3], 'exceptions': ["2024-01-15"]}
+    assert occurrences(weekly, date(2024, 1, 1), date(2024, 1, 31)) == [
+        date(2024, 1, 1), date(2024, 1, 4), date(2024, 1, 18), date(2024, 1, 29)]
+    monthly = {'start': "2024-01-31", 'freq': "monthly", 'until': "2024-04-30"}
+    assert occurrences(monthly, date(2024, 1, 1), date(2024, 12, 31)) == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+
+def check_recurring_note_materialized(work_dir: str):
+    # 编辑某次发生时写成真实便签，该日期不再展开；删除某次发生记为例外
+    manager = make_manager(work_dir)
+    today = manager.working_date
+    rule = manager.add_recurring_note("晨读", "- [ ] 读一篇文章", "daily", start=today)
+    note_id = "r" + rule['id']
+    assert note_id in manager.notes and manager.notes[note_id].get('uid') is None
+    manager.update_note(note_id, content="- [x] 读完了")
+    assert manager.notes[note_id]['uid'] and note_id not in manager._virtual
+    manager.set_working_date(today + timedelta(days=1))
+    manager.delete_note(note_id)
+    manager.set_working_date(today)
+    assert manager.notes[note_id]['content'] == "- [x] 读完了"
+    assert manager.recurrence.get_rule(rule['id'])['exceptions'] == [
+        today.isoformat(), (today + timedelta(days=1)).isoformat()]
+    manager.close()
+
+def check_recurring_template_not_duplicated(work_dir: str):
+    # 以当前便签为模板设为重复时，模板就是当天的发生，不再多展开一份
+    manager = make_manager(work_dir)
+    for note_id in list(manager.notes):
+        manager.delete_note(note_id)
+    template = manager.create_note("周会", "- [ ] 准备周报")
+    today = manager.working_date
+    rule = manager.add_recurring_note(template['title'], template['content'], "weekly", start=today,
+                                      template_id=template['id'])
+    assert list(manager.notes) == [template['id']]
+    assert template['recurrence'] == rule['id']
+    next_week = today + timedelta(days=7)
+    assert [meta['title'] for meta in manager.get_daily_meta(next_week)] == ["周会"]
+    manager.close()
+
+def check_recurring_summaries_and_agenda(work_dir: str):
+    # 日历摘要和日程在整个范围内展开重复便签及其待办，而不只是工作日期
+    manager = make_manager(work_dir)
+    today = manager.working_date
+    manager.add_recurring_note("打卡", "- [ ] 背单词", "daily", start=today, interval=3)
+    end = today + timedelta(days=9)
+    days = [(today + timedelta(days=offset)).isoformat() for offset in (0, 3, 6, 9)]
+    summaries = manager.get_day_summaries(today, end)
+    assert [date_str for date_str, summary in summaries.items() if "打卡" in summary['titles']] == days
+    assert all(summaries[date_str]['count'] >= 1 for date_str in days)
+    agenda = manager.get_agenda(days=10, start=today)
+    assert [day['date'] for day in agenda if any(todo['text'] == "背单词" for todo in day['todos'])] == days
+    assert [todo['date'] for todo in manager.open_todos(today, end) if todo['text'] == "背单词"] == days
+    manager.close()
+
+def check_uid_ordering(work_dir: str):
+    # uid 按生成顺序排序（同一毫秒内也单调），时间部分可以还原
+    uids = [new_uid() for _ in range(2000)]
+    assert uids == sorted(uids) and len(set(uids)) == len(uids)
+    assert all(len(uid) == 26 for uid in uids)
+    assert abs(uid_timestamp(uids[0]) - time.time()) < 5
+    assert abs(uid_timestamp(new_uid(1700000000.5)) - 1700000000.5) < 0.001
+    assert new_uid(1600000000) < new_uid(1700000000)
+
+def check_uid_migration(work_dir: str):
+    # 旧便签按创建时间分配 uid 并写回，注册表可按 uid 定位；再次迁移不重复分配
+    storage = DailyStorage(os.path.join(work_dir, "notes"))
+    day = date(2024, 3, 1)
+    storage.save_notes({
+        "1": {'id': "1", 'title': "a", 'content': "x", 'created_at': "2024-03-01T08:00:00", 'date': day.isoformat()},
+        "2": {'id': "2", 'title': "b", 'content': "y", 'created_at': "2024-03-01T09:00:00", 'date': day.isoformat()},
+    }, day)
+    registry = NoteRegistry(os.path.join(work_dir, "index"))
+    assert not registry.loaded
+    assert registry.migrate(storage) == 2
+    notes = storage.get_daily_notes(day)
+    first, second = notes["1"]['uid'], notes["2"]['uid']
+    assert first < second
+    assert abs(uid_timestamp(first) - datetime(2024, 3, 1, 8).timestamp()) < 0.001
+    reopened = NoteRegistry(os.path.join(work_dir, "index"))
+    assert reopened.loaded and reopened.locate(second) == "2024-03-01_2"
+    assert reopened.uid_for("2024-03-01_1") == first
+    assert reopened.migrate(storage) == 0 and reopened.locate(first) == "2024-03-01_1"
+
+def check_uid_assigned_on_edit(work_dir: str):
+    # 外部加入的没有 uid 的便签：浏览时不改写文件，第一次编辑时才分配 uid
+    manager = make_manager(work_dir)
+    day = date(2024, 3, 2)
+    storage = DailyStorage(os.path.join(work_dir, "notes"))
+    storage.save_notes({"1": {'id': "1", 'title': "a", 'content': "x", 'date': day.isoformat()}}, day)
+    path = storage.get_daily_file(day)
+    before = (os.path.getmtime(path), open(path, encoding='utf-8').read())
+
+    manager.set_working_date(day)
+    assert (os.path.getmtime(path), open(path, encoding='utf-8').read()) == before, "浏览时改写了文件"
+    assert not manager.get_note("1").get('uid')
+
+    manager.update_note("1", content="y")
+    uid = storage.get_daily_notes(day)["1"]['uid']
+    assert uid and manager.get_note("1")['uid'] == uid
+    assert manager.locate_note(uid) == (day, "1")
+    assert len(manager.list_revisions("1")) == 1
+
+CHECKS = [
+    check_revision_snapshot_and_delta,
+    check_revision_coalesce,
+    check_revisions_not_shared_by_reused_id,
+    check_legacy_revisions_adopted,
+    check_recurrence_expansion,
+    check_recurring_note_materialized,
+    check_recurring_template_not_duplicated,
+    check_recurring_summaries_and_agenda,
+    check_uid_ordering,
+    check_uid_migration,
+    check_uid_assigned_on_edit,
+]
+
+def main():
+    check_runner.main(CHECKS, "dictionote_notes_")
+
+if __name__ == "__main__":
+    main()
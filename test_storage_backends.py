@@ -0,0 +1,407 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+from pathlib import Path
+
+# 将项目根目录添加到 Python 路径
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from src.utils.daily_storage import DailyStorage
+from src.utils.day_scanner import scan_day_files
+from src.utils.sqlite_storage import SqliteStorage
+from src.utils.memory_storage import MemoryStorage
+
+def make_backends(work_dir: str) -> dict:
+    """为每个后端创建一个基于独立目录的工厂"""
+    return {
+        "json": lambda name: DailyStorage(str(Path(work_dir) / name / "notes")),
+        "json-compact": lambda name: DailyStorage(str(Path(work_dir) / name / "notes"), file_format="compact"),
+        "json-sharded": lambda name: DailyStorage(str(Path(work_dir) / name / "notes"), layout="sharded"),
+        "sqlite": lambda name: SqliteStorage(str(Path(work_dir) / name / "notes.db")),
+        "memory": lambda name: MemoryStorage(),
+    }
+
+def make_note(title: str, content: str = "", day: date = None) -> dict:
+    """构造一个与 NoteManager 创建的结构一致的便签"""
+    return {
+        'title': title,
+        'content': content,
+        'created_at': '2024-01-01T08:00:00',
+        'updated_at': '2024-01-01T08:00:00',
+        'date': (day or date(2024, 1, 1)).strftime('%Y-%m-%d'),
+    }
+
+def check_empty_day(storage):
+    assert storage.get_daily_notes(date(2024, 1, 1)) == {}
+    assert storage.get_all_notes() == {}
+    assert storage.get_notes_in_range() == {}
+
+def check_save_and_load_roundtrip(storage):
+    day = date(2024, 1, 1)
+    notes = {
+        "1": dict(make_note("英语单词", "abandon 放弃\n  缩进保留"), id="1"),
+        "2": dict(make_note("Plan", "- [ ] review"), id="2"),
+    }
+    assert storage.save_notes(notes, day)
+    loaded = storage.get_daily_notes(day)
+    assert loaded == notes
+    assert list(loaded) == ["1", "2"], "便签顺序应保持不变"
+
+def check_save_replaces_day(storage):
+    day = date(2024, 1, 2)
+    storage.save_notes({"1": make_note("a"), "2": make_note("b")}, day)
+    storage.save_notes({"2": make_note("b2")}, day)
+    assert storage.get_daily_notes(day) == {"2": make_note("b2")}
+
+def check_returned_notes_are_copies(storage):
+    day = date(2024, 1, 3)
+    storage.save_notes({"1": make_note("a")}, day)
+    storage.get_daily_notes(day)["1"]["title"] = "changed"
+    assert storage.get_daily_notes(day)["1"]["title"] == "a"
+
+def check_partial_save(storage):
+    day = date(2024, 1, 4)
+    notes = {note_id: dict(make_note(f"note {note_id}"), id=note_id) for note_id in ("1", "2", "3")}
+    assert storage.save_notes(notes, day)
+    notes["2"]["content"] = "changed"
+    del notes["1"]
+    notes["4"] = dict(make_note("note 4"), id="4")
+    assert storage.save_notes(notes, day, dirty={"1", "2", "4"})
+    loaded = storage.get_daily_notes(day)
+    assert loaded == notes
+    assert list(loaded) == ["2", "3", "4"], "部分保存后便签顺序应保持不变"
+    if isinstance(storage, DailyStorage):
+        # 绕过缓存，确认写入磁盘的文件同样完整
+        reopened = DailyStorage(storage.storage_dir, file_format=storage.file_format, layout=storage.layout)
+        assert reopened.get_daily_notes(day) == notes
+
+def check_daily_meta(storage):
+    day = date(2024, 1, 5)
+    storage.save_notes({
+        "1": dict(make_note("first", "12345"), id="1"),
+        "2": dict(make_note("second", ""), id="2"),
+    }, day)
+    meta = storage.get_daily_meta(day)
+    assert list(meta) == ["1", "2"]
+    assert meta["1"] == {
+        'id': "1", 'title': "first", 'created_at': '2024-01-01T08:00:00',
+        'updated_at': '2024-01-01T08:00:00', 'chars': 5, 'date': "2024-01-05",
+    }
+    assert 'content' not in meta["2"]
+    assert storage.get_note_body(day, "1") == "12345"
+    assert storage.get_note_body(day, "3") is None
+    assert storage.get_daily_meta(date(2024, 1, 6)) == {}
+
+def check_create_future_note(storage):
+    future = date.today() + timedelta(days=3)
+    assert storage.create_future_note(future, make_note("first"))
+    assert storage.create_future_note(future, make_note("second"))
+    notes = storage.get_daily_notes(future)
+    assert [n['title'] for n in notes.values()] == ["first", "second"]
+    assert list(notes) == ["1", "2"]
+    # 与批量创建的便签结构相同（带 id）
+    assert storage.create_future_notes([(future, make_note("bulk"))])[0]['id'] == "3"
+    notes = storage.get_daily_notes(future)
+    assert [n['id'] for n in notes.values()] == ["1", "2", "3"]
+    assert dict(notes["3"], title="first", id="1") == notes["1"]
+
+def check_create_future_note_rejects_past(storage):
+    past = date.today() - timedelta(days=1)
+    assert not storage.create_future_note(past, make_note("late"))
+    assert storage.get_daily_notes(past) == {}
+
+def check_create_future_notes_bulk(storage):
+    first = date.today() + timedelta(days=5)
+    second = first + timedelta(days=1)
+    past = date.today() - timedelta(days=1)
+    assert storage.create_future_note(first, make_note("existing"))
+    results = storage.create_future_notes([
+        (first, make_note("a")), (second, make_note("b")), (past, make_note("late")), (first, make_note("c")),
+    ])
+    assert [result['ok'] for result in results] == [True, True, False, True]
+    assert [result['id'] for result in results] == ["2", "1", None, "3"]
+    assert results[2]['error']
+    assert [n['title'] for n in storage.get_daily_notes(first).values()] == ["existing", "a", "c"]
+    assert [n['title'] for n in storage.get_daily_notes(second).values()] == ["b"]
+    assert storage.get_daily_notes(past) == {}
+
+def check_get_all_notes(storage):
+    storage.save_notes({"1": make_note("a")}, date(2024, 1, 1))
+    storage.save_notes({"1": make_note("b"), "2": make_note("c")}, date(2024, 2, 1))
+    all_notes = storage.get_all_notes()
+    assert sorted(all_notes) == ["2024-01-01_1", "2024-02-01_1", "2024-02-01_2"]
+    assert all_notes["2024-02-01_2"]['date'] == "2024-02-01"
+    assert all_notes["2024-02-01_2"]['id'] == "2"
+
+def check_get_notes_in_range(storage):
+    for day in range(1, 11):
+        storage.save_notes({"1": make_note(f"day {day}")}, date(2024, 3, day))
+    result = storage.get_notes_in_range(date(2024, 3, 3), date(2024, 3, 5))
+    assert list(result) == ["2024-03-03", "2024-03-04", "2024-03-05"]
+    assert result["2024-03-04"]["1"]['title'] == "day 4"
+    assert len(storage.get_notes_in_range(start=date(2024, 3, 9))) == 2
+    assert len(storage.get_notes_in_range(end=date(2024, 3, 2))) == 2
+
+def check_empty_day_not_listed(storage):
+    day = date(2024, 4, 1)
+    storage.save_notes({"1": make_note("a")}, day)
+    storage.save_notes({}, day)
+    assert storage.get_daily_notes(day) == {}
+    assert "2024-04-01" not in storage.get_notes_in_range()
+
+def check_day_summaries(storage):
+    storage.save_notes({"1": make_note("a", "12345"), "2": make_note("b", "xy")}, date(2024, 5, 1))
+    storage.save_notes({"1": make_note("c")}, date(2024, 5, 2))
+    storage.save_notes({"1": make_note("d")}, date(2024, 6, 1))
+    summaries = storage.get_day_summaries(date(2024, 5, 1), date(2024, 5, 31))
+    assert list(summaries) == ["2024-05-01", "2024-05-02"]
+    first = summaries["2024-05-01"]
+    assert first['count'] == 2
+    assert first['titles'] == ["a", "b"]
+    assert first['chars'] == 7
+    assert first['updated_at'] == '2024-01-01T08:00:00'
+    old_hash = first['hash']
+
+    storage.save_notes({"1": make_note("a", "changed")}, date(2024, 5, 1))
+    updated = storage.get_day_summaries(date(2024, 5, 1), date(2024, 5, 1))["2024-05-01"]
+    assert updated['count'] == 1 and updated['hash'] != old_hash
+
+    storage.save_notes({}, date(2024, 5, 2))
+    assert "2024-05-02" not in storage.get_day_summaries()
+
+def check_iter_notes(storage):
+    for day in range(1, 6):
+        storage.save_notes({"1": make_note(f"{day}a"), "2": make_note(f"{day}b")}, date(2024, 7, day))
+    titles = [note['title'] for note in storage.iter_notes()]
+    assert titles == ["1a", "1b", "2a", "2b", "3a", "3b", "4a", "4b", "5a", "5b"]
+
+    ranged = list(storage.iter_notes(date(2024, 7, 2), date(2024, 7, 3)))
+    assert [(n['date'], n['id']) for n in ranged] == [
+        ("2024-07-02", "1"), ("2024-07-02", "2"), ("2024-07-03", "1"), ("2024-07-03", "2")]
+
+    page = [n['title'] for n in storage.iter_notes(limit=3, offset=3)]
+    assert page == ["2b", "3a", "3b"]
+
+    cursor = "2024-07-03_1"
+    after = [n['title'] for n in storage.iter_notes(cursor=cursor, limit=3)]
+    assert after == ["3b", "4a", "4b"]
+    assert [n['title'] for n in storage.iter_notes(cursor=cursor, offset=1, limit=1)] == ["4a"]
+
+    # 产出的是副本，不会给存储中的便签添加字段
+    next(storage.iter_notes())['title'] = "changed"
+    stored = storage.get_daily_notes(date(2024, 7, 1))["1"]
+    assert stored['title'] == "1a" and 'id' not in stored
+
+def check_mixed_formats(storage):
+    # JSON 目录后端切换格式后仍能读取旧格式文件
+    if not isinstance(storage, DailyStorage):
+        return
+    notes = {"1": dict(make_note("old", "旧格式"), id="1", date="2024-08-01"),
+             "2": {"title": "legacy", "created_at": "not a timestamp", "tag": ["x"]}}
+    storage.save_notes(notes, date(2024, 8, 1))
+    reopened = DailyStorage(storage.storage_dir,
+                            file_format="json" if storage.file_format == "compact" else "compact")
+    assert reopened.get_daily_notes(date(2024, 8, 1)) == notes
+    reopened.save_notes(notes, date(2024, 8, 2))
+    assert storage.get_daily_notes(date(2024, 8, 2)) == notes
+
+def check_layout_migration(storage):
+    # JSON 目录后端切换布局后，旧布局的文件可立即读取并能迁移到新布局
+    if not isinstance(storage, DailyStorage):
+        return
+    for day in range(1, 4):
+        storage.save_notes({"1": make_note(f"day {day}")}, date(2024, 9, day))
+    target = "flat" if storage.layout == "sharded" else "sharded"
+    switched = DailyStorage(storage.storage_dir, layout=target)
+    assert switched.get_daily_notes(date(2024, 9, 2))["1"]['title'] == "day 2"
+    switched.save_notes({"1": make_note("moved by save")}, date(2024, 9, 3))
+    assert switched.migrate_layout() == 2
+    for path in switched.list_day_files():
+        assert path == switched._layout_path(switched.list_day_files()[path], target)
+    assert len(switched.list_day_files(date(2024, 9, 2), date(2024, 9, 3))) == 2
+    assert [n['title'] for n in switched.iter_notes()] == ["day 1", "day 2", "moved by save"]
+
+def check_json_import(storage):
+    # SQLite 后端能从任意布局的每日文件目录导入，不覆盖数据库中已有的日期
+    if not isinstance(storage, SqliteStorage):
+        return
+    base = Path(storage.db_path).parent
+    sources = (("flat", "json"), ("sharded", "json"), ("flat", "compact"), ("sharded", "compact"))
+    for year, (layout, file_format) in enumerate(sources, 2020):
+        source = DailyStorage(str(base / f"import_{layout}_{file_format}"), file_format=file_format, layout=layout)
+        notes = {"1": dict(make_note(f"{layout} note", "正文", date(year, 10, 1)), id="1", tag=["x"])}
+        source.save_notes(notes, date(year, 10, 1))
+        source.save_notes({"1": make_note("second")}, date(year, 11, 2))
+        assert storage.migrate_from_json(source.storage_dir) == 2, (layout, file_format)
+        assert storage.is_migrated(source.storage_dir)
+        assert storage.get_daily_notes(date(year, 10, 1)) == notes
+        assert storage.migrate_from_json(source.storage_dir) == 0, "已导入的目录应跳过"
+
+    broken = base / "import_broken"
+    good = DailyStorage(str(broken), layout="sharded")
+    good.save_notes({"1": make_note("ok")}, date(2024, 12, 1))
+    (broken / "2024" / "12" / "2024_12_02.json").write_text("{not json", encoding='utf-8')
+    assert storage.migrate_from_json(str(broken)) == 1
+    assert storage.is_migrated(str(broken)), "无法读取的文件跳过后仍应记为已迁移"
+    assert storage.get_daily_notes(date(2024, 12, 1))["1"]['title'] == "ok"
+
+    # 数据库中修改过的日期不会被文件中的旧内容覆盖（即使迁移标记丢失）
+    storage.save_notes({"1": make_note("edited")}, date(2024, 12, 1))
+    storage.conn.execute("DELETE FROM meta")
+    storage.conn.commit()
+    assert storage.migrate_from_json(str(broken)) == 0
+    assert storage.get_daily_notes(date(2024, 12, 1))["1"]['title'] == "edited"
+
+def check_external_day_file(storage):
+    # 同步或从备份恢复的每日文件不在清单中，全量读取、分页和重新打开时都能看到
+    if not isinstance(storage, DailyStorage):
+        return
+    storage.save_notes({"1": make_note("local")}, date(2024, 10, 1))
+    source = DailyStorage(storage.storage_dir + "_backup", file_format=storage.file_format, layout=storage.layout)
+    source.save_notes({"1": make_note("restored", "备份")}, date(2024, 10, 2))
+    source.save_notes({"1": make_note("synced")}, date(2024, 10, 3))
+    for day in (2, 3):
+        source_path = Path(source.get_daily_file(date(2024, 10, day)))
+        target = Path(storage._layout_path(date(2024, 10, day), storage.layout))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(source_path, target)
+
+    assert [n['title'] for n in storage.iter_notes()] == ["local", "restored", "synced"]
+    assert [n['title'] for n in storage.iter_notes(limit=5)] == ["local", "restored", "synced"]
+    assert len(storage.get_all_notes()) == 3 and "2024-10-03" in storage.get_day_summaries()
+
+    # 外部删除的文件从清单中移除；重新打开时同样校正
+    Path(storage.get_daily_file(date(2024, 10, 1))).unlink()
+    reopened = DailyStorage(storage.storage_dir, file_format=storage.file_format, layout=storage.layout)
+    assert list(reopened.get_day_summaries()) == ["2024-10-02", "2024-10-03"]
+    assert reopened.sync_manifest() == 0
+
+def check_day_cache_stamp(storage):
+    # 每日缓存按文件的 mtime_ns 和大小校验：任一变化都重新读取，统计命中和未命中
+    if not isinstance(storage, DailyStorage):
+        return
+    day = date(2024, 11, 1)
+    storage.save_notes({"1": make_note("cached")}, day)
+    storage.cache.invalidate()
+    storage.get_daily_notes(day)
+    assert storage.get_daily_notes(day)["1"]['title'] == "cached"
+    stats = storage.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    # 外部改写文件（大小变化）
+    source = DailyStorage(storage.storage_dir + "_external", file_format=storage.file_format)
+    source.save_notes({"1": make_note("rewritten elsewhere")}, day)
+    path = Path(storage.get_daily_file(day))
+    shutil.copy(source.get_daily_file(day), path)
+    assert storage.get_daily_notes(day)["1"]['title'] == "rewritten elsewhere"
+
+    # 大小不变、只有 mtime_ns 变化
+    text = path.read_text(encoding='utf-8').replace("rewritten", "REWRITTEN")
+    mtime_ns = path.stat().st_mtime_ns
+    path.write_text(text, encoding='utf-8')
+    os.utime(path, ns=(mtime_ns + 1000, mtime_ns + 1000))
+    assert storage.get_daily_notes(day)["1"]['title'] == "REWRITTEN elsewhere"
+    stats = storage.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+    assert stats["hit_rate"] == 0.25
+
+def check_prefetch_neighbours(storage):
+    # 预读中心日期前后的便签到缓存，loaded_days 只计入有便签的日期
+    if not isinstance(storage, DailyStorage):
+        return
+    for day in (10, 11, 12, 15):
+        storage.save_notes({"1": make_note(f"day {day}")}, date(2024, 11, day))
+    storage.cache.invalidate()
+    storage.prefetch(date(2024, 11, 12), radius=3)
+    deadline = time.monotonic() + 5
+    while storage.cache_stats()["prefetched"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 留出时间读完剩余（不存在的）日期
+    time.sleep(0.2)
+    assert storage.cache_stats()["prefetched"] == 3
+    for day in (10, 11, 15):
+        assert f"2024-11-{day}" in storage.cache
+    assert "2024-11-12" not in storage.cache, "中心日期不预读"
+    hits = storage.cache_stats()["hits"]
+    assert storage.get_daily_notes(date(2024, 11, 15))["1"]['title'] == "day 15"
+    assert storage.cache_stats()["hits"] == hits + 1
+
+def check_scan_order(storage):
+    # 并发扫描与顺序扫描产出相同的结果和日期顺序
+    if not isinstance(storage, DailyStorage):
+        return
+    days = [date(2023, 1, 1) + timedelta(days=offset * 5) for offset in range(60)]
+    for day in reversed(days):
+        storage.save_notes({"1": make_note(day.isoformat(), "x" * (day.day * 50))}, day)
+    expected = [day.isoformat() for day in days]
+
+    sequential = list(storage.scan_notes(workers=1))
+    assert [date_str for date_str, _ in sequential] == expected
+    for workers in (2, 8):
+        assert list(storage.scan_notes(workers=workers)) == sequential, workers
+
+    paths = list(storage.list_day_files())[::-1]
+    in_order = [result[0] for result in scan_day_files(paths, workers=1)]
+    assert in_order == paths
+    for batch_size in (1, 3, 64):
+        assert list(scan_day_files(paths, workers=4, batch_size=batch_size)) == \
+            list(scan_day_files(paths, workers=1)), batch_size
+
+CHECKS = [
+    check_empty_day,
+    check_save_and_load_roundtrip,
+    check_save_replaces_day,
+    check_returned_notes_are_copies,
+    check_partial_save,
+    check_daily_meta,
+    check_create_future_note,
+    check_create_future_note_rejects_past,
+    check_create_future_notes_bulk,
+    check_get_all_notes,
+    check_get_notes_in_range,
+    check_empty_day_not_listed,
+    check_day_summaries,
+    check_iter_notes,
+    check_mixed_formats,
+    check_layout_migration,
+    check_external_day_file,
+    check_json_import,
+    check_day_cache_stamp,
+    check_prefetch_neighbours,
+    check_scan_order,
+]
+
+def run_conformance(backends: dict) -> int:
+    """对每个后端运行全部一致性检查，返回失败数"""
+    failures = 0
+    for backend_name, factory in backends.items():
+        for check in CHECKS:
+            storage = factory(f"{backend_name}_{check.__name__}")
+            try:
+                check(storage)
+                print(f"[通过] {backend_name}: {check.__name__}")
+            except Exception:
+                failures += 1
+                print(f"[失败] {backend_name}: {check.__name__}")
+                traceback.print_exc()
+            finally:
+                if hasattr(storage, 'close'):
+                    storage.close()
+    return failures
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix="dictionote_conformance_")
+    try:
+        failures = run_conformance(make_backends(work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"失败 {failures} 项" if failures else "全部通过")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()